@@ -0,0 +1,151 @@
+"""Fit / predict time and peak memory: notebook steps vs tabular.py.
+
+Run from Assgmnt02/ (or point --data at the other assignment):
+    python benchmarks/bench_tabular.py [--scale 50] [--n-jobs -1]
+    python benchmarks/bench_tabular.py --data "../assgmnt 01/data"
+
+Every case runs in a fresh process; `peak MB` is that process's peak RSS
+minus the RSS of a process that only imported the libraries.
+
+    read       train.csv repeated --scale times. notebook: read_csv with
+               default dtypes (+ Cabin str.split); tabular: read_frame
+               (usecols, category/float32, per-cabin split)
+    fit        n_jobs=1 without cache vs --n-jobs with a cold, then warm,
+               joblib Memory cache
+    cv         5-fold cross-validation, sequential vs --n-jobs folds
+    predict    the test CSV repeated --scale times: load it whole and predict
+               (notebook) vs tabular.predict_csv in --chunksize rows
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def case_baseline(args):
+    import tabular  # noqa: F401  (imports pandas, sklearn, joblib)
+    return 0.0, peak_mb()
+
+
+def notebook_read(path, task):
+    import pandas as pd
+    df = pd.read_csv(path)
+    if 'Cabin' in df:
+        df[['Deck', 'Num', 'Side']] = df['Cabin'].str.split('/', expand=True)
+        df['Num'] = pd.to_numeric(df['Num'], errors='coerce')
+    return df
+
+
+def case_read(args, how):
+    import tabular
+    task = tabular.TASKS[tabular.detect_task(args.train)]
+    start = time.perf_counter()
+    if how == 'notebook':
+        notebook_read(args.big_train, task)
+    else:
+        tabular.read_frame(args.big_train, task, target=True)
+    return time.perf_counter() - start, peak_mb()
+
+
+def case_fit(args, n_jobs, cache_dir):
+    import tabular
+    start = time.perf_counter()
+    tabular.fit(args.train, n_jobs=n_jobs, cache_dir=cache_dir)
+    return time.perf_counter() - start, peak_mb()
+
+
+def case_cv(args, n_jobs):
+    import tabular
+    start = time.perf_counter()
+    tabular.fit(args.train, n_jobs=n_jobs, cache_dir=None, cv=5)
+    return time.perf_counter() - start, peak_mb()
+
+
+def case_predict(args, how):
+    import pandas as pd
+    import tabular
+    bundle = tabular.load_model(args.model)
+    task = tabular.TASKS[bundle['task']]
+    start = time.perf_counter()
+    if how == 'notebook':
+        df = notebook_read(args.big_test, task)
+        if 'Cabin' in df:
+            # the notebook columns, converted to what the saved pipeline expects
+            df = df.drop(columns=['Cabin'])
+            for col in ('Deck', 'Side'):
+                df[col] = df[col].astype('category')
+        pred = bundle['pipeline'].predict(df)
+        pd.DataFrame({task['id']: df[task['id']], task['target']: pred}).to_csv(args.out, index=False)
+    else:
+        tabular.predict_csv(bundle, args.big_test, args.out, args.chunksize)
+    return time.perf_counter() - start, peak_mb()
+
+
+def run(fn, *fn_args):
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(fn, *fn_args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=os.path.join(BASE_DIR, 'data'))
+    parser.add_argument('--scale', type=int, default=50, help='copies of train.csv / test.csv in the read and predict files')
+    parser.add_argument('--chunksize', type=int, default=50000)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+    args.train = os.path.join(args.data, 'train.csv')
+
+    import pandas as pd
+    import tabular
+
+    work = tempfile.mkdtemp(prefix='bench-tabular-')
+    try:
+        args.model = os.path.join(work, 'model.joblib')
+        args.out = os.path.join(work, 'submission.csv')
+        args.big_train = os.path.join(work, 'big_train.csv')
+        args.big_test = os.path.join(work, 'big_test.csv')
+        for name, path in (('train.csv', args.big_train), ('test.csv', args.big_test)):
+            frame = pd.read_csv(os.path.join(args.data, name), dtype=str, keep_default_na=False)
+            with open(path, 'w', newline='') as f:
+                for i in range(args.scale):
+                    frame.to_csv(f, header=i == 0, index=False)
+        bundle, _, _ = tabular.fit(args.train, n_jobs=1, cache_dir=None)
+        tabular.save_model(bundle, args.model)
+        cache_dir = os.path.join(work, 'cache')
+
+        _, base_mb = run(case_baseline, args)
+        print(f"{bundle['task']}, {os.cpu_count()} CPUs, read/predict files = {args.scale}x train/test.csv\n")
+        print(f"{'case':<34}{'seconds':>9}{'peak MB':>9}")
+        cases = [
+            ('read   notebook', case_read, 'notebook'),
+            ('read   tabular', case_read, 'tabular'),
+            ('fit    n_jobs=1, no cache', case_fit, 1, None),
+            (f'fit    n_jobs={args.n_jobs}, cold cache', case_fit, args.n_jobs, cache_dir),
+            (f'fit    n_jobs={args.n_jobs}, warm cache', case_fit, args.n_jobs, cache_dir),
+            ('cv     5 folds, n_jobs=1', case_cv, 1),
+            (f'cv     5 folds, n_jobs={args.n_jobs}', case_cv, args.n_jobs),
+            ('predict notebook (whole file)', case_predict, 'notebook'),
+            (f'predict tabular (chunks of {args.chunksize})', case_predict, 'tabular'),
+        ]
+        for label, fn, *fn_args in cases:
+            seconds, mb = run(fn, args, *fn_args)
+            print(f"{label:<34}{seconds:>9.2f}{mb - base_mb:>9.1f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Train / predict CLI for the Kaggle tabular assignments.
+
+    python tabular.py fit --train data/train.csv --model model.joblib --cv 5
+    python tabular.py predict --model model.joblib --test data/test.csv --out submission.csv
+
+The same ColumnTransformer + RandomForest pipeline the notebooks build, for
+both datasets (TASKS; picked from the train CSV header unless --task is
+given):
+
+    spaceship-titanic   Assgmnt02, RandomForestClassifier on Transported
+    house-prices        assgmnt 01 (its tabular.py runs this one),
+                        RandomForestRegressor on SalePrice
+
+CSVs are read with explicit compact dtypes: only the needed columns, strings
+as categoricals, numbers as float32. Cabin is split once per distinct cabin
+rather than once per row. The pipeline caches its fitted transformer in a
+joblib Memory (--cache-dir), so a refit or a rerun with the same data skips
+the preprocessing. The forest and the cross-validation folds use --n-jobs
+workers. The fitted pipeline is saved with joblib. `predict` streams the
+test CSV in --chunksize rows and appends to the submission, so memory stays
+flat however large the file is.
+"""
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import cross_val_score
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+DEFAULT_CACHE_DIR = os.environ.get('TABULAR_CACHE_DIR', '.tabular_cache')
+DEFAULT_CHUNKSIZE = 50000
+
+
+def split_cabin(df):
+    """Cabin 'B/0/P' -> Deck 'B', Num 0.0, Side 'P', parsing each distinct cabin once."""
+    cabin = df.pop('Cabin').astype('category')
+    parts = cabin.cat.categories.str.split('/', n=2, expand=True) if len(cabin.cat.categories) else None
+    codes = cabin.cat.codes.to_numpy()
+    for i, name in enumerate(('Deck', 'Num', 'Side')):
+        if parts is None:
+            values = np.full(len(df), np.nan, dtype=object)
+        else:
+            level = np.asarray(parts.get_level_values(i), dtype=object)
+            values = np.where(codes >= 0, level[codes], None)
+        df[name] = pd.to_numeric(values, errors='coerce').astype('float32') if name == 'Num' \
+            else pd.Series(values, index=df.index, dtype='category')
+    return df
+
+
+TASKS = {
+    'spaceship-titanic': {
+        'id': 'PassengerId',
+        'target': 'Transported',
+        'kind': 'classification',
+        'read': {'HomePlanet': 'category', 'CryoSleep': 'category', 'Cabin': 'str', 'Destination': 'category',
+                 'VIP': 'category', 'Age': 'float32', 'RoomService': 'float32', 'FoodCourt': 'float32',
+                 'ShoppingMall': 'float32', 'Spa': 'float32', 'VRDeck': 'float32'},
+        'derive': split_cabin,
+        'numeric': ['Num', 'Age', 'RoomService', 'FoodCourt', 'ShoppingMall', 'Spa', 'VRDeck'],
+        'onehot': ['Deck', 'Side', 'HomePlanet', 'Destination'],
+        'ordinal': ['VIP', 'CryoSleep'],
+        'unscaled': [],
+        'model': lambda n_jobs: RandomForestClassifier(n_estimators=100, max_depth=5, random_state=1, n_jobs=n_jobs),
+    },
+    'house-prices': {
+        'id': 'Id',
+        'target': 'SalePrice',
+        'kind': 'regression',
+        'read': {'LotConfig': 'category', 'LandSlope': 'category', 'Neighborhood': 'category', 'Heating': 'category',
+                 'SaleType': 'category', 'RoofStyle': 'category', 'HouseStyle': 'category',
+                 'LandContour': 'category', 'LotFrontage': 'float32', 'MSSubClass': 'float32', 'LotArea': 'float32',
+                 '1stFlrSF': 'float32', '2ndFlrSF': 'float32', 'BsmtFullBath': 'float32',
+                 'BsmtHalfBath': 'float32', 'FullBath': 'float32', 'HalfBath': 'float32',
+                 'BedroomAbvGr': 'float32', 'KitchenAbvGr': 'float32', 'GarageArea': 'float32',
+                 'PoolArea': 'float32'},
+        'derive': None,
+        'numeric': ['MSSubClass', 'LotArea', '1stFlrSF', '2ndFlrSF', 'BsmtFullBath', 'BsmtHalfBath', 'FullBath',
+                    'HalfBath', 'BedroomAbvGr', 'KitchenAbvGr', 'GarageArea', 'PoolArea'],
+        'onehot': ['LotConfig', 'LandSlope', 'Neighborhood', 'Heating', 'SaleType', 'RoofStyle', 'HouseStyle'],
+        'ordinal': ['LandContour'],
+        # imputed but left unscaled, as in the notebook
+        'unscaled': ['LotFrontage'],
+        'model': lambda n_jobs: RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs),
+    },
+}
+
+
+def detect_task(csv_path):
+    header = pd.read_csv(csv_path, nrows=0).columns
+    for name, task in TASKS.items():
+        if task['id'] in header and set(task['read']) <= set(header):
+            return name
+    raise ValueError(f"{csv_path}: columns match none of {', '.join(TASKS)}")
+
+
+def read_frame(path, task, target=False, chunksize=None):
+    """The task's columns with compact dtypes, features derived. With
+    `chunksize`, an iterator of such frames."""
+    dtype = dict(task['read'], **{task['id']: 'str'})
+    usecols = list(dtype) + ([task['target']] if target else [])
+    reader = pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize)
+    prepare = task['derive'] or (lambda df: df)
+    if chunksize is None:
+        return prepare(reader)
+    return (prepare(chunk) for chunk in reader)
+
+
+def build_pipeline(task, n_jobs=1, cache_dir=DEFAULT_CACHE_DIR):
+    """Preprocessing + forest; every column is imputed and scaled once."""
+    categorical = lambda encoder: make_pipeline(SimpleImputer(strategy='most_frequent'), encoder)
+    steps = [
+        ('numeric', make_pipeline(SimpleImputer(strategy='mean'), StandardScaler()), task['numeric']),
+        ('onehot', categorical(OneHotEncoder(handle_unknown='ignore', sparse_output=False)), task['onehot']),
+        ('ordinal', categorical(OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)),
+         task['ordinal']),
+    ]
+    if task['unscaled']:
+        steps.append(('unscaled', SimpleImputer(strategy='mean'), task['unscaled']))
+    prep = ColumnTransformer(steps, remainder='drop')
+    memory = joblib.Memory(cache_dir, verbose=0) if cache_dir else None
+    return Pipeline([('prep', prep), ('model', task['model'](n_jobs))], memory=memory)
+
+
+def fit(train_csv, task_name=None, n_jobs=-1, cache_dir=DEFAULT_CACHE_DIR, cv=0):
+    """Fit on the whole train CSV; returns (bundle, timings, cv scores or None)."""
+    task_name = task_name or detect_task(train_csv)
+    task = TASKS[task_name]
+    timings = {}
+
+    start = time.perf_counter()
+    df = read_frame(train_csv, task, target=True)
+    X, y = df.drop(columns=[task['target'], task['id']]), df[task['target']]
+    timings['read'] = time.perf_counter() - start
+
+    scores = None
+    if cv:
+        # Parallel over folds with single-threaded forests, not both at once
+        start = time.perf_counter()
+        scores = cross_val_score(build_pipeline(task, 1, cache_dir), X, y, cv=cv, n_jobs=n_jobs)
+        timings['cv'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipeline = build_pipeline(task, n_jobs, cache_dir).fit(X, y)
+    timings['fit'] = time.perf_counter() - start
+    bundle = {'task': task_name, 'pipeline': pipeline, 'sklearn': sklearn.__version__}
+    return bundle, timings, scores
+
+
+def save_model(bundle, path):
+    # The Memory handle points at a local cache folder; not part of the model
+    bundle['pipeline'].set_params(memory=None)
+    joblib.dump(bundle, path, compress=3)
+
+
+def load_model(path):
+    bundle = joblib.load(path)
+    if bundle.get('sklearn') != sklearn.__version__:
+        print(f"warning: {path} was saved with scikit-learn {bundle.get('sklearn')}, "
+              f"running {sklearn.__version__}")
+    return bundle
+
+
+def predict_csv(bundle, test_csv, out_csv, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream test_csv through the model into out_csv; returns rows written."""
+    task = TASKS[bundle['task']]
+    pipeline = bundle['pipeline']
+    rows = 0
+    with open(out_csv, 'w', newline='') as out:
+        for chunk in read_frame(test_csv, task, chunksize=chunksize):
+            pred = pipeline.predict(chunk.drop(columns=[task['id']]))
+            pd.DataFrame({task['id']: chunk[task['id']], task['target']: pred}) \
+                .to_csv(out, header=rows == 0, index=False)
+            rows += len(chunk)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('fit', help='fit on a train CSV and save the model')
+    p.add_argument('--train', default='data/train.csv')
+    p.add_argument('--model', default='model.joblib')
+    p.add_argument('--task', choices=sorted(TASKS))
+    p.add_argument('--cv', type=int, default=0, help='cross-validation folds (0 = skip)')
+    p.add_argument('--n-jobs', type=int, default=-1)
+    p.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="joblib Memory folder ('' = no cache)")
+
+    p = commands.add_parser('predict', help='write a submission CSV for a test CSV')
+    p.add_argument('--model', default='model.joblib')
+    p.add_argument('--test', default='data/test.csv')
+    p.add_argument('--out', default='submission.csv')
+    p.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    if args.command == 'fit':
+        bundle, timings, scores = fit(args.train, args.task, args.n_jobs, args.cache_dir or None, args.cv)
+        save_model(bundle, args.model)
+        if scores is not None:
+            print(f"{args.cv}-fold CV score: {scores.mean():.4f} +/- {scores.std():.4f}")
+        print(f"{bundle['task']}: " + ', '.join(f"{k} {v:.2f}s" for k, v in timings.items())
+              + f" -> {args.model}")
+    else:
+        start = time.perf_counter()
+        rows = predict_csv(load_model(args.model), args.test, args.out, args.chunksize)
+        print(f"{rows} predictions in {time.perf_counter() - start:.2f}s -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
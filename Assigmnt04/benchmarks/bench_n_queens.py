@@ -0,0 +1,119 @@
+"""N-Queens: the notebook solver vs n_queens.py, N = 8..16.
+
+Run from Assigmnt04/:
+    python benchmarks/bench_n_queens.py [--n 8 16] [--workers 4] [--budget 300]
+
+    notebook    solve_n_queens from main.ipynb (grid scans, every solution
+                kept as strings); `MB` is its tracemalloc peak
+    stream      sum(1 for _ in n_queens.solve(n)), solutions generated lazily
+    count       n_queens.count_solutions(n), bitmasks + mirror symmetry
+    parallel    count_solutions(n, workers) on a process pool
+
+A method is skipped ('-') once its previous N took long enough that the next
+one would likely exceed --budget seconds (each N costs roughly 6x the last).
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from n_queens import count_solutions, solve
+
+GROWTH = 6.5
+
+
+# -- main.ipynb, unchanged apart from names ---------------------------------
+
+def is_safe(grid, row, col, n):
+    for i in range(col):
+        if grid[row][i] == 'Q':
+            return False
+    for i, j in zip(range(row, -1, -1), range(col, -1, -1)):
+        if grid[i][j] == 'Q':
+            return False
+    for i, j in zip(range(row, n), range(col, -1, -1)):
+        if grid[i][j] == 'Q':
+            return False
+    return True
+
+
+def place_queens(grid, col, n, results):
+    if col >= n:
+        results.append(["".join(row) for row in grid])
+        return
+    for row in range(n):
+        if is_safe(grid, row, col, n):
+            grid[row][col] = 'Q'
+            place_queens(grid, col + 1, n, results)
+            grid[row][col] = '.'
+
+
+def notebook_solve(n):
+    grid = [['.' for _ in range(n)] for _ in range(n)]
+    results = []
+    place_queens(grid, 0, n, results)
+    return results
+
+# ---------------------------------------------------------------------------
+
+
+def cell(value, width, spec):
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}{spec}}"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, nargs=2, default=[8, 16], metavar=('FROM', 'TO'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--budget', type=float, default=300.0, help='seconds one method may take for one N')
+    args = parser.parse_args()
+
+    methods = {
+        'stream': lambda n: sum(1 for _ in solve(n)),
+        'count': lambda n: count_solutions(n),
+        'parallel': lambda n: count_solutions(n, args.workers),
+    }
+    last = dict.fromkeys(['notebook'] + list(methods), 0.0)
+
+    print(f"workers={args.workers}, budget {args.budget:.0f}s per cell\n")
+    print(f"{'N':>3}{'solutions':>11}{'notebook s':>12}{'MB':>8}{'stream s':>10}{'count s':>10}"
+          f"{'parallel s':>12}{'speedup':>10}")
+    for n in range(args.n[0], args.n[1] + 1):
+        cells, counts = {}, set()
+        mb = None
+        if last['notebook'] * GROWTH <= args.budget:
+            tracemalloc.start()
+            results, _ = timed(lambda: notebook_solve(n))
+            mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            del results
+            # timed again without tracemalloc, which slows allocation down
+            results, cells['notebook'] = timed(lambda: notebook_solve(n))
+            counts.add(len(results))
+            del results
+        for name, fn in methods.items():
+            if last[name] * GROWTH <= args.budget:
+                count, cells[name] = timed(lambda: fn(n))
+                counts.add(count)
+        for name in last:
+            last[name] = cells.get(name, float('inf'))
+        assert len(counts) == 1, f"methods disagree for N={n}: {counts}"
+
+        fastest = min(cells.get('count', float('inf')), cells.get('parallel', float('inf')))
+        speedup = cells['notebook'] / fastest if 'notebook' in cells else None
+        print(f"{n:>3}{counts.pop():>11}{cell(cells.get('notebook'), 12, '.3f')}{cell(mb, 8, '.1f')}"
+              f"{cell(cells.get('stream'), 10, '.3f')}{cell(cells.get('count'), 10, '.3f')}"
+              f"{cell(cells.get('parallel'), 12, '.3f')}{cell(speedup, 9, '.0f')}{'x' if speedup else ' '}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
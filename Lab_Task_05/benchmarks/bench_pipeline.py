@@ -0,0 +1,106 @@
+"""main.ipynb's steps in a loop vs pipeline.py, over a directory of images.
+
+Run from Lab_Task_05/:
+    python benchmarks/bench_pipeline.py [--images 64] [--size 720] [--workers 4]
+
+The images are pic.jpeg resized to --size pixels a side and saved --images
+times in a temporary directory. Every case writes the notebook's five
+results (threshold, edges, blurred, contours, faces) as PNGs.
+
+    notebook     the cells run per image: cv2.imread, gray computed twice
+                 (once for threshold/Canny, again for the faces), one
+                 cv2.imwrite per result. The cascade is loaded once, not per
+                 image as a loop around the notebook cell would.
+    pipeline     pipeline.run with the same stages, in this process
+    pool         pipeline.run with --workers processes, chunks of --chunk-size,
+                 OpenCV capped at one thread per process
+
+The per-stage report of the last pipeline run is printed at the end.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import pipeline
+
+STAGES = [
+    {'op': 'threshold'},
+    {'name': 'edges', 'op': 'canny'},
+    {'name': 'blurred', 'op': 'gaussian_blur'},
+    {'op': 'contours'},
+    {'op': 'faces'},
+]
+
+
+def notebook_loop(paths, out):
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    for name in ('threshold', 'edges', 'blurred', 'contours', 'faces'):
+        os.makedirs(os.path.join(out, name), exist_ok=True)
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0] + '.png'
+        image = cv2.imread(path)
+        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, threshold_image = cv2.threshold(gray_image, 127, 255, cv2.THRESH_BINARY)
+        cv2.imwrite(os.path.join(out, 'threshold', stem), threshold_image)
+        edges = cv2.Canny(gray_image, 100, 200)
+        cv2.imwrite(os.path.join(out, 'edges', stem), edges)
+        blurred_image = cv2.GaussianBlur(image, (15, 15), 0)
+        cv2.imwrite(os.path.join(out, 'blurred', stem), blurred_image)
+        contours, _ = cv2.findContours(threshold_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        cv2.drawContours(image, contours, -1, (0, 255, 0), 3)
+        cv2.imwrite(os.path.join(out, 'contours', stem), image)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+        for (x, y, w, h) in faces:
+            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv2.imwrite(os.path.join(out, 'faces', stem), image)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--size', type=int, default=720, help='side of the test images in pixels')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=8)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix='bench-pipeline-')
+    try:
+        src = os.path.join(work, 'images')
+        os.makedirs(src)
+        image = cv2.resize(cv2.imread(os.path.join(BASE_DIR, 'pic.jpeg')), (args.size, args.size))
+        paths = []
+        for i in range(args.images):
+            paths.append(os.path.join(src, f"{i:05d}.jpeg"))
+            cv2.imwrite(paths[-1], image)
+
+        print(f"{args.images} images of {args.size}x{args.size}, {os.cpu_count()} CPUs\n")
+        print(f"{'case':<34}{'seconds':>9}{'images/s':>10}")
+        start = time.perf_counter()
+        notebook_loop(paths, os.path.join(work, 'notebook'))
+        seconds = time.perf_counter() - start
+        print(f"{'notebook (per image)':<34}{seconds:>9.2f}{args.images / seconds:>10.1f}", flush=True)
+
+        cases = [('pipeline (in process)', {'workers': 0}),
+                 (f'pool ({args.workers} workers, chunks of {args.chunk_size})',
+                  {'workers': args.workers, 'chunk_size': args.chunk_size})]
+        for label, settings in cases:
+            out = os.path.join(work, label.split()[0])
+            report = pipeline.run([src], dict(settings, stages=STAGES), out)
+            print(f"{label:<34}{report['wall_seconds']:>9.2f}{report['images_per_second']:>10.1f}", flush=True)
+        print()
+        print(pipeline.format_report(report))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
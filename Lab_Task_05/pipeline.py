@@ -0,0 +1,352 @@
+"""Batch version of main.ipynb: run its OpenCV steps over directories of images.
+
+    python pipeline.py photos/ --config pipeline.yaml --out out --workers 4
+
+The steps are stages in a YAML or JSON config (pipeline.yaml is the
+notebook's chain):
+
+    stages:
+      - op: threshold              # name defaults to the op
+        thresh: 127                # every other key is a parameter
+      - name: edges
+        op: canny
+      - op: contours
+        save: false                # computed, but not written out
+
+Each op reads named inputs: 'image' (the decoded file) or another stage's
+output (OPS lists the defaults; `inputs:` overrides them). Each stage runs
+once per image and its result is shared, so threshold, canny and faces all
+use one gray conversion. An input naming an op that has no stage of its own
+(e.g. 'gray') gets an unsaved stage added automatically. Unlike the
+notebook, stages never draw on their inputs.
+
+Files are split into chunks of `chunk_size` and the chunks are handed to a
+pool of `workers` processes. Each worker loads the Haar cascade once and
+caps OpenCV's own threads at `cv_threads`, so the processes do not compete
+for cores. A worker encodes a whole chunk in memory and then writes it in
+one pass, to out/<stage>/<relative path>. Face boxes and contour counts go
+to out/results.jsonl, one line per image, appended once per chunk. Every
+stage is timed (plus reading, encoding and writing); the table printed at the end is
+also saved as out/report.json.
+"""
+import argparse
+import json
+import os
+import time
+from functools import lru_cache
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pipeline.yaml')
+# cv_threads None: 1 per worker process, OpenCV's default when running in-process
+DEFAULTS = {'format': '.png', 'jpeg_quality': 95, 'workers': 0, 'chunk_size': 32, 'cv_threads': None}
+
+
+@lru_cache(maxsize=None)
+def cascade(name):
+    """A Haar cascade from cv2.data (or a path), loaded once per process."""
+    path = name if os.path.exists(name) else cv2.data.haarcascades + name
+    classifier = cv2.CascadeClassifier(path)
+    if classifier.empty():
+        raise ValueError(f"cannot load Haar cascade {name!r}")
+    return classifier
+
+
+def gray(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def crop(image, top, bottom, left, right):
+    return image[top:bottom, left:right]
+
+
+def threshold(gray_image, thresh, maxval):
+    return cv2.threshold(gray_image, thresh, maxval, cv2.THRESH_BINARY)[1]
+
+
+def canny(gray_image, low, high):
+    return cv2.Canny(gray_image, low, high)
+
+
+def gaussian_blur(image, ksize, sigma):
+    return cv2.GaussianBlur(image, (ksize, ksize), sigma)
+
+
+def contours(image, mask, color, thickness):
+    found, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    out = image.copy()
+    cv2.drawContours(out, found, -1, tuple(color), thickness)
+    return out, len(found)
+
+
+def faces(image, gray_image, cascade_file, scale_factor, min_neighbors, color, thickness):
+    boxes = cascade(cascade_file).detectMultiScale(gray_image, scaleFactor=scale_factor, minNeighbors=min_neighbors)
+    out = image.copy()
+    for (x, y, w, h) in boxes:
+        cv2.rectangle(out, (int(x), int(y)), (int(x + w), int(y + h)), tuple(color), thickness)
+    return out, [[int(v) for v in box] for box in boxes]
+
+
+# op -> function, default inputs and parameters (the notebook's values).
+# Functions returning (image, value) also report `value` in results.jsonl.
+OPS = {
+    'gray': {'run': gray, 'inputs': ['image'], 'params': {}},
+    'crop': {'run': crop, 'inputs': ['image'], 'params': {'top': 50, 'bottom': 250, 'left': 100, 'right': 300}},
+    'threshold': {'run': threshold, 'inputs': ['gray'], 'params': {'thresh': 127, 'maxval': 255}},
+    'canny': {'run': canny, 'inputs': ['gray'], 'params': {'low': 100, 'high': 200}},
+    'gaussian_blur': {'run': gaussian_blur, 'inputs': ['image'], 'params': {'ksize': 15, 'sigma': 0}},
+    'contours': {'run': contours, 'inputs': ['image', 'threshold'],
+                 'params': {'color': [0, 255, 0], 'thickness': 3}},
+    'faces': {'run': faces, 'inputs': ['image', 'gray'],
+              'params': {'cascade_file': 'haarcascade_frontalface_default.xml', 'scale_factor': 1.1,
+                         'min_neighbors': 5, 'color': [0, 255, 0], 'thickness': 2}},
+}
+
+
+def load_config(path):
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError(f"{path}: reading YAML needs PyYAML (pip install pyyaml), or use a .json config")
+            config = yaml.safe_load(f)
+        else:
+            config = json.load(f)
+    if not isinstance(config, dict) or not config.get('stages'):
+        raise ValueError(f"{path}: expected a mapping with a non-empty 'stages' list")
+    return config
+
+
+def plan(stage_configs):
+    """Stages in an order where every input comes first, implicit ones added.
+
+    Each stage: {'name', 'op', 'inputs', 'params', 'save'}.
+    """
+    stages = {}
+    for raw in stage_configs:
+        raw = dict(raw)
+        op = raw.pop('op', None) or raw.get('name')
+        if op not in OPS:
+            raise ValueError(f"unknown op {op!r}; available: {', '.join(OPS)}")
+        name = raw.pop('name', op)
+        if name == 'image' or name in stages:
+            raise ValueError(f"duplicate stage name {name!r}")
+        inputs = raw.pop('inputs', OPS[op]['inputs'])
+        save = raw.pop('save', True)
+        unknown = set(raw) - set(OPS[op]['params'])
+        if unknown:
+            raise ValueError(f"stage {name!r}: unknown parameters {sorted(unknown)} for op {op!r}")
+        if len(inputs) != len(OPS[op]['inputs']):
+            raise ValueError(f"stage {name!r}: op {op!r} takes {len(OPS[op]['inputs'])} inputs")
+        stages[name] = {'name': name, 'op': op, 'inputs': list(inputs), 'params': dict(OPS[op]['params'], **raw),
+                        'save': bool(save)}
+
+    ordered, state = [], {}
+
+    def visit(name, wanted_by):
+        if name == 'image' or state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"stages depend on each other in a cycle through {name!r}")
+        if name not in stages:
+            if name not in OPS:
+                raise ValueError(f"stage {wanted_by!r}: no stage or op named {name!r}")
+            stages[name] = {'name': name, 'op': name, 'inputs': list(OPS[name]['inputs']),
+                            'params': dict(OPS[name]['params']), 'save': False}
+        state[name] = 'visiting'
+        for dep in stages[name]['inputs']:
+            visit(dep, name)
+        state[name] = 'done'
+        ordered.append(stages[name])
+
+    for name in list(stages):
+        visit(name, name)
+    return ordered
+
+
+def list_images(inputs):
+    """(path, relative path) of every image under the given files/directories."""
+    found = []
+    for root in inputs:
+        if os.path.isfile(root):
+            found.append((root, os.path.basename(root)))
+            continue
+        prefix = os.path.basename(os.path.normpath(root)) if len(inputs) > 1 else ''
+        for folder, dirs, files in os.walk(root):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(folder, name)
+                    found.append((path, os.path.join(prefix, os.path.relpath(path, root))))
+    return found
+
+
+# -- worker side: module globals set once per process by init_worker ---------
+
+_stages = None
+_settings = None
+
+
+def init_worker(stages, settings):
+    global _stages, _settings
+    _stages, _settings = stages, settings
+    if settings['cv_threads'] is not None:
+        cv2.setNumThreads(settings['cv_threads'])
+    for stage in stages:
+        if stage['op'] == 'faces':
+            cascade(stage['params']['cascade_file'])
+
+
+def process_chunk(chunk):
+    """Run every stage on a chunk of (path, rel) pairs and write the outputs.
+
+    Returns (result rows, {stage: seconds}). An image that fails to read or
+    in any stage gets an `error` in its row; the rest of the chunk goes on.
+    """
+    timings = dict.fromkeys(['read'] + [s['name'] for s in _stages] + ['encode', 'write'], 0.0)
+    ext = _settings['format']
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, _settings['jpeg_quality']] if ext in ('.jpg', '.jpeg') else []
+    rows, pending = [], []
+    for path, rel in chunk:
+        start = time.perf_counter()
+        row = {'image': rel}
+        try:
+            # fromfile + imdecode also copes with non-ASCII paths on Windows
+            data = np.fromfile(path, dtype=np.uint8)
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+        except Exception as e:
+            row['error'] = f"cannot read image: {e}"
+            image = None
+        timings['read'] += time.perf_counter() - start
+        if image is None:
+            row.setdefault('error', 'cannot decode image')
+            rows.append(row)
+            continue
+        values = {'image': image}
+        outputs = []
+        try:
+            for stage in _stages:
+                start = time.perf_counter()
+                out = stage['run'](*[values[name] for name in stage['inputs']], **stage['params'])
+                if isinstance(out, tuple):
+                    out, row[stage['name']] = out
+                values[stage['name']] = out
+                timings[stage['name']] += time.perf_counter() - start
+                if stage['save']:
+                    start = time.perf_counter()
+                    _, buf = cv2.imencode(ext, out, encode_params)
+                    outputs.append((os.path.join(_settings['out'], stage['name'], os.path.splitext(rel)[0] + ext), buf))
+                    timings['encode'] += time.perf_counter() - start
+        except Exception as e:
+            row['error'] = f"{stage['name']}: {str(e) or type(e).__name__}".strip()
+        else:
+            pending.extend(outputs)
+        rows.append(row)
+
+    start = time.perf_counter()
+    made = set()
+    for path, buf in pending:
+        folder = os.path.dirname(path)
+        if folder not in made:
+            os.makedirs(folder, exist_ok=True)
+            made.add(folder)
+        buf.tofile(path)
+    timings['write'] += time.perf_counter() - start
+    return rows, timings
+
+# ---------------------------------------------------------------------------
+
+
+def run(inputs, config, out):
+    """Process every image under `inputs` into `out`; returns the report."""
+    settings = {key: config.get(key, default) for key, default in DEFAULTS.items()}
+    settings['out'] = out
+    if settings['cv_threads'] is None and settings['workers'] > 1:
+        settings['cv_threads'] = 1
+    stages = plan(config['stages'])
+    for stage in stages:
+        stage['run'] = OPS[stage['op']]['run']
+    images = list_images(inputs)
+    size = max(1, settings['chunk_size'])
+    chunks = [images[i:i + size] for i in range(0, len(images), size)]
+    os.makedirs(out, exist_ok=True)
+
+    totals = dict.fromkeys(['read'] + [s['name'] for s in stages] + ['encode', 'write'], 0.0)
+    errors = 0
+    start = time.perf_counter()
+    with open(os.path.join(out, 'results.jsonl'), 'w', encoding='utf-8') as results:
+        def collect(chunk_result):
+            nonlocal errors
+            rows, timings = chunk_result
+            for name, seconds in timings.items():
+                totals[name] += seconds
+            errors += sum('error' in row for row in rows)
+            results.write(''.join(json.dumps(row) + '\n' for row in rows))
+
+        if settings['workers'] <= 1:
+            init_worker(stages, settings)
+            for chunk in chunks:
+                collect(process_chunk(chunk))
+        else:
+            with Pool(settings['workers'], initializer=init_worker, initargs=(stages, settings)) as pool:
+                for chunk_result in pool.imap_unordered(process_chunk, chunks):
+                    collect(chunk_result)
+    wall = time.perf_counter() - start
+
+    report = {
+        'images': len(images),
+        'errors': errors,
+        'workers': settings['workers'],
+        'chunk_size': size,
+        'wall_seconds': wall,
+        'images_per_second': len(images) / wall if wall else 0.0,
+        'stages': [{'stage': name, 'seconds': seconds,
+                    'ms_per_image': seconds / len(images) * 1000 if images else 0.0,
+                    'images_per_second': len(images) / seconds if seconds else 0.0}
+                   for name, seconds in totals.items()],
+    }
+    with open(os.path.join(out, 'report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def format_report(report):
+    busy = sum(stage['seconds'] for stage in report['stages']) or 1.0
+    lines = [f"{'stage':<16}{'seconds':>10}{'ms/image':>10}{'images/s':>10}{'share':>8}"]
+    for stage in report['stages']:
+        lines.append(f"{stage['stage']:<16}{stage['seconds']:>10.2f}{stage['ms_per_image']:>10.1f}"
+                     f"{stage['images_per_second']:>10.1f}{stage['seconds'] / busy:>8.0%}")
+    lines.append(f"{report['images']} images ({report['errors']} failed) in {report['wall_seconds']:.2f}s wall, "
+                 f"{report['images_per_second']:.1f} images/s, workers={report['workers']}, "
+                 f"chunks of {report['chunk_size']}")
+    lines.append("(stage seconds are summed over the workers)")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='image files or directories (searched recursively)')
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help='YAML or JSON pipeline config')
+    parser.add_argument('--out', default='out')
+    parser.add_argument('--workers', type=int, help='processes (0 = run in this process); overrides the config')
+    parser.add_argument('--chunk-size', type=int, help='images per task; overrides the config')
+    parser.add_argument('--cv-threads', type=int, help='OpenCV threads per process; overrides the config')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    for key in ('workers', 'chunk_size', 'cv_threads'):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    report = run(args.inputs, config, args.out)
+    print(format_report(report))
+
+
+if __name__ == '__main__':
+    main()
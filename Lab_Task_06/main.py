@@ -1,27 +1,68 @@
 
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify, send_file, url_for
+from werkzeug.utils import secure_filename
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import sys
+import threading
+import uuid
 import cv2
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for common/
+from common.jobs import JobQueue, JobStore, QueueFull
+
 app = Flask(__name__)
 UPLOAD_FOLDER = './images'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+JOB_WORKERS = int(os.environ.get('LAB_WORKERS', '0')) or os.cpu_count() or 1
+JOBS_DB = os.environ.get('LAB_JOBS_DB', 'jobs.sqlite3')
+# Faces are detected on a reduced decode with this longest side (0 = full resolution)
+DETECT_MAX_DIM = int(os.environ.get('LAB_DETECT_MAX_DIM', '1600'))
+
+CASCADE_FILES = {'face': 'haarcascade_frontalface_default.xml', 'eye': 'haarcascade_eye.xml'}
+_local = threading.local()
+
+def get_cascade(name):
+    # One classifier per thread: detectMultiScale isn't safe to share across threads
+    cascades = _local.__dict__.setdefault('cascades', {})
+    if name not in cascades:
+        cascades[name] = cv2.CascadeClassifier(cv2.data.haarcascades + CASCADE_FILES[name])
+    return cascades[name]
 
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+def detect_faces(image_path, full_shape, max_dim=DETECT_MAX_DIM):
+    # JPEG DCT scaling: decode at 1/2, 1/4 or 1/8 size, the first that fits max_dim
+    height, width = full_shape[:2]
+    if not max_dim or max(height, width) <= max_dim:
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    else:
+        factor = 2
+        while factor < 8 and max(height, width) / factor > max_dim:
+            factor *= 2
+        flag = {2: cv2.IMREAD_REDUCED_GRAYSCALE_2, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}[factor]
+        gray = cv2.imread(image_path, flag)
+        while max(gray.shape) > max_dim:
+            gray = cv2.pyrDown(gray)
+    scale_y, scale_x = height / gray.shape[0], width / gray.shape[1]
+    faces = get_cascade('face').detectMultiScale(gray, 1.3, 5)
+    # boxes back in full-resolution pixels
+    return [(int(round(x * scale_x)), int(round(y * scale_y)), int(round(w * scale_x)), int(round(h * scale_y)))
+            for (x, y, w, h) in faces]
 
-def analyze_face(image_path):
+def analyze_face(image_path, output_path=None):
     image = cv2.imread(image_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if image is None:
+        raise ValueError('Could not read image')
 
-    faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+    faces = detect_faces(image_path, image.shape)
     traits = []
 
     for (x, y, w, h) in faces:
+        # eyes are searched at full resolution, but only inside the face
+        face_roi = cv2.cvtColor(image[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)
         cv2.rectangle(image, (x, y), (x+w, y+h), (255, 0, 0), 2)
-        face_roi = gray[y:y+h, x:x+w]
-        color_face_roi = image[y:y+h, x:x+w]
         
-        eyes = eye_cascade.detectMultiScale(face_roi)
+        eyes = get_cascade('eye').detectMultiScale(face_roi)
         eye_positions = [(ex, ey, ew, eh) for (ex, ey, ew, eh) in eyes]
 
         face_width = w
@@ -39,10 +80,29 @@ def analyze_face(image_path):
             "personality": personality
         })
     
-    output_path = UPLOAD_FOLDER + 'processed_image.jpg'
+    output_path = output_path or UPLOAD_FOLDER + 'processed_image.jpg'
     cv2.imwrite(output_path, image)
     return traits, output_path
 
+def analyze_job(image_path, output_path):
+    traits, output_path = analyze_face(image_path, output_path)
+    # numpy ints from OpenCV -> plain numbers so the result can be stored as JSON
+    traits = [{k: (v.item() if hasattr(v, 'item') else v) for k, v in t.items()} for t in traits]
+    return {'traits': traits, 'processed_image': output_path}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    # Created on first job; spawn so workers don't inherit the server's threads
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+jobs = JobQueue(JobStore(JOBS_DB), get_pool)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
@@ -57,5 +117,39 @@ def index():
         return render_template('index.html', traits=traits, processed_image=processed_image)
     return render_template('index.html')
 
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    if 'image' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    file = request.files['image']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    job_name = uuid.uuid4().hex + '_' + secure_filename(file.filename)
+    filepath = os.path.join(UPLOAD_FOLDER, job_name)
+    output_path = os.path.join(UPLOAD_FOLDER, 'processed_' + job_name)
+    file.save(filepath)
+    try:
+        job_id = jobs.submit(analyze_job, (filepath, output_path), files=[filepath, output_path])
+    except QueueFull as e:
+        os.remove(filepath)
+        return jsonify({'error': 'Too many pending jobs, retry later', 'details': str(e)}), 503
+    return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    if job['status'] == 'done':
+        job['result']['processed_image'] = url_for('job_image', job_id=job_id)
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/image')
+def job_image(job_id):
+    job = jobs.get(job_id)
+    if job is None or job['status'] != 'done':
+        return jsonify({'error': 'No image for this job'}), 404
+    return send_file(os.path.abspath(job['result']['processed_image']), mimetype='image/jpeg')
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -1,35 +1,45 @@
-from flask import Flask, render_template, request
-import requests
-from datetime import datetime
+import time
+
+from flask import Flask, render_template, request, jsonify
+
+from news_feed import NEWS_PAGE_SIZE, NewsFeed
 
 app = Flask(__name__)
 
+# Articles come from pre-formatted snapshots; the refresher keeps them current
+feed = NewsFeed()
+feed.start()
+
+@app.template_filter('timeago')
+def timeago(timestamp):
+    minutes = int(time.time() - timestamp) // 60
+    if minutes < 1:
+        return 'just now'
+    if minutes < 60:
+        return f'{minutes} min ago'
+    return f'{minutes // 60} h ago'
+
+def page_args():
+    q = request.args.get('q', '')
+    page = request.args.get('page', 1, type=int) or 1
+    page_size = request.args.get('page_size', NEWS_PAGE_SIZE, type=int) or NEWS_PAGE_SIZE
+    return q, page, page_size
+
 @app.route('/')
 def home():
-    url = "https://newsapi.org/v2/everything?q=tesla&from=2025-02-18&sortBy=publishedAt&apiKey=ee31c50e71c04d4fa703da4f3b53b62e"
-    
-    try:
-        response = requests.get(url)
-        news_data = response.json()
-        
-        if news_data.get("status") == "ok":
-            articles = news_data.get("articles", [])
-        else:
-            articles = []
-        
-        # Format the publish date for each article
-        for article in articles:
-            if article.get("publishedAt"):
-                date_obj = datetime.strptime(article["publishedAt"], "%Y-%m-%dT%H:%M:%SZ")
-                article["formatted_date"] = date_obj.strftime("%B %d, %Y")
-            else:
-                article["formatted_date"] = "Unknown date"
-                
-    except Exception as e:
-        print(f"Error fetching news: {e}")
-        articles = []
-
-    return render_template('index.html', articles=articles)
+    result = feed.get_page(*page_args())
+    if result['error']:
+        print(f"Error fetching news: {result['error']}")
+    return render_template('index.html', **result)
+
+@app.route('/api/news')
+def news_api():
+    result = feed.get_page(*page_args())
+    return jsonify(result), 502 if result['error'] and not result['articles'] else 200
+
+@app.route('/metrics/feed')
+def feed_metrics():
+    return jsonify(feed.stats())
 
 if __name__ == '__main__':
     app.run(debug=True)
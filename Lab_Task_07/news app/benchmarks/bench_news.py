@@ -0,0 +1,119 @@
+"""Page latency and upstream traffic: fetch-per-request vs snapshot feed.
+
+Run from the news app folder (starts its own stub NewsAPI, no network needed):
+    python benchmarks/bench_news.py [--latency 0.3] [--requests 50]
+
+`original` repeats the old `/` handler: one NewsAPI call, strptime over every
+article and the whole list rendered, on every hit. `snapshot` is the new `/`
+through the Flask test client, paging through the pre-formatted snapshot.
+`stale` makes the snapshot older than the refresh interval first, so every
+request is served stale while the refresher revalidates (304s) behind it.
+The last lines show a new article reaching the page after POST /publish, and
+pages still being served while the upstream answers 429.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from stub_server import start_stub
+
+
+def original_page(app, url, render_template):
+    response = requests.get(url, params={'q': 'tesla', 'sortBy': 'publishedAt', 'apiKey': 'stub'})
+    articles = response.json().get('articles', [])
+    for article in articles:
+        if article.get('publishedAt'):
+            date_obj = datetime.strptime(article['publishedAt'], '%Y-%m-%dT%H:%M:%SZ')
+            article['formatted_date'] = date_obj.strftime('%B %d, %Y')
+        else:
+            article['formatted_date'] = 'Unknown date'
+    with app.test_request_context('/'):
+        return render_template('index.html', articles=articles, query='tesla', page=1, pages=1,
+                               total=len(articles), fetched_at=None, stale=False)
+
+
+def timed(fn, n):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label, samples, upstream):
+    ms = sorted(s * 1000 for s in samples)
+    print(f"{label:<10}{statistics.median(ms):>10.2f}{ms[int(len(ms) * 0.99) - 1]:>10.2f}{upstream:>10}")
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.3, help='stub latency per search, seconds')
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--articles', type=int, default=100)
+    args = parser.parse_args()
+
+    stub, url = start_stub(latency=args.latency, article_count=args.articles)
+    os.environ['NEWS_API_URL'] = url
+    os.environ['NEWS_SNAPSHOT_DIR'] = tempfile.mkdtemp(prefix='news-snapshots-')
+    import app as news_app
+    from flask import render_template
+    client = news_app.app.test_client()
+    feed = news_app.feed
+    # The refresher fetches the default query as soon as the app starts
+    wait_for(lambda: feed.snapshot('tesla') is not None)
+
+    print(f"{args.requests} requests, {args.latency * 1000:.0f} ms upstream latency, {args.articles} articles\n")
+    print(f"{'':<10}{'p50 ms':>10}{'p99 ms':>10}{'upstream':>10}")
+
+    stub.reset()
+    samples = timed(lambda i: original_page(news_app.app, url, render_template), args.requests)
+    report('original', samples, stub.stats()['requests'])
+
+    stub.reset()
+    samples = timed(lambda i: client.get(f'/?page={i % 5 + 1}'), args.requests)
+    report('snapshot', samples, stub.stats()['requests'])
+
+    stub.reset()
+    feed.refresh_interval = 0.05
+    time.sleep(0.1)
+    samples = timed(lambda i: client.get(f'/?page={i % 5 + 1}'), args.requests)
+    wait_for(lambda: stub.stats()['requests'] > 0 and not feed.stats()['queued'])
+    report('stale', samples, stub.stats()['requests'])
+    print(f"          upstream answers 304: {stub.stats()['not_modified']}")
+    feed.refresh_interval = 0.5
+
+    stub.publish()
+    new_title = f"Tesla story #{args.articles + 1}"
+    seen = wait_for(lambda: new_title in client.get('/').get_data(as_text=True))
+    print(f"\nafter /publish the new article reached the page: {seen}")
+
+    requests.post(url.replace('/v2/everything', '/fail'), params={'n': 1000})
+    time.sleep(0.6)
+    pages = [client.get(f'/?page={p}') for p in range(1, 4)]
+    ok = all(r.status_code == 200 and 'Tesla story' in r.get_data(as_text=True) for r in pages)
+    print(f"with the upstream answering 429, pages still served from the snapshot: {ok}")
+    feed.stop()
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
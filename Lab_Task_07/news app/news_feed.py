@@ -0,0 +1,292 @@
+"""Pre-formatted NewsAPI snapshots, refreshed in the background.
+
+    feed = NewsFeed()
+    feed.start()                                   # background refresher
+    page = feed.get_page('tesla', page=2)          # never waits on NewsAPI once warm
+
+Every keyword query has a snapshot: the articles already formatted for the
+template, plus the ETag / Last-Modified the upstream sent with them. Snapshots
+live in memory and as JSON files in NEWS_SNAPSHOT_DIR, so a restart serves the
+last known articles at once. Pages are served from the snapshot even when it
+is older than NEWS_REFRESH_INTERVAL (stale-while-revalidate): the stale page
+goes out immediately and a refresh is queued. Only a query that has no
+snapshot at all waits for the upstream. The refresher re-polls the default
+query and every query asked for within NEWS_QUERY_TTL, with conditional
+requests so unchanged results cost a 304.
+"""
+import hashlib
+import json
+import math
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+NEWS_API_URL = os.environ.get('NEWS_API_URL', 'https://newsapi.org/v2/everything')
+NEWS_API_KEY = os.environ.get('NEWS_API_KEY', 'ee31c50e71c04d4fa703da4f3b53b62e')
+NEWS_DEFAULT_QUERY = os.environ.get('NEWS_DEFAULT_QUERY', 'tesla')
+NEWS_REFRESH_INTERVAL = float(os.environ.get('NEWS_REFRESH_INTERVAL', '300'))
+# Queries nobody asked for in this long are no longer refreshed or kept in memory
+NEWS_QUERY_TTL = float(os.environ.get('NEWS_QUERY_TTL', '3600'))
+NEWS_SNAPSHOT_DIR = os.environ.get('NEWS_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+NEWS_PAGE_SIZE = int(os.environ.get('NEWS_PAGE_SIZE', '12'))
+NEWS_MAX_PAGE_SIZE = 100
+# NewsAPI's largest page; one upstream call fills the whole snapshot
+NEWS_FETCH_SIZE = int(os.environ.get('NEWS_FETCH_SIZE', '100'))
+NEWS_TIMEOUT = (3.05, 15)
+# After a failed refresh, wait this long before trying that query again
+NEWS_RETRY_AFTER = float(os.environ.get('NEWS_RETRY_AFTER', '60'))
+
+
+def query_key(q):
+    return ' '.join(q.split()).casefold()
+
+
+def format_date(published_at):
+    if not published_at:
+        return 'Unknown date'
+    try:
+        return datetime.fromisoformat(published_at.replace('Z', '+00:00')).strftime('%B %d, %Y')
+    except ValueError:
+        return 'Unknown date'
+
+
+def format_article(article):
+    """Only the fields the template shows, dates already formatted."""
+    return {
+        'title': article.get('title') or '',
+        'description': article.get('description') or '',
+        'url': article.get('url') or '',
+        'urlToImage': article.get('urlToImage'),
+        'source': (article.get('source') or {}).get('name', ''),
+        'publishedAt': article.get('publishedAt'),
+        'formatted_date': format_date(article.get('publishedAt')),
+    }
+
+
+class NewsFeed:
+    def __init__(self, api_url=NEWS_API_URL, api_key=NEWS_API_KEY, snapshot_dir=NEWS_SNAPSHOT_DIR,
+                 refresh_interval=NEWS_REFRESH_INTERVAL, default_query=NEWS_DEFAULT_QUERY):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.snapshot_dir = snapshot_dir
+        self.refresh_interval = refresh_interval
+        self.default_query = default_query
+        self.session = requests.Session()
+        self._snapshots = {}      # query key -> snapshot dict
+        self._last_access = {}    # query key -> (query as typed, time)
+        self._lock = threading.Lock()
+        # One lock per query so concurrent misses trigger one upstream call
+        self._fetch_locks = {}
+        self._refresh_queue = queue.Queue()
+        self._queued = set()
+        self._failed = {}         # query key -> time of the last failed refresh
+        self._thread = None
+        self._stop = threading.Event()
+        self.upstream_calls = 0
+        self.not_modified = 0
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    # -- snapshots ---------------------------------------------------------
+
+    def _path(self, key):
+        return os.path.join(self.snapshot_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key, snapshot):
+        path = self._path(key)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+
+    def snapshot(self, q):
+        """Current snapshot for `q` from memory or disk, without fetching."""
+        key = query_key(q)
+        with self._lock:
+            snap = self._snapshots.get(key)
+        if snap is None:
+            snap = self._load(key)
+            if snap is not None:
+                with self._lock:
+                    snap = self._snapshots.setdefault(key, snap)
+        return snap
+
+    # -- upstream ----------------------------------------------------------
+
+    def refresh(self, q, max_age=0.0):
+        """Fetch `q` now (conditionally if we have a snapshot) and return the
+        new snapshot. A snapshot checked less than `max_age` seconds ago, e.g.
+        by a concurrent caller we waited for, is returned as it is."""
+        key = query_key(q)
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            old = self.snapshot(q)
+            if old is not None and time.time() - old['checked_at'] < max_age:
+                return old
+            headers = {'X-Api-Key': self.api_key}
+            if old is not None and old.get('etag'):
+                headers['If-None-Match'] = old['etag']
+            if old is not None and old.get('last_modified'):
+                headers['If-Modified-Since'] = old['last_modified']
+            params = {'q': q, 'sortBy': 'publishedAt', 'pageSize': NEWS_FETCH_SIZE}
+            self.upstream_calls += 1
+            try:
+                r = self.session.get(self.api_url, params=params, headers=headers, timeout=NEWS_TIMEOUT)
+            except requests.RequestException:
+                self._failed[key] = time.time()
+                raise
+            now = time.time()
+            if r.status_code == 304 and old is not None:
+                self.not_modified += 1
+                snap = dict(old, checked_at=now)
+            else:
+                data = r.json() if r.headers.get('Content-Type', '').startswith('application/json') else {}
+                if r.status_code != 200 or data.get('status') != 'ok':
+                    self._failed[key] = now
+                    raise RuntimeError(data.get('message') or f'NewsAPI answered {r.status_code}')
+                snap = {
+                    'query': q,
+                    'articles': [format_article(a) for a in data.get('articles', [])],
+                    'total_results': data.get('totalResults', 0),
+                    'etag': r.headers.get('ETag'),
+                    'last_modified': r.headers.get('Last-Modified'),
+                    'fetched_at': now,
+                    'checked_at': now,
+                }
+            with self._lock:
+                self._snapshots[key] = snap
+                self._failed.pop(key, None)
+            self._save(key, snap)
+            return snap
+
+    def _needs_refresh(self, key, snap, now):
+        if snap is not None and now - snap['checked_at'] <= self.refresh_interval:
+            return False
+        return now - self._failed.get(key, 0.0) > NEWS_RETRY_AFTER
+
+    def get_page(self, q=None, page=1, page_size=NEWS_PAGE_SIZE):
+        """One page of articles for `q`. Stale snapshots are served as they are
+        and queued for refresh; only a query never seen before waits."""
+        q = ' '.join((q or '').split()) or self.default_query
+        key = query_key(q)
+        page_size = max(1, min(page_size, NEWS_MAX_PAGE_SIZE))
+        now = time.time()
+        with self._lock:
+            self._last_access[key] = (q, now)
+
+        error = None
+        snap = self.snapshot(q)
+        if snap is None:
+            if self._needs_refresh(key, None, now):
+                try:
+                    snap = self.refresh(q, max_age=self.refresh_interval)
+                except Exception as e:
+                    error = str(e)
+            else:
+                error = 'News is temporarily unavailable, try again shortly'
+        elif self._needs_refresh(key, snap, now):
+            self.schedule(q)
+
+        articles = snap['articles'] if snap else []
+        pages = max(1, math.ceil(len(articles) / page_size))
+        page = max(1, min(page, pages))
+        return {
+            'query': q,
+            'articles': articles[(page - 1) * page_size:page * page_size],
+            'page': page,
+            'pages': pages,
+            'page_size': page_size,
+            'total': len(articles),
+            'fetched_at': snap['fetched_at'] if snap else None,
+            'stale': bool(snap) and now - snap['checked_at'] > self.refresh_interval,
+            'error': error,
+        }
+
+    # -- background refresher ----------------------------------------------
+
+    def schedule(self, q):
+        """Queue a refresh of `q` unless one is already queued."""
+        key = query_key(q)
+        with self._lock:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+        self._refresh_queue.put(q)
+        self.start()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='news-refresh', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._refresh_queue.put(None)
+
+    def _due(self):
+        """Queries whose snapshot is older than the refresh interval and that
+        someone asked for recently; forgets the rest."""
+        now = time.time()
+        with self._lock:
+            recent = {query_key(self.default_query): self.default_query}
+            forgotten = []
+            for key, (q, seen) in list(self._last_access.items()):
+                if now - seen <= NEWS_QUERY_TTL:
+                    recent.setdefault(key, q)
+                elif key not in recent:
+                    forgotten.append(key)
+                    del self._last_access[key]
+                    self._snapshots.pop(key, None)
+                    self._fetch_locks.pop(key, None)
+                    self._failed.pop(key, None)
+        for key in forgotten:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        return [q for key, q in recent.items() if self._needs_refresh(key, self.snapshot(q), now)]
+
+    def _run(self):
+        next_sweep = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() >= next_sweep:
+                for q in self._due():
+                    self.schedule(q)
+                next_sweep = time.monotonic() + max(1.0, self.refresh_interval / 4)
+            try:
+                q = self._refresh_queue.get(timeout=max(0.1, next_sweep - time.monotonic()))
+            except queue.Empty:
+                continue
+            if q is None:
+                break
+            with self._lock:
+                self._queued.discard(query_key(q))
+            try:
+                self.refresh(q, max_age=self.refresh_interval)
+            except Exception as e:
+                # Keep serving the old snapshot; the next sweep tries again
+                print(f"Error refreshing news for {q!r}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queries': len(self._last_access),
+                'snapshots': len(self._snapshots),
+                'queued': len(self._queued),
+                'upstream_calls': self.upstream_calls,
+                'not_modified': self.not_modified,
+            }
@@ -0,0 +1,158 @@
+"""Local stand-in for NewsAPI's /v2/everything.
+
+    python stub_server.py --port 8766 --latency 0.5
+    NEWS_API_URL=http://127.0.0.1:8766/v2/everything python app.py
+
+Every query returns `--articles` made-up articles mentioning it. Responses
+carry an ETag and Last-Modified and answer 304 to a matching If-None-Match /
+If-Modified-Since. POST /publish adds a new article to every query (new ETag).
+POST /fail?n=3 makes the next n searches answer 429 like an exhausted quota.
+GET /stats returns {'requests', 'not_modified', 'errors'}; POST /stats/reset
+clears them.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def fake_articles(q, version, count, published):
+    articles = []
+    for i in range(count + version):
+        when = published - timedelta(hours=i)
+        articles.append({
+            'source': {'id': None, 'name': f'Stub Daily {i % 5}'},
+            'author': 'Stub Writer',
+            'title': f'{q.title()} story #{count + version - i}',
+            'description': f'Everything about {q} you need to know, part {count + version - i}.',
+            'url': f'https://example.com/{hashlib.sha1(f"{q}{i}".encode()).hexdigest()[:12]}',
+            'urlToImage': None if i % 4 == 3 else f'https://example.com/img/{i}.jpg',
+            'publishedAt': when.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'content': '',
+        })
+    return articles
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body in one segment; avoids delayed-ACK stalls on keep-alive
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == '/publish':
+            self.server.publish()
+        elif url.path == '/fail':
+            self.server.fail_next = int(query.get('n', 1))
+        elif url.path == '/stats/reset':
+            self.server.reset()
+        else:
+            return self.send_json(404, {'status': 'error', 'message': 'not found'})
+        self.send_json(200, {'status': 'ok'})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        server = self.server
+        if url.path == '/stats':
+            return self.send_json(200, server.stats())
+        if url.path != '/v2/everything':
+            return self.send_json(404, {'status': 'error', 'message': 'not found'})
+
+        time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+            failing = server.fail_next > 0
+            server.fail_next -= failing
+            version, published = server.version, server.published
+        if failing:
+            server.errors += 1
+            return self.send_json(429, {'status': 'error', 'code': 'rateLimited', 'message': 'stub rate limit'})
+        if not self.headers.get('X-Api-Key') and 'apiKey' not in query:
+            return self.send_json(401, {'status': 'error', 'code': 'apiKeyMissing', 'message': 'no key'})
+        q = query.get('q', '').strip()
+        if not q:
+            return self.send_json(400, {'status': 'error', 'code': 'parametersMissing', 'message': 'q is required'})
+
+        etag = '"%s"' % hashlib.sha1(f'{q.casefold()}:{version}'.encode('utf-8')).hexdigest()
+        last_modified = format_datetime(published, usegmt=True)
+        headers = [('ETag', etag), ('Last-Modified', last_modified)]
+        since = self.headers.get('If-Modified-Since')
+        if self.headers.get('If-None-Match') == etag or (
+                since and not self.headers.get('If-None-Match') and parsedate_to_datetime(since) >= published):
+            server.not_modified += 1
+            return self.send_json(304, None, headers)
+
+        articles = fake_articles(q, version, server.article_count, published)
+        page_size = min(int(query.get('pageSize', 100)), 100)
+        self.send_json(200, {'status': 'ok', 'totalResults': len(articles), 'articles': articles[:page_size]}, headers)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, article_count=60):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.article_count = article_count
+        self.lock = threading.Lock()
+        self.version = 0
+        self.published = datetime.now(timezone.utc).replace(microsecond=0)
+        self.fail_next = 0
+        self.reset()
+
+    def publish(self):
+        with self.lock:
+            self.version += 1
+            # Last-Modified has 1 s resolution; keep it strictly increasing
+            self.published = max(datetime.now(timezone.utc).replace(microsecond=0),
+                                 self.published + timedelta(seconds=1))
+
+    def stats(self):
+        return {'requests': self.requests, 'not_modified': self.not_modified, 'errors': self.errors}
+
+    def reset(self):
+        self.requests = self.not_modified = self.errors = 0
+
+
+def start_stub(port=0, latency=0.0, article_count=60):
+    """Serve in a daemon thread; returns (server, search_url)."""
+    server = StubServer(('127.0.0.1', port), latency, article_count)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/v2/everything'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds added to every search')
+    parser.add_argument('--articles', type=int, default=60, help='articles per query')
+    args = parser.parse_args()
+    server = StubServer(('127.0.0.1', args.port), args.latency, args.articles)
+    print(f'stub NewsAPI on http://127.0.0.1:{args.port}/v2/everything (latency {args.latency}s)')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""NewsFeed against stub_server.py (no network needed).
+
+Run from the news app folder:
+    python -m pytest tests        (or: python -m unittest discover tests)
+"""
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import news_feed
+from news_feed import NewsFeed
+
+# Loaded under its own name: other apps in this repo have a stub_server.py too
+_spec = importlib.util.spec_from_file_location('news_stub_server', os.path.join(APP_DIR, 'stub_server.py'))
+stub_server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(stub_server)
+
+ARTICLES = 30
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met in time')
+        time.sleep(0.02)
+
+
+class StubTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server, self.url = stub_server.start_stub(article_count=ARTICLES)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.tmp = tempfile.mkdtemp(prefix='news-test-')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+
+    def feed(self, refresh_interval=300):
+        feed = NewsFeed(self.url, 'stub', self.tmp, refresh_interval)
+        self.addCleanup(feed.stop)
+        return feed
+
+
+class RevalidationTest(StubTestCase):
+    def test_unchanged_results_answer_304_to_the_etag(self):
+        feed = self.feed()
+        first = feed.refresh('tesla')
+        self.assertEqual(len(first['articles']), ARTICLES)
+        self.assertTrue(first['etag'])
+        second = feed.refresh('tesla')
+        self.assertEqual(self.server.not_modified, 1)
+        self.assertEqual(feed.not_modified, 1)
+        self.assertEqual(second['articles'], first['articles'])
+        self.assertEqual(second['fetched_at'], first['fetched_at'])
+        self.assertGreaterEqual(second['checked_at'], first['checked_at'])
+
+    def test_if_modified_since_alone_answers_304(self):
+        feed = self.feed()
+        # Drop the ETag so only If-Modified-Since goes out
+        feed.refresh('tesla')['etag'] = None
+        feed.refresh('tesla')
+        self.assertEqual(self.server.not_modified, 1)
+        self.assertEqual(feed.not_modified, 1)
+
+    def test_new_article_replaces_the_snapshot(self):
+        feed = self.feed()
+        old = feed.refresh('tesla')
+        self.server.publish()
+        new = feed.refresh('tesla')
+        self.assertEqual(self.server.not_modified, 0)
+        self.assertNotEqual(new['etag'], old['etag'])
+        self.assertEqual(len(new['articles']), ARTICLES + 1)
+        self.assertEqual(feed.get_page('tesla')['articles'][0]['title'], f'Tesla story #{ARTICLES + 1}')
+
+
+class StaleWhileRevalidateTest(StubTestCase):
+    def test_stale_page_is_served_while_a_refresh_is_queued(self):
+        feed = self.feed(refresh_interval=0.2)
+        first = feed.get_page('tesla')
+        self.assertFalse(first['stale'])
+        time.sleep(0.3)
+        self.server.publish()
+        self.server.latency = 0.5
+
+        start = time.monotonic()
+        page = feed.get_page('tesla')
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertTrue(page['stale'])
+        self.assertEqual(page['articles'], first['articles'])
+
+        # The refresher picks the query up and brings in the new article
+        wait_for(lambda: len(feed.snapshot('tesla')['articles']) == ARTICLES + 1)
+        self.assertEqual(self.server.requests, 2)
+        self.assertFalse(feed.get_page('tesla')['stale'])
+
+
+class RestartTest(StubTestCase):
+    def test_snapshot_is_read_back_from_disk(self):
+        before = self.feed().get_page('Tesla')
+        feed = self.feed()
+        after = feed.get_page('  tesla ')
+        self.assertEqual(after['articles'], before['articles'])
+        self.assertEqual(after['fetched_at'], before['fetched_at'])
+        self.assertEqual(feed.upstream_calls, 0)
+        self.assertEqual(self.server.requests, 1)
+
+
+class PagingTest(StubTestCase):
+    def test_pages_are_clamped_to_the_snapshot(self):
+        feed = self.feed()
+        page = feed.get_page('tesla', page=1, page_size=12)
+        self.assertEqual((page['page'], page['pages'], page['total'], len(page['articles'])), (1, 3, ARTICLES, 12))
+        last = feed.get_page('tesla', page=3, page_size=12)
+        self.assertEqual(len(last['articles']), ARTICLES - 24)
+        self.assertEqual(feed.get_page('tesla', page=99, page_size=12)['page'], 3)
+        self.assertEqual(feed.get_page('tesla', page=0, page_size=12)['articles'], page['articles'])
+
+    def test_page_size_is_clamped(self):
+        feed = self.feed()
+        tiny = feed.get_page('tesla', page_size=0)
+        self.assertEqual((tiny['page_size'], tiny['pages'], len(tiny['articles'])), (1, ARTICLES, 1))
+        huge = feed.get_page('tesla', page_size=10 ** 6)
+        self.assertEqual((huge['page_size'], huge['pages']), (news_feed.NEWS_MAX_PAGE_SIZE, 1))
+        self.assertEqual(self.server.requests, 1)
+
+    def test_queries_differing_in_case_and_spacing_share_a_snapshot(self):
+        feed = self.feed()
+        page = feed.get_page('  Electric   CARS ')
+        self.assertEqual(page['query'], 'Electric CARS')
+        self.assertEqual(feed.get_page('electric cars')['articles'], page['articles'])
+        self.assertEqual(self.server.requests, 1)
+
+    def test_empty_query_uses_the_default(self):
+        feed = self.feed()
+        self.assertEqual(feed.get_page('   ')['query'], feed.default_query)
+        self.assertEqual(feed.get_page(None)['query'], feed.default_query)
+        self.assertEqual(self.server.requests, 1)
+
+
+class BackoffTest(StubTestCase):
+    def test_failed_query_is_not_retried_before_retry_after(self):
+        feed = self.feed()
+        self.server.fail_next = 1
+        with mock.patch.object(news_feed, 'NEWS_RETRY_AFTER', 0.3):
+            page = feed.get_page('tesla')
+            self.assertEqual(page['articles'], [])
+            self.assertIn('stub rate limit', page['error'])
+            # Inside the back-off window the upstream is left alone
+            page = feed.get_page('tesla')
+            self.assertEqual(page['error'], 'News is temporarily unavailable, try again shortly')
+            self.assertEqual(self.server.requests, 1)
+            time.sleep(0.4)
+            page = feed.get_page('tesla')
+        self.assertIsNone(page['error'])
+        self.assertEqual(page['total'], ARTICLES)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_failed_refresh_keeps_serving_the_old_snapshot(self):
+        feed = self.feed(refresh_interval=0.2)
+        first = feed.get_page('tesla')
+        time.sleep(0.3)
+        self.server.fail_next = 1
+        with mock.patch.object(news_feed, 'NEWS_RETRY_AFTER', 60):
+            page = feed.get_page('tesla')
+            self.assertEqual(page['articles'], first['articles'])
+            # Once the refresher has recorded the failure
+            wait_for(lambda: 'tesla' in feed._failed)
+            self.assertEqual(self.server.errors, 1)
+            time.sleep(0.3)
+            # Still stale, but no new upstream call inside the back-off window
+            page = feed.get_page('tesla')
+            self.assertTrue(page['stale'])
+            self.assertIsNone(page['error'])
+            self.assertEqual(page['articles'], first['articles'])
+            self.assertEqual(self.server.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,27 @@
-from flask import Flask, render_template, request, jsonify, url_for
+from flask import Flask, Response, render_template, request, jsonify, url_for
 from werkzeug.utils import secure_filename
 import os
 import time
 import traceback
 import logging
+import json
+import sys
+import tempfile
 
-from utils.face_utils import load_reference_encodings, process_image_file
+from utils.face_utils import (OUTPUT_QUALITY, StageTimer, analyze_image, encode_image, open_gallery,
+                              output_format, output_name, process_image_file)
+from utils.batch import LazyPool, iter_images, process_upload, run_batch
+
+# Repo root, for common/ (the job queue is shared with Lab_Task_06)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from common.jobs import JobQueue, JobStore, QueueFull
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'processed')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+REFERENCE_DIR = os.path.join(BASE_DIR, 'reference')
+# Cached reference encodings (encodings.npy + gallery.json)
+GALLERY_DIR = os.environ.get('FACEAPP_GALLERY_DIR', os.path.join(BASE_DIR, 'gallery_store'))
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -17,8 +29,16 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 logging.basicConfig(level=logging.INFO)
 
 
-# Load known face encodings from the `reference/` folder
-known_encodings, known_names = load_reference_encodings(os.path.join(BASE_DIR, 'reference'))
+# Load known face encodings from the `reference/` folder; only new or changed
+# images are encoded, the rest come from GALLERY_DIR
+gallery = open_gallery(REFERENCE_DIR, GALLERY_DIR)
+
+# Worker processes for /upload/batch and /jobs, started (and warmed up) on first use
+batch_pool = LazyPool(REFERENCE_DIR, GALLERY_DIR)
+
+# Background jobs: results in SQLite, processed images deleted after JOB_TTL
+JOBS_DB = os.environ.get('FACEAPP_JOBS_DB', os.path.join(BASE_DIR, 'jobs.sqlite3'))
+jobs = JobQueue(JobStore(JOBS_DB), batch_pool.get)
 
 
 @app.route('/')
@@ -28,31 +48,183 @@ def index():
 
 @app.route('/upload', methods=['POST'])
 def upload():
+    """Form field `image`. Optional form/query fields:
+
+    output   file (default: annotated image saved under static/processed),
+             none (JSON only, nothing drawn or written),
+             raw  (the annotated image itself as the response body, faces in
+                   the X-Faces header)
+    format   jpeg | webp | png for the annotated image (default: upload's type)
+    quality  JPEG/WebP quality, 1-100
+    max_dim  shrink the annotated image so its longest side fits
+    """
     if 'image' not in request.files:
         return jsonify({'error': 'No file part'}), 400
     file = request.files['image']
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
+    output = request.values.get('output', 'file')
+    if output not in ('file', 'none', 'raw'):
+        return jsonify({'error': 'output must be file, none or raw'}), 400
+    image_format = request.values.get('format')
+    if image_format and output_format(image_format) != image_format.lower().replace('jpg', 'jpeg'):
+        return jsonify({'error': 'format must be jpeg, webp or png'}), 400
+    try:
+        quality = int(request.values.get('quality', OUTPUT_QUALITY))
+        max_dim = int(request.values.get('max_dim', 0))
+    except ValueError:
+        return jsonify({'error': 'quality and max_dim must be integers'}), 400
 
     filename = secure_filename(file.filename)
-    timestamp = int(time.time() * 1000)
-    out_name = f"processed_{timestamp}_{filename}"
-    out_path = os.path.join(app.config['UPLOAD_FOLDER'], out_name)
-
+    timer = StageTimer()
     try:
-        # Process and annotate the image. Returns list of detected faces with names.
-        faces = process_image_file(file, known_encodings, known_names, out_path)
-
-        # Build URL for the processed image
-        image_url = url_for('static', filename=f'processed/{out_name}')
-
-        return jsonify({'image': image_url, 'faces': faces})
+        if output == 'none':
+            faces = process_image_file(file, gallery, None, timer=timer)
+            response = jsonify({'faces': faces, 'timings': timer.stages})
+        elif output == 'raw':
+            with timer.stage('read'):
+                data = file.read()
+            faces, img = analyze_image(data, gallery, timer=timer)
+            image_format = output_format(image_format or filename)
+            with timer.stage('write'):
+                body = encode_image(img, image_format, quality, max_dim)
+            response = Response(body, mimetype='image/' + image_format)
+            response.headers['X-Faces'] = json.dumps(faces)
+        else:
+            timestamp = int(time.time() * 1000)
+            out_name = output_name(f"processed_{timestamp}_{filename}", image_format)
+            out_path = os.path.join(app.config['UPLOAD_FOLDER'], out_name)
+
+            # Process and annotate the image. Returns list of detected faces with names.
+            faces = process_image_file(file, gallery, out_path, image_format=image_format,
+                                       quality=quality, max_dim=max_dim, timer=timer)
+
+            # Build URL for the processed image
+            image_url = url_for('static', filename=f'processed/{out_name}')
+
+            response = jsonify({'image': image_url, 'faces': faces, 'timings': timer.stages})
+        response.headers['Server-Timing'] = timer.server_timing()
+        logging.info('upload %s (%s): %s', filename, output, timer.stages)
+        return response
     except Exception as e:
         tb = traceback.format_exc()
         logging.error('Error processing upload: %s', tb)
         return jsonify({'error': 'Processing error', 'details': str(e), 'trace': tb}), 500
 
 
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    """Many images (and/or zips of images) in any file fields.
+
+    Streams one JSON line per image as it finishes, then a summary line.
+    """
+    uploads = [f for f in request.files.values() if f.filename]
+    if not uploads:
+        return jsonify({'error': 'No file part'}), 400
+    # The request's own upload files are closed when the view returns, before
+    # the response has been streamed, so keep private copies
+    files = []
+    for f in uploads:
+        copy = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        f.save(copy)
+        copy.seek(0)
+        files.append((f.filename, copy))
+    pool = batch_pool.get()
+    static_url = url_for('static', filename='processed/')
+
+    def generate():
+        start = time.perf_counter()
+        count = errors = 0
+        try:
+            for result in run_batch(pool, iter_images(files), app.config['UPLOAD_FOLDER']):
+                count += 1
+                if 'error' in result:
+                    errors += 1
+                else:
+                    result['image'] = static_url + result.pop('output')
+                yield json.dumps(result) + '\n'
+        finally:
+            for _, copy in files:
+                copy.close()
+        elapsed = time.perf_counter() - start
+        yield json.dumps({'done': True, 'images': count, 'errors': errors, 'seconds': round(elapsed, 3),
+                          'images_per_sec': round(count / elapsed, 2) if elapsed else None}) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Like /upload, but returns a job id at once; poll /jobs/<id> for the result."""
+    if 'image' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    file = request.files['image']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+
+    filename = secure_filename(file.filename)
+    out_name = output_name(f"processed_{int(time.time() * 1000)}_{filename}")
+    out_path = os.path.join(app.config['UPLOAD_FOLDER'], out_name)
+    try:
+        job_id = jobs.submit(process_upload, (filename, file.read(), app.config['UPLOAD_FOLDER'], out_name),
+                             files=[out_path])
+    except QueueFull as e:
+        return jsonify({'error': 'Too many pending jobs, retry later', 'details': str(e)}), 503
+    return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    result = job['result']
+    if result and 'error' in result:
+        # process_upload reports a bad image as a result, not an exception
+        job['status'], job['error'] = 'failed', result.pop('error')
+    elif result and 'output' in result:
+        result['image'] = url_for('static', filename=f"processed/{result.pop('output')}")
+    return jsonify(job)
+
+
+@app.route('/gallery', methods=['GET'])
+def gallery_list():
+    return jsonify({'names': gallery.names(), 'encodings': len(gallery)})
+
+
+@app.route('/gallery', methods=['POST'])
+def gallery_add():
+    """Add (or replace) a person: form fields `name` and `image`."""
+    file = request.files.get('image')
+    name = secure_filename(request.form.get('name', ''))
+    if file is None or file.filename == '':
+        return jsonify({'error': 'No file part'}), 400
+    if not name:
+        return jsonify({'error': 'Missing name'}), 400
+    ext = os.path.splitext(secure_filename(file.filename))[1].lower() or '.jpg'
+    # A new image for an existing person replaces the old one
+    gallery.remove(name)
+    stats = gallery.add(name, file.read(), ext)
+    if name not in gallery.names():
+        gallery.remove(name)
+        return jsonify({'error': 'No face found in image', 'name': name}), 422
+    return jsonify({'name': name, 'changes': stats, 'encodings': len(gallery)})
+
+
+@app.route('/gallery/<name>', methods=['DELETE'])
+def gallery_remove(name):
+    removed = gallery.remove(secure_filename(name))
+    if not removed:
+        return jsonify({'error': 'Unknown name'}), 404
+    return jsonify({'name': name, 'files_removed': removed, 'encodings': len(gallery)})
+
+
+@app.route('/gallery/reload', methods=['POST'])
+def gallery_reload():
+    """Re-scan reference/ after copying files in by hand."""
+    return jsonify({'changes': gallery.refresh(), 'encodings': len(gallery)})
+
+
 if __name__ == '__main__':
     # Run dev server
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,54 @@
+"""Run face detection / recognition over many images from the command line.
+
+Usage:
+    python batch_process.py photos/*.jpg more.zip [--workers 4] [--out static/processed]
+
+Prints one JSON line per image as it finishes (same format as /upload/batch),
+then a summary line with images/sec.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from utils.batch import BATCH_WORKERS, PENDING_PER_WORKER, create_pool, iter_images, run_batch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def open_inputs(paths):
+    for path in paths:
+        with open(path, 'rb') as f:
+            yield os.path.basename(path), f
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch face detection / recognition.')
+    parser.add_argument('inputs', nargs='+', help='image files and/or zips of images')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS)
+    parser.add_argument('--out', default=os.path.join(BASE_DIR, 'static', 'processed'))
+    parser.add_argument('--reference', default=os.path.join(BASE_DIR, 'reference'))
+    parser.add_argument('--gallery', default=os.environ.get('FACEAPP_GALLERY_DIR', os.path.join(BASE_DIR, 'gallery_store')))
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    pool = create_pool(args.reference, args.gallery, args.workers)
+    start = time.perf_counter()
+    count = errors = 0
+    try:
+        for result in run_batch(pool, iter_images(open_inputs(args.inputs)), args.out,
+                                max_pending=args.workers * PENDING_PER_WORKER):
+            count += 1
+            errors += 'error' in result
+            print(json.dumps(result), flush=True)
+    finally:
+        pool.shutdown()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'done': True, 'images': count, 'errors': errors, 'seconds': round(elapsed, 3),
+                      'images_per_sec': round(count / elapsed, 2) if elapsed else None}))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
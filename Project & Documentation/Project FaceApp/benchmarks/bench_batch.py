@@ -0,0 +1,72 @@
+"""Images/sec of the batch pipeline as the worker count grows.
+
+Run from the project folder:
+    python benchmarks/bench_batch.py [--images 64] [--workers 1 2 4 8] [--source static/processed]
+
+`in-process` is the /upload path: one process_image_file call after another
+in the calling process. The pool rows use utils.batch.run_batch; pool start-up
+(spawning and loading the gallery) is reported separately and not counted in
+images/sec, since the app keeps its pool warm between requests.
+"""
+import argparse
+import glob
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.batch import create_pool, run_batch
+from utils.face_utils import open_gallery, process_image_file
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--source', default=os.path.join(BASE_DIR, 'static', 'processed'),
+                        help='folder of sample photos, reused round-robin')
+    args = parser.parse_args()
+
+    sources = sorted(p for ext in ('*.jpg', '*.jpeg', '*.png') for p in glob.glob(os.path.join(args.source, ext)))
+    if not sources:
+        sys.exit(f"No images in {args.source}")
+    blobs = [open(p, 'rb').read() for p in sources]
+    images = [(f"img_{i}{os.path.splitext(sources[i % len(sources)])[1]}", blobs[i % len(blobs)])
+              for i in range(args.images)]
+    ref_dir = os.path.join(BASE_DIR, 'reference')
+    out_dir = tempfile.mkdtemp()
+    store_dir = os.path.join(out_dir, 'gallery_store')
+    try:
+        gallery = open_gallery(ref_dir, store_dir)
+        start = time.perf_counter()
+        for name, data in images:
+            process_image_file(io.BytesIO(data), gallery, os.path.join(out_dir, name))
+        base = args.images / (time.perf_counter() - start)
+        print(f"{'workers':<12}{'start-up s':>11}{'images/s':>10}{'speedup':>9}")
+        print(f"{'in-process':<12}{'-':>11}{base:>10.2f}{1:>8.2f}x")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            pool = create_pool(ref_dir, store_dir, workers)
+            startup = time.perf_counter() - start
+            try:
+                start = time.perf_counter()
+                for result in run_batch(pool, images, out_dir, max_pending=workers * 2):
+                    if 'error' in result:
+                        raise RuntimeError(result)
+                rate = args.images / (time.perf_counter() - start)
+            finally:
+                pool.shutdown()
+            print(f"{workers:<12}{startup:>11.2f}{rate:>10.2f}{rate / base:>8.2f}x")
+    finally:
+        shutil.rmtree(out_dir)
+
+
+if __name__ == '__main__':
+    main()
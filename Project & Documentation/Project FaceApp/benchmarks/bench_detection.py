@@ -0,0 +1,100 @@
+"""Speed and accuracy of reduced-resolution Haar detection.
+
+Run from the project folder:
+    python benchmarks/bench_detection.py [--max-dims 0 1600 1024 640] [--upscale 1 2 3]
+
+The fixed test set is the sample photos in static/processed plus
+Lab_Task_06/images/pic.jpeg (or --images), each also re-encoded at 2x and 3x
+size to stand in for full-resolution phone photos. Time per image covers what
+process_image_file does before matching: full colour decode plus
+utils.face_utils.detect_faces. Accuracy is measured against full-resolution
+detection on the original photo (max dim 0, boxes scaled by the upscale
+factor), so spurious small detections in the upscaled copies count against
+full resolution too. A box counts as found when IoU >= 0.5.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from utils.face_utils import detect_faces
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = w * h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+def load_test_set(paths, upscales):
+    """[(jpeg bytes, reference boxes)] for every photo at every upscale factor."""
+    test_set = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            original = f.read()
+        truth = run(original, 0)[0]
+        img = cv2.imread(path)
+        for factor in upscales:
+            big = img if factor == 1 else cv2.resize(img, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+            ok, buf = cv2.imencode('.jpg', big, [cv2.IMWRITE_JPEG_QUALITY, 95])
+            test_set.append((buf.tobytes(), [tuple(v * factor for v in box) for box in truth]))
+    return test_set
+
+
+def run(data, max_dim):
+    start = time.perf_counter()
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    boxes = detect_faces(img, data, max_dim)
+    return boxes, time.perf_counter() - start, img.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', nargs='+')
+    parser.add_argument('--max-dims', type=int, nargs='+', default=[0, 1600, 1024, 640])
+    parser.add_argument('--upscale', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = args.images or sorted(glob.glob(os.path.join(BASE_DIR, 'static', 'processed', '*.jp*g'))) + \
+        [os.path.join(BASE_DIR, '..', '..', 'Lab_Task_06', 'images', 'pic.jpeg')]
+    test_set = load_test_set([p for p in paths if os.path.exists(p)], args.upscale)
+    n_ref = sum(len(truth) for _, truth in test_set)
+
+    print(f"{len(test_set)} images, {n_ref} reference faces\n")
+    print(f"{'max dim':>8}{'ms/image':>10}{'speedup':>9}{'recall':>8}{'precision':>11}{'mean IoU':>10}")
+    base_ms = None
+    for max_dim in args.max_dims:
+        seconds = 0.0
+        found = detected = 0
+        ious = []
+        for data, truth in test_set:
+            for _ in range(args.repeats):
+                boxes, elapsed, _ = run(data, max_dim)
+                seconds += elapsed
+            detected += len(boxes)
+            for ref in truth:
+                best = max((iou(ref, b) for b in boxes), default=0.0)
+                if best >= 0.5:
+                    found += 1
+                    ious.append(best)
+        ms = seconds / (len(test_set) * args.repeats) * 1000
+        base_ms = base_ms or ms
+        recall = found / n_ref if n_ref else float('nan')
+        precision = found / detected if detected else float('nan')
+        print(f"{max_dim or 'full':>8}{ms:>10.1f}{base_ms / ms:>8.2f}x{recall:>8.2f}{precision:>11.2f}"
+              f"{(np.mean(ious) if ious else float('nan')):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
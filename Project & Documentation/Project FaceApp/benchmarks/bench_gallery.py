@@ -0,0 +1,98 @@
+"""Gallery start-up and lookup cost, old code vs utils.gallery.
+
+Run from the project folder:
+    python benchmarks/bench_gallery.py [--images 200] [--sizes 1000 10000 100000]
+
+start-up: `cold` encodes every reference image (what every app start used to
+do), `warm` reuses the on-disk store, `one changed` re-encodes a single file.
+lookup: `scan` is face_recognition.face_distance over the whole list per face,
+the others are utils.gallery.nearest with no index (numpy), a flat FAISS index
+and HNSW. Recall is HNSW's agreement with exact search.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import gallery as gallery_mod
+from utils.face_utils import open_gallery
+
+
+def bench_startup(n_images):
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp()
+    ref_dir, store_dir = os.path.join(tmp, 'reference'), os.path.join(tmp, 'store')
+    os.makedirs(ref_dir)
+    for i in range(n_images):
+        cv2.imwrite(os.path.join(ref_dir, f"person_{i}.png"), rng.integers(0, 256, (160, 160), dtype=np.uint8))
+    try:
+        timings = []
+        start = time.perf_counter()
+        open_gallery(ref_dir, store_dir)
+        timings.append(('cold', time.perf_counter() - start))
+        start = time.perf_counter()
+        open_gallery(ref_dir, store_dir)
+        timings.append(('warm', time.perf_counter() - start))
+        cv2.imwrite(os.path.join(ref_dir, 'person_0.png'), rng.integers(0, 256, (160, 160), dtype=np.uint8))
+        start = time.perf_counter()
+        open_gallery(ref_dir, store_dir)
+        timings.append(('one changed', time.perf_counter() - start))
+    finally:
+        shutil.rmtree(tmp)
+    print(f"start-up with {n_images} reference images")
+    for label, seconds in timings:
+        print(f"  {label:<12}{seconds * 1000:>10.1f} ms")
+
+
+def bench_lookup(sizes, n_faces):
+    rng = np.random.default_rng(0)
+    print(f"\n{'gallery':>8}{'scan ms':>10}{'numpy ms':>10}{'flat ms':>10}{'hnsw ms':>10}{'hnsw recall':>13}")
+    for size in sizes:
+        known = rng.normal(0, 0.1, (size, 128)).astype(np.float32)
+        faces = known[rng.integers(0, size, n_faces)] + rng.normal(0, 0.02, (n_faces, 128)).astype(np.float32)
+        known_list = list(known)
+
+        start = time.perf_counter()
+        exact = [int(np.argmin(np.linalg.norm(np.asarray(known_list) - face, axis=1))) for face in faces]
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        gallery_mod.nearest(known, None, faces, 'l2')
+        numpy_ms = (time.perf_counter() - start) * 1000
+
+        flat_ms = hnsw_ms = recall = float('nan')
+        if gallery_mod.faiss is not None:
+            gallery_mod.ANN_MIN_SIZE = size + 1
+            index = gallery_mod.build_index(known, 'l2')
+            start = time.perf_counter()
+            gallery_mod.nearest(known, index, faces, 'l2')
+            flat_ms = (time.perf_counter() - start) * 1000
+
+            gallery_mod.ANN_MIN_SIZE = 0
+            index = gallery_mod.build_index(known, 'l2')
+            start = time.perf_counter()
+            rows, _ = gallery_mod.nearest(known, index, faces, 'l2')
+            hnsw_ms = (time.perf_counter() - start) * 1000
+            recall = float(np.mean(rows == np.asarray(exact)))
+        print(f"{size:>8}{scan_ms:>10.2f}{numpy_ms:>10.2f}{flat_ms:>10.2f}{hnsw_ms:>10.2f}{recall:>13.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=200, help='reference images for the start-up test')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--faces', type=int, default=100, help='faces looked up per gallery size')
+    args = parser.parse_args()
+    bench_startup(args.images)
+    bench_lookup(args.sizes, args.faces)
+
+
+if __name__ == '__main__':
+    main()
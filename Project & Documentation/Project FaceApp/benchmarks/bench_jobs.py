@@ -0,0 +1,102 @@
+"""Burst load test: blocking upload vs job submit + poll.
+
+Start the server first (threaded), then run from the project folder:
+    python app.py                                   # or: flask run --with-threads
+    python benchmarks/bench_jobs.py --url http://127.0.0.1:5000 --image photo.jpg
+
+Lab_Task_06 (blocking route is `/`):
+    python benchmarks/bench_jobs.py --url http://127.0.0.1:5000 --blocking-path / --image pic.jpeg
+
+Every burst fires `--burst` requests at the same moment. `blocking` is the
+time until the old endpoint answers. For jobs, `submit` is the time until
+POST /jobs answers (what holds an HTTP worker), `done` the time until polling
+/jobs/<id> reports the job finished. A light probe request (GET /) is timed
+during each burst to show whether the server still answers other traffic.
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+
+def percentiles(samples):
+    a = np.asarray(samples) * 1000
+    return f"p50 {np.percentile(a, 50):8.1f} ms   p99 {np.percentile(a, 99):8.1f} ms   max {a.max():8.1f} ms"
+
+
+def blocking_request(args, data):
+    start = time.perf_counter()
+    r = requests.post(args.url + args.blocking_path, files={'image': (os.path.basename(args.image), data)}, timeout=600)
+    r.raise_for_status()
+    return time.perf_counter() - start
+
+
+def job_request(args, data):
+    start = time.perf_counter()
+    while True:
+        r = requests.post(args.url + '/jobs', files={'image': (os.path.basename(args.image), data)}, timeout=600)
+        if r.status_code != 503:
+            break
+        time.sleep(0.05)
+    r.raise_for_status()
+    submitted = time.perf_counter() - start
+    status_url = args.url + r.json()['status_url']
+    while True:
+        job = requests.get(status_url, timeout=60).json()
+        if job['status'] in ('done', 'failed'):
+            return submitted, time.perf_counter() - start
+        time.sleep(args.poll)
+
+
+def run_bursts(args, fn, data):
+    results, probes = [], []
+    for _ in range(args.bursts):
+        stop = threading.Event()
+
+        def probe():
+            while not stop.is_set():
+                start = time.perf_counter()
+                requests.get(args.url + '/', timeout=600)
+                probes.append(time.perf_counter() - start)
+                time.sleep(0.05)
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        with ThreadPoolExecutor(args.burst) as pool:
+            results.extend(pool.map(lambda _: fn(args, data), range(args.burst)))
+        stop.set()
+        prober.join()
+        time.sleep(args.pause)
+    return results, probes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--image', required=True)
+    parser.add_argument('--blocking-path', default='/upload')
+    parser.add_argument('--burst', type=int, default=16, help='simultaneous requests per burst')
+    parser.add_argument('--bursts', type=int, default=3)
+    parser.add_argument('--pause', type=float, default=1.0, help='seconds between bursts')
+    parser.add_argument('--poll', type=float, default=0.1, help='seconds between status polls')
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+    with open(args.image, 'rb') as f:
+        data = f.read()
+
+    blocking, probes = run_bursts(args, blocking_request, data)
+    print(f"blocking {args.blocking_path:<8} {percentiles(blocking)}")
+    print(f"  probe GET /      {percentiles(probes)}")
+
+    jobs, probes = run_bursts(args, job_request, data)
+    print(f"jobs submit      {percentiles([s for s, _ in jobs])}")
+    print(f"jobs done        {percentiles([d for _, d in jobs])}")
+    print(f"  probe GET /      {percentiles(probes)}")
+
+
+if __name__ == '__main__':
+    main()
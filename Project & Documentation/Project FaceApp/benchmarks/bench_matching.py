@@ -0,0 +1,77 @@
+"""Haar-fallback face matching: per-template matchTemplate loop vs one vectorized pass.
+
+Run from the project folder:
+    python benchmarks/bench_matching.py [--faces 4] [--refs 10 100 1000]
+
+`loop` reproduces the old code: cv2.resize + cv2.matchTemplate for every
+(face, reference) pair, then the same loop again to find the best index when
+the score passes the threshold. `vectorized` is utils.face_utils.match_templates
+against a bank prepared once by normalize_templates (preparation not timed, it
+happens at app start).
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.face_utils import MATCH_THRESHOLD, match_templates, normalize_templates
+
+
+def old_match(roi, templates):
+    h, w = roi.shape
+    best_val = -1.0
+    for tpl in templates:
+        res = cv2.matchTemplate(roi, cv2.resize(tpl, (w, h)), cv2.TM_CCOEFF_NORMED)
+        best_val = max(best_val, cv2.minMaxLoc(res)[1])
+    best_idx = None
+    if best_val >= MATCH_THRESHOLD:
+        best_score = -1.0
+        for idx, tpl in enumerate(templates):
+            res = cv2.matchTemplate(roi, cv2.resize(tpl, (w, h)), cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, _ = cv2.minMaxLoc(res)
+            if max_val > best_score:
+                best_score, best_idx = max_val, idx
+    return best_idx, best_val
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--faces', type=int, default=4, help='faces per image')
+    parser.add_argument('--refs', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'refs':>6}{'loop ms':>12}{'vectorized ms':>16}{'speedup':>10}{'same best':>11}")
+    for n_refs in args.refs:
+        templates = [rng.integers(0, 256, (rng.integers(80, 200),) * 2, dtype=np.uint8) for _ in range(n_refs)]
+        # Faces are noisy, re-sized copies of some references so matches pass the threshold
+        faces = []
+        for i in range(args.faces):
+            src = templates[(i * 7) % n_refs]
+            size = int(rng.integers(60, 160))
+            face = cv2.resize(src, (size, size)).astype(np.int16) + rng.integers(-20, 20, (size, size))
+            faces.append(np.clip(face, 0, 255).astype(np.uint8))
+        bank = normalize_templates(templates)
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            old = [old_match(face, templates) for face in faces]
+        loop_ms = (time.perf_counter() - start) / args.repeats * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            best_idx, _ = match_templates(faces, bank)
+        vec_ms = (time.perf_counter() - start) / args.repeats * 1000
+
+        agree = sum(o[0] == int(b) for o, b in zip(old, best_idx))
+        print(f"{n_refs:>6}{loop_ms:>12.2f}{vec_ms:>16.3f}{loop_ms / vec_ms:>9.0f}x{agree:>8}/{len(faces)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Time spent around detection: decode, annotate and output encoding.
+
+Run from the project folder:
+    python benchmarks/bench_output.py [--image photo.jpg] [--upscale 3]
+
+`old` reproduces the previous path: decode, BGR->RGB, PIL ImageDraw
+annotation and PIL save. The other rows time utils.face_utils.analyze_image's
+decode and annotate stages plus encode_image for each output option
+(detection/matching are the same in every row and are left out).
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from utils.face_utils import annotate_in_place, encode_image
+
+BOXES = [(419, 791, 484, 726), (430, 292, 508, 214), (419, 646, 495, 570), (337, 475, 427, 385)]
+NAMES = ['Unknown', 'alice', 'bob', 'Unknown']
+
+
+def old_path(data):
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    pil_image = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    draw = ImageDraw.Draw(pil_image)
+    font = ImageFont.load_default()
+    for (top, right, bottom, left), name in zip(BOXES, NAMES):
+        draw.rectangle(((left, top), (right, bottom)), outline=(0, 255, 0), width=3)
+        bbox = draw.textbbox((0, 0), name, font=font)
+        draw.rectangle(((left, bottom - bbox[3] - 6), (left + bbox[2] + 6, bottom)), fill=(0, 255, 0))
+        draw.text((left + 3, bottom - bbox[3] - 3), name, fill=(0, 0, 0), font=font)
+    out = io.BytesIO()
+    pil_image.save(out, format='JPEG')
+    return out.getvalue()
+
+
+def new_path(data, output):
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if output is None:
+        return b''
+    annotate_in_place(img, BOXES, NAMES)
+    return encode_image(img, *output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image')
+    parser.add_argument('--upscale', type=int, default=3, help='re-encode the sample at this scale (phone-photo size)')
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    path = args.image or sorted(glob.glob(os.path.join(BASE_DIR, 'static', 'processed', '*.jp*g')))[0]
+    img = cv2.imread(path)
+    if args.upscale > 1:
+        img = cv2.resize(img, None, fx=args.upscale, fy=args.upscale, interpolation=cv2.INTER_CUBIC)
+    data = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+    print(f"{img.shape[1]}x{img.shape[0]}, {len(data) // 1024} KB upload\n")
+
+    cases = [
+        ('old: PIL annotate + save', lambda: old_path(data)),
+        ('none (JSON only)', lambda: new_path(data, None)),
+        ('jpeg q90 full size', lambda: new_path(data, ('jpeg', 90, 0))),
+        ('jpeg q75 max 1280', lambda: new_path(data, ('jpeg', 75, 1280))),
+        ('webp q70 max 1280', lambda: new_path(data, ('webp', 70, 1280))),
+        ('webp q70 max 640', lambda: new_path(data, ('webp', 70, 640))),
+    ]
+    print(f"{'output':<28}{'ms':>9}{'KB':>8}")
+    for label, fn in cases:
+        fn()
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            out = fn()
+        ms = (time.perf_counter() - start) / args.repeats * 1000
+        print(f"{label:<28}{ms:>9.1f}{len(out) // 1024:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Sustained FPS, latency and box accuracy of utils.video.
+
+Run from the project folder:
+    python benchmarks/bench_video.py [--video clip.mp4] [--every 1 5 10] [--workers 1 2 4]
+
+Without --video a test clip is generated from a sample photo in
+static/processed: a 640x480 window panning across it (--frames frames). The
+`every 1` row runs full detection on every frame and is the reference for
+accuracy: `box IoU` is the mean IoU of each reference box with the closest
+tracked box on the same frame. `encodings` counts gallery lookups.
+Latency is capture-to-result; with --realtime the clip is read at its frame
+rate like a camera (frames are dropped when the pipeline falls behind), which
+is the number that matters for live streams.
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from utils.face_utils import open_gallery
+from utils.video import VideoRecognizer, iou
+
+
+def make_clip(path, frames, size=(640, 480)):
+    photo = cv2.imread(sorted(glob.glob(os.path.join(BASE_DIR, 'static', 'processed', '*.jp*g')))[0])
+    height, width = photo.shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 25, size)
+    for i in range(frames):
+        t = i / max(1, frames - 1)
+        x = int((width - size[0]) * (0.5 - 0.5 * np.cos(2 * np.pi * t)))
+        y = int((height - size[1]) * (0.5 - 0.5 * np.cos(np.pi * t)))
+        writer.write(np.ascontiguousarray(photo[y:y + size[1], x:x + size[0]]))
+    writer.release()
+
+
+def boxes_xywh(faces):
+    return [(left, top, right - left, bottom - top) for top, right, bottom, left in (f['box'] for f in faces)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--every', type=int, nargs='+', default=[1, 5, 10])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--tracker', default='iou')
+    parser.add_argument('--realtime', action='store_true')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    video = args.video or os.path.join(tmp, 'clip.mp4')
+    if not args.video:
+        make_clip(video, args.frames)
+    gallery = open_gallery(os.path.join(BASE_DIR, 'reference'), os.path.join(tmp, 'gallery_store'))
+
+    reference = None
+    print(f"{'every':>6}{'workers':>8}{'fps':>8}{'p50 ms':>9}{'p99 ms':>9}{'encodings':>11}{'dropped':>9}{'box IoU':>9}")
+    for every in args.every:
+        for workers in args.workers:
+            recognizer = VideoRecognizer(gallery, every=every, workers=workers, tracker=args.tracker)
+            per_frame = {r.index: boxes_xywh(r.faces) for r in recognizer.run(video, realtime=args.realtime)}
+            if reference is None:
+                reference = per_frame
+            ious = [max((iou(ref, b) for b in per_frame[i]), default=0.0)
+                    for i, ref_boxes in reference.items() if i in per_frame for ref in ref_boxes]
+            s = recognizer.stats()
+            print(f"{every:>6}{workers:>8}{s['fps']:>8.1f}{s['latency_p50_ms']:>9.1f}{s['latency_p99_ms']:>9.1f}"
+                  f"{s['encodings']:>11}{s['dropped']:>9}{(np.mean(ious) if ious else float('nan')):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""VideoRecognizer's track bookkeeping, with the detector and the gallery
+replaced by stand-ins (no video or model files needed).
+
+Run from the FaceApp folder:
+    python -m pytest tests        (or: python -m unittest discover tests)
+"""
+import os
+import sys
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from utils import video
+from utils.video import FaceTracker, VideoRecognizer
+
+
+class CountingGallery:
+    """Never recognizes anyone; counts the faces it was asked about."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def lookup(self, encodings):
+        self.calls += len(encodings)
+        return [('nobody', None) for _ in encodings]
+
+
+def detected(boxes):
+    future = Future()
+    future.set_result(boxes)
+    return future
+
+
+class UnknownRetriesTest(unittest.TestCase):
+    def run_keyframes(self, unknown_retries, keyframes=10):
+        gallery = CountingGallery()
+        recognizer = VideoRecognizer(gallery, unknown_retries=unknown_retries)
+        tracker = FaceTracker('iou')
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        with mock.patch.object(video, 'encode_faces', lambda frame, boxes: [np.zeros(128) for _ in boxes]):
+            for i in range(keyframes):
+                # The same face at the same place on every keyframe: one track
+                result = recognizer._finish(tracker, i, 0.0, frame, detected([(40, 30, 50, 50)]))
+        self.assertEqual(len(tracker.tracks), 1)
+        self.assertEqual(result.faces[0]['name'], 'Unknown')
+        return gallery.calls, tracker.tracks[0]
+
+    def test_unknown_track_is_looked_up_unknown_retries_times(self):
+        for retries in (1, 3):
+            calls, track = self.run_keyframes(retries)
+            self.assertEqual(calls, retries)
+            self.assertEqual(track.lookups, retries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""Process many images at once on a pool of worker processes.
+
+Each worker opens the gallery once, in the pool initializer, and then only
+runs `process_image_file`. `run_batch` keeps at most `max_pending` images in
+flight, so a large zip is read no faster than the workers can process it, and
+yields one result dict per image as soon as it is done (in completion order).
+"""
+import io
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from werkzeug.utils import secure_filename
+
+BATCH_WORKERS = int(os.environ.get('FACEAPP_WORKERS', '0')) or os.cpu_count() or 1
+# Images in flight per batch = workers x this
+PENDING_PER_WORKER = int(os.environ.get('FACEAPP_PENDING_PER_WORKER', '2'))
+MAX_IMAGE_BYTES = int(os.environ.get('FACEAPP_MAX_IMAGE_BYTES', str(20 * 1024 * 1024)))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+_gallery = None
+
+
+def _init_worker(reference_dir, store_dir):
+    global _gallery
+    from .face_utils import open_gallery
+    _gallery = open_gallery(reference_dir, store_dir)
+
+
+def process_upload(name, data, out_dir, out_name=None):
+    """One image on a pool worker (used for /jobs); same result dict as run_batch."""
+    return _process_one(name, data, out_dir, out_name)
+
+
+def _warm():
+    return os.getpid()
+
+
+def _process_one(name, data, out_dir, out_name=None):
+    from .face_utils import StageTimer, output_name, process_image_file
+    start = time.perf_counter()
+    out_name = out_name or output_name(f"processed_{int(time.time() * 1000)}_{os.getpid()}_{secure_filename(name) or 'image.jpg'}")
+    timer = StageTimer()
+    try:
+        faces = process_image_file(io.BytesIO(data), _gallery, os.path.join(out_dir, out_name), timer=timer)
+        result = {'file': name, 'output': out_name, 'faces': faces, 'timings': timer.stages}
+    except Exception as e:
+        result = {'file': name, 'error': str(e)}
+    result['seconds'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def create_pool(reference_dir, store_dir, workers=BATCH_WORKERS):
+    """Start `workers` processes and wait until each has loaded the gallery."""
+    # spawn, not fork: the parent may be a threaded Flask server holding locks
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker, initargs=(reference_dir, store_dir))
+    for future in [pool.submit(_warm) for _ in range(workers)]:
+        future.result()
+    return pool
+
+
+def iter_images(named_files):
+    """Expand (filename, file object) pairs into (name, bytes), opening zips.
+
+    Zip members are read one at a time, when the consumer asks for them.
+    """
+    for filename, fileobj in named_files:
+        if filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(fileobj) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    if info.file_size > MAX_IMAGE_BYTES:
+                        yield info.filename, None
+                        continue
+                    yield info.filename, zf.read(info)
+        else:
+            data = fileobj.read(MAX_IMAGE_BYTES + 1)
+            yield filename, data if len(data) <= MAX_IMAGE_BYTES else None
+
+
+def run_batch(pool, images, out_dir, max_pending=None):
+    """Yield a result dict per (name, bytes) in `images`, as they finish.
+
+    New images are only taken from `images` while fewer than `max_pending`
+    are queued or running (backpressure on the reader).
+    """
+    max_pending = max_pending or BATCH_WORKERS * PENDING_PER_WORKER
+    images = iter(images)
+    pending = set()
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) < max_pending:
+            item = next(images, None)
+            if item is None:
+                exhausted = True
+                break
+            name, data = item
+            if data is None:
+                yield {'file': name, 'error': f"larger than {MAX_IMAGE_BYTES} bytes"}
+                continue
+            pending.add(pool.submit(_process_one, name, data, out_dir))
+        if not pending:
+            return
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+class LazyPool:
+    """A pool created on first use (not at import, which would also happen in
+    every spawned worker that re-imports the app module)."""
+
+    def __init__(self, reference_dir, store_dir, workers=BATCH_WORKERS):
+        self.args = (reference_dir, store_dir, workers)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = create_pool(*self.args)
+            return self._pool
@@ -1,7 +1,11 @@
 import os
-import io
-from PIL import Image, ImageDraw, ImageFont
+import threading
+import time
+from contextlib import contextmanager
 import numpy as np
+import cv2
+
+from .gallery import Gallery
 
 # Try to import face_recognition; if unavailable, fall back to OpenCV Haar cascades
 try:
@@ -9,184 +13,352 @@ try:
     USING_FACE_REC = True
 except Exception:
     USING_FACE_REC = False
-    import cv2
+
+# Haar fallback: every reference template is resized to this size once, at load
+# time, and stored zero-mean / unit-norm so matching is a single dot product.
+TEMPLATE_SIZE = (64, 64)
+MATCH_THRESHOLD = 0.5
+
+# Names the vectors a gallery store holds, so a store built by the other backend is not reused
+ENCODING_KIND = 'face_recognition-128' if USING_FACE_REC else f'haar-template-{TEMPLATE_SIZE[0]}x{TEMPLATE_SIZE[1]}'
+
+# Faces are detected on a reduced copy of the upload whose longest side is at
+# most this many pixels (0 = full resolution); boxes are mapped back to full size.
+DETECT_MAX_DIM = int(os.environ.get('FACEAPP_DETECT_MAX_DIM', '1600'))
+
+# Annotated output: format when the file name has no usable extension, and quality (JPEG/WebP)
+OUTPUT_FORMATS = ('jpeg', 'webp', 'png')
+OUTPUT_FORMAT = os.environ.get('FACEAPP_OUTPUT_FORMAT', 'jpeg')
+OUTPUT_QUALITY = int(os.environ.get('FACEAPP_OUTPUT_QUALITY', '90'))
+
+_local = threading.local()
+
+
+def get_cascade():
+    """The frontal-face Haar cascade, loaded once per thread (detectMultiScale
+    is not safe to call on one classifier from several threads)."""
+    cascade = getattr(_local, 'cascade', None)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        _local.cascade = cascade
+    return cascade
+
+
+def detection_image(data, full_shape, max_dim=DETECT_MAX_DIM, color=False, ignore_orientation=False):
+    """Decode `data` again at a reduced size for face detection.
+
+    Uses the smallest JPEG DCT scaling (cv2.IMREAD_REDUCED_*: 1/2, 1/4, 1/8)
+    whose longest side fits `max_dim`, then pyrDown if 1/8 is still too big.
+    Returns (image, (scale_y, scale_x)) with full = reduced * scale, or
+    (None, (1.0, 1.0)) when the full image already fits.
+    """
+    height, width = full_shape[:2]
+    longest = max(height, width)
+    if not max_dim or longest <= max_dim:
+        return None, (1.0, 1.0)
+    factor = 2
+    while factor < 8 and longest / factor > max_dim:
+        factor *= 2
+    flag = {
+        2: cv2.IMREAD_REDUCED_COLOR_2 if color else cv2.IMREAD_REDUCED_GRAYSCALE_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4 if color else cv2.IMREAD_REDUCED_GRAYSCALE_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8 if color else cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    }[factor]
+    if ignore_orientation:
+        flag |= cv2.IMREAD_IGNORE_ORIENTATION
+    small = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if small is None:
+        return None, (1.0, 1.0)
+    while max(small.shape[:2]) > max_dim:
+        small = cv2.pyrDown(small)
+    return small, (height / small.shape[0], width / small.shape[1])
+
+
+def scale_boxes(rects, scale, full_shape):
+    """Map (x, y, w, h) boxes from a detection image back to full resolution."""
+    scale_y, scale_x = scale
+    height, width = full_shape[:2]
+    boxes = []
+    for (x, y, w, h) in rects:
+        left, top = int(round(x * scale_x)), int(round(y * scale_y))
+        right, bottom = min(int(round((x + w) * scale_x)), width), min(int(round((y + h) * scale_y)), height)
+        boxes.append((left, top, right - left, bottom - top))
+    return boxes
+
+
+def detect_faces(img, data, max_dim=DETECT_MAX_DIM):
+    """Haar face boxes (x, y, w, h) in full-resolution coordinates of the BGR
+    image `img`, detected on the reduced decode of its bytes `data`."""
+    small, scale = detection_image(data, img.shape, max_dim)
+    gray = small if small is not None else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # keep the 30 px minimum face size in full-resolution pixels
+    min_side = max(1, int(30 / max(scale)))
+    rects = get_cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side))
+    return scale_boxes(rects, scale, img.shape)
+
+
+def detect_faces_in_frame(frame, max_dim=DETECT_MAX_DIM):
+    """Face boxes (x, y, w, h) in an already decoded BGR frame (e.g. video),
+    detected on a copy shrunk with cv2.resize so its longest side fits `max_dim`."""
+    height, width = frame.shape[:2]
+    small = frame
+    if max_dim and max(height, width) > max_dim:
+        f = max_dim / max(height, width)
+        small = cv2.resize(frame, (max(1, int(width * f)), max(1, int(height * f))), interpolation=cv2.INTER_AREA)
+    scale = (height / small.shape[0], width / small.shape[1])
+    if USING_FACE_REC:
+        locations = face_recognition.face_locations(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+        rects = [(left, top, right - left, bottom - top) for (top, right, bottom, left) in locations]
+    else:
+        min_side = max(1, int(30 / max(scale)))
+        rects = get_cascade().detectMultiScale(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), scaleFactor=1.1,
+                                               minNeighbors=5, minSize=(min_side, min_side))
+    return scale_boxes(rects, scale, frame.shape)
+
+
+def encode_faces(frame, boxes):
+    """Gallery vectors (one row per box) for faces at (x, y, w, h) in a BGR frame."""
+    if USING_FACE_REC:
+        locations = [(y, x + w, y + h, x) for (x, y, w, h) in boxes]
+        encodings = face_recognition.face_encodings(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), locations)
+        return np.asarray(encodings, dtype=np.float32).reshape(len(boxes), -1)
+    return normalize_templates([cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY) for (x, y, w, h) in boxes])
+
+
+def is_match(score, tolerance=0.5):
+    """Whether a gallery.lookup score is good enough: a distance for
+    face_recognition encodings, a correlation for Haar templates."""
+    if score is None:
+        return False
+    return score <= tolerance if USING_FACE_REC else score >= MATCH_THRESHOLD
+
+
+def normalize_templates(gray_images):
+    """Resize grayscale crops to TEMPLATE_SIZE and stack them as rows of a
+    float32 matrix, each row zero-mean and unit-length.
+
+    The dot product of two such rows is their normalized correlation, the
+    same score cv2.TM_CCOEFF_NORMED gives for two images of equal size.
+    """
+    n_pixels = TEMPLATE_SIZE[0] * TEMPLATE_SIZE[1]
+    bank = np.empty((len(gray_images), n_pixels), dtype=np.float32)
+    for i, img in enumerate(gray_images):
+        bank[i] = cv2.resize(img, TEMPLATE_SIZE, interpolation=cv2.INTER_AREA).reshape(-1)
+    bank -= bank.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(bank, axis=1, keepdims=True)
+    bank /= np.maximum(norms, 1e-6)
+    return bank
+
+
+def match_templates(face_crops, template_bank):
+    """Score every face crop against every reference template in one pass.
+
+    Returns (best_idx, best_score) arrays with one entry per face.
+    """
+    if len(face_crops) == 0 or len(template_bank) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    scores = normalize_templates(face_crops) @ template_bank.T
+    best_idx = scores.argmax(axis=1)
+    return best_idx, scores[np.arange(len(face_crops)), best_idx]
+
+
+def encode_reference_image(path):
+    """Encoding of the first face in an image file, or None if it has none.
+
+    With `face_recognition` this is the 128-d face encoding. Otherwise it is
+    the normalized template (see `normalize_templates`) of the first Haar
+    detection, or of the whole image when nothing is detected.
+    """
+    if USING_FACE_REC:
+        image = face_recognition.load_image_file(path)
+        encs = face_recognition.face_encodings(image)
+        return np.asarray(encs[0], dtype=np.float32) if len(encs) > 0 else None
+
+    # load with OpenCV and try to detect a face region to use as template
+    img = cv2.imread(path)
+    if img is None:
+        return None
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    faces = get_cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(30, 30))
+    if len(faces) > 0:
+        x, y, w, h = faces[0]
+        face_tpl = gray[y:y+h, x:x+w]
+    else:
+        # fallback: use the whole image as template
+        face_tpl = gray
+    return normalize_templates([face_tpl])[0]
 
 
 def load_reference_encodings(reference_dir):
-    """Load reference data.
+    """Encode every image in `reference_dir` from scratch.
 
-    If `face_recognition` is available, returns (encodings, names).
-    Otherwise returns (templates, names) where templates are grayscale face images.
+    Returns (encodings, names) as a matrix with one row per image that has a
+    face. The app uses `open_gallery` instead, which caches the encodings.
     """
     items = []
     names = []
     if not os.path.isdir(reference_dir):
-        return items, names
+        return np.empty((0, 0), dtype=np.float32), names
 
     for fname in os.listdir(reference_dir):
         path = os.path.join(reference_dir, fname)
         if not os.path.isfile(path):
             continue
-        name = os.path.splitext(fname)[0]
         try:
-            if USING_FACE_REC:
-                image = face_recognition.load_image_file(path)
-                encs = face_recognition.face_encodings(image)
-                if len(encs) > 0:
-                    items.append(encs[0])
-                    names.append(name)
-            else:
-                # load with OpenCV and try to detect a face region to use as template
-                img = cv2.imread(path)
-                if img is None:
-                    continue
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-                faces = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(30, 30))
-                if len(faces) > 0:
-                    x, y, w, h = faces[0]
-                    face_tpl = gray[y:y+h, x:x+w]
-                else:
-                    # fallback: use the whole image as template
-                    face_tpl = cv2.resize(gray, (200, 200))
-
-                items.append(face_tpl)
-                names.append(name)
+            encoding = encode_reference_image(path)
         except Exception:
             continue
+        if encoding is not None:
+            items.append(encoding)
+            names.append(os.path.splitext(fname)[0])
 
-    return items, names
+    return (np.stack(items) if items else np.empty((0, 0), dtype=np.float32)), names
 
 
-def annotate_image_and_save(image_np, face_locations, face_names, out_path):
-    """Draw rectangles and labels on image (numpy array), save to out_path."""
-    pil_image = Image.fromarray(image_np)
-    draw = ImageDraw.Draw(pil_image)
+def open_gallery(reference_dir, store_dir):
+    """Gallery of `reference_dir` whose encodings are cached in `store_dir`.
 
-    try:
-        font = ImageFont.truetype("arial.ttf", 16)
-    except Exception:
-        font = ImageFont.load_default()
+    face_recognition encodings are compared by euclidean distance, Haar
+    templates by normalized correlation (inner product).
+    """
+    return Gallery(reference_dir, store_dir, encode_reference_image, ENCODING_KIND,
+                   metric='l2' if USING_FACE_REC else 'ip')
 
-    for (top, right, bottom, left), name in zip(face_locations, face_names):
-        draw.rectangle(((left, top), (right, bottom)), outline=(0, 255, 0), width=3)
-        # compute text size in a forward-compatible way
+
+class StageTimer:
+    """Wall-clock milliseconds per pipeline stage, e.g. {'decode': 12.3, 'detect': 80.1}."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
         try:
-            text_width, text_height = font.getsize(name)
-        except Exception:
-            try:
-                bbox = draw.textbbox((0, 0), name, font=font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-            except Exception:
-                # fallback values
-                text_width, text_height = (len(name) * 6, 12)
+            yield
+        finally:
+            self.stages[name] = round(self.stages.get(name, 0.0) + (time.perf_counter() - start) * 1000, 2)
 
-        draw.rectangle(((left, bottom - text_height - 6), (left + text_width + 6, bottom)), fill=(0, 255, 0))
-        draw.text((left + 3, bottom - text_height - 3), name, fill=(0, 0, 0), font=font)
+    def server_timing(self):
+        """The stages as an HTTP Server-Timing header value."""
+        return ', '.join(f"{name};dur={ms}" for name, ms in self.stages.items())
 
-    pil_image.save(out_path)
 
+def annotate_in_place(img, face_locations, face_names):
+    """Draw boxes and name labels straight onto the BGR array `img`."""
+    for (top, right, bottom, left), name in zip(face_locations, face_names):
+        cv2.rectangle(img, (left, top), (right, bottom), (0, 255, 0), 3)
+        (text_width, text_height), _ = cv2.getTextSize(name, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        cv2.rectangle(img, (left, bottom - text_height - 6), (left + text_width + 6, bottom), (0, 255, 0), cv2.FILLED)
+        cv2.putText(img, name, (left + 3, bottom - 3), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+    return img
 
-def process_image_file(file_storage, known_items, known_names, out_path, tolerance=0.5):
-    """Process uploaded file. If `face_recognition` available, do recognition.
 
-    Otherwise use OpenCV Haar cascade for detection and template matching for recognition.
+def output_format(name):
+    """'photo.JPG', '.jpg' or 'jpeg' -> 'jpeg'; OUTPUT_FORMAT for anything unsupported."""
+    fmt = (os.path.splitext(name)[1] or name).lower().lstrip('.')
+    fmt = 'jpeg' if fmt == 'jpg' else fmt
+    return fmt if fmt in OUTPUT_FORMATS else OUTPUT_FORMAT
 
-    Returns list of dicts: {'name': name, 'box': [top,right,bottom,left], 'distance': score}
+
+def output_name(path, image_format=None):
+    """`path` with an extension that matches the format it will be written in."""
+    fmt = output_format(image_format or path)
+    root, ext = os.path.splitext(path)
+    if ext.lower().lstrip('.') in (fmt, 'jpg' if fmt == 'jpeg' else fmt):
+        return path
+    return root + '.' + fmt
+
+
+def encode_image(img, image_format=OUTPUT_FORMAT, quality=OUTPUT_QUALITY, max_dim=0):
+    """Encode a BGR array to JPEG / WebP / PNG bytes in memory, optionally
+    shrunk so its longest side is at most `max_dim`."""
+    image_format = image_format.lower().lstrip('.')
+    if image_format == 'jpg':
+        image_format = 'jpeg'
+    if image_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format '{image_format}', expected one of {OUTPUT_FORMATS}")
+    height, width = img.shape[:2]
+    if max_dim and max(height, width) > max_dim:
+        f = max_dim / max(height, width)
+        img = cv2.resize(img, (max(1, int(width * f)), max(1, int(height * f))), interpolation=cv2.INTER_AREA)
+    params = {'jpeg': [cv2.IMWRITE_JPEG_QUALITY, int(quality)],
+              'webp': [cv2.IMWRITE_WEBP_QUALITY, int(quality)],
+              'png': []}[image_format]
+    ok, buf = cv2.imencode('.' + image_format, img, params)
+    if not ok:
+        raise ValueError(f"Could not encode image as {image_format}")
+    return buf.tobytes()
+
+
+def analyze_image(data, gallery, tolerance=0.5, annotate=True, timer=None):
+    """Detect and recognize faces in encoded image bytes.
+
+    The bytes are decoded exactly once (cv2.imdecode on a zero-copy view), and
+    with `annotate` the boxes and names are drawn onto that same array.
+    Returns (results, BGR image); results as for process_image_file.
     """
-    # Read uploaded bytes
-    file_storage.seek(0)
-    data = file_storage.read()
+    timer = timer or StageTimer()
+    with timer.stage('decode'):
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError('Could not decode image')
+
     if USING_FACE_REC:
-        # face_recognition can accept file-like objects
-        try:
-            image = face_recognition.load_image_file(io.BytesIO(data))
-        except Exception:
-            # fallback to numpy decoding
-            import cv2
-            nparr = np.frombuffer(data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            image = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-        face_locations = face_recognition.face_locations(image)
-        face_encodings = face_recognition.face_encodings(image, face_locations)
-
-        results = []
-        face_names = []
-
-        for encoding, loc in zip(face_encodings, face_locations):
-            name = 'Unknown'
-            distance = None
-            if known_items:
-                distances = face_recognition.face_distance(known_items, encoding)
-                best_idx = int(np.argmin(distances))
-                distance = float(distances[best_idx])
-                if distance <= tolerance:
-                    name = known_names[best_idx]
-
-            face_names.append(name)
-            results.append({'name': name, 'box': [int(x) for x in loc], 'distance': distance})
-
-        annotate_image_and_save(image, face_locations, face_names, out_path)
-        return results
+        with timer.stage('detect'):
+            # Detect on a reduced decode, encode on the full image
+            small, scale = detection_image(data, img.shape, color=True)
+            if small is None:
+                rects = detect_faces_in_frame(img, 0)
+            else:
+                rects = [(left, top, right - left, bottom - top) for (top, right, bottom, left)
+                         in face_recognition.face_locations(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))]
+                rects = scale_boxes(rects, scale, img.shape)
     else:
-        import cv2
-        # decode image
-        nparr = np.frombuffer(data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError('Could not decode image')
-        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        with timer.stage('detect'):
+            rects = detect_faces(img, data)
+    with timer.stage('encode'):
+        # Haar: only the face crops are converted to grayscale, at full resolution
+        vectors = encode_faces(img, rects)
+    with timer.stage('match'):
+        matches = gallery.lookup(vectors)
 
-        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        rects = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-
-        face_locations = []
-        face_names = []
-        results = []
-
-        for (x, y, w, h) in rects:
-            top, right, bottom, left = y, x + w, y + h, x
-            face_locations.append((top, right, bottom, left))
-
-            name = 'Unknown'
-            score = None
-            if known_items:
-                roi = gray[y:y+h, x:x+w]
-                if roi.size == 0:
-                    match_val = 0.0
-                else:
-                    best_val = -1.0
-                    for tpl in known_items:
-                        try:
-                            tpl_resized = cv2.resize(tpl, (w, h))
-                        except Exception:
-                            tpl_resized = cv2.resize(tpl, (w, h), interpolation=cv2.INTER_AREA)
-                        # use template matching
-                        res = cv2.matchTemplate(roi, tpl_resized, cv2.TM_CCOEFF_NORMED)
-                        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-                        if max_val > best_val:
-                            best_val = max_val
-                    match_val = float(best_val)
-
-                score = match_val
-                if match_val >= 0.5:
-                    # pick the best name
-                    best_idx = 0
-                    best_score = -1.0
-                    for idx, tpl in enumerate(known_items):
-                        tpl_resized = cv2.resize(tpl, (w, h))
-                        res = cv2.matchTemplate(roi, tpl_resized, cv2.TM_CCOEFF_NORMED)
-                        _, max_val, _, _ = cv2.minMaxLoc(res)
-                        if max_val > best_score:
-                            best_score = max_val
-                            best_idx = idx
-                    name = known_names[best_idx]
-
-            face_names.append(name)
-            results.append({'name': name, 'box': [int(top), int(right), int(bottom), int(left)], 'distance': score})
-
-        annotate_image_and_save(rgb, face_locations, face_names, out_path)
-        return results
+    face_locations = []
+    face_names = []
+    results = []
+    for (x, y, w, h), (best_name, score) in zip(rects, matches):
+        top, right, bottom, left = y, x + w, y + h, x
+        face_locations.append((top, right, bottom, left))
+
+        name = best_name if is_match(score, tolerance) else 'Unknown'
+        face_names.append(name)
+        results.append({'name': name, 'box': [int(top), int(right), int(bottom), int(left)], 'distance': score})
+
+    if annotate:
+        with timer.stage('annotate'):
+            annotate_in_place(img, face_locations, face_names)
+    return results, img
+
+
+def process_image_file(file_storage, gallery, out_path, tolerance=0.5, image_format=None,
+                       quality=OUTPUT_QUALITY, max_dim=0, timer=None):
+    """Process uploaded file. If `face_recognition` available, do recognition.
+
+    Otherwise use OpenCV Haar cascade for detection and template matching for recognition.
+    Faces are looked up in `gallery` (see `open_gallery`). The annotated image
+    is written to `out_path` (format from its extension unless `image_format`
+    is given); pass out_path=None to skip annotating and writing altogether.
+
+    Returns list of dicts: {'name': name, 'box': [top,right,bottom,left], 'distance': score}
+    """
+    timer = timer or StageTimer()
+    with timer.stage('read'):
+        file_storage.seek(0)
+        data = file_storage.read()
+    results, img = analyze_image(data, gallery, tolerance, annotate=out_path is not None, timer=timer)
+    if out_path is not None:
+        with timer.stage('write'):
+            image_format = output_format(image_format or out_path)
+            with open(out_path, 'wb') as f:
+                f.write(encode_image(img, image_format, quality, max_dim))
+    return results
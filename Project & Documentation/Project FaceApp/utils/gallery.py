@@ -0,0 +1,318 @@
+"""Persistent, incrementally updated gallery of reference faces.
+
+The encodings of every image in `reference/` are kept on disk in `store_dir`:
+
+    encodings.npy   float32 (rows, dim) matrix, one row per usable image
+    gallery.json    encoding kind, and per file: name, mtime_ns, size, sha1, row
+
+On start (and on every refresh) only files whose mtime/size changed are looked
+at again, and only those whose sha1 also changed are re-encoded. Lookups go
+through a FAISS index when faiss is installed (exact for small galleries,
+HNSW from ANN_MIN_SIZE entries on), otherwise through one numpy matmul.
+
+People can be added or removed while the app runs (Gallery.add / remove /
+refresh); readers always see a complete, immutable snapshot.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no store lock, the unique temp files still keep writers apart
+    fcntl = None
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+ENCODINGS_FILE = 'encodings.npy'
+INDEX_FILE = 'gallery.json'
+LOCK_FILE = 'gallery.lock'
+
+# Galleries at least this large are searched with HNSW instead of exact search
+ANN_MIN_SIZE = int(os.environ.get('GALLERY_ANN_MIN_SIZE', '5000'))
+HNSW_M = 32
+HNSW_EF_SEARCH = int(os.environ.get('GALLERY_HNSW_EF_SEARCH', '128'))
+# Seconds between checks of reference/ for files added or removed by hand (0 = never)
+CHECK_INTERVAL = float(os.environ.get('GALLERY_CHECK_INTERVAL', '5'))
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def atomic_write(path, data):
+    """Write bytes through a temp file of its own in the same directory, then
+    os.replace it over `path`; concurrent writers never share a temp file."""
+    folder, name = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(dir=folder or '.', prefix=name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def build_index(matrix, metric):
+    """FAISS index over the rows of `matrix`, or None without faiss."""
+    if faiss is None or len(matrix) == 0:
+        return None
+    dim = matrix.shape[1]
+    faiss_metric = faiss.METRIC_L2 if metric == 'l2' else faiss.METRIC_INNER_PRODUCT
+    if len(matrix) >= ANN_MIN_SIZE:
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss_metric)
+        index.hnsw.efConstruction = 80
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif metric == 'l2':
+        index = faiss.IndexFlatL2(dim)
+    else:
+        index = faiss.IndexFlatIP(dim)
+    index.add(matrix)
+    return index
+
+
+def nearest(matrix, index, queries, metric):
+    """Best row and its score for every query.
+
+    The score is the euclidean distance for metric 'l2' (lower is better) and
+    the inner product for 'ip' (higher is better).
+    """
+    queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(len(queries), -1)
+    if index is not None:
+        scores, rows = index.search(queries, 1)
+        scores, rows = scores[:, 0], rows[:, 0]
+        if metric == 'l2':
+            scores = np.sqrt(np.maximum(scores, 0))
+        return rows.astype(np.int64), scores
+    if metric == 'l2':
+        sq = (queries ** 2).sum(1)[:, None] + (matrix ** 2).sum(1)[None, :] - 2 * queries @ matrix.T
+        rows = sq.argmin(axis=1)
+        scores = np.sqrt(np.maximum(sq[np.arange(len(queries)), rows], 0))
+    else:
+        sims = queries @ matrix.T
+        rows = sims.argmax(axis=1)
+        scores = sims[np.arange(len(queries)), rows]
+    return rows.astype(np.int64), scores.astype(np.float32)
+
+
+class _Snapshot:
+    def __init__(self, matrix, names, index):
+        self.matrix = matrix
+        self.names = names
+        self.index = index
+
+
+class Gallery:
+    """Reference encodings of `reference_dir`, cached in `store_dir`.
+
+    `encode_fn(path)` returns a 1-D encoding for an image, or None when it has
+    no usable face. `kind` names the encoder; a store written by a different
+    kind is ignored and rebuilt. `metric` is 'l2' or 'ip'.
+    """
+
+    def __init__(self, reference_dir, store_dir, encode_fn, kind, metric='l2'):
+        self.reference_dir = reference_dir
+        self.store_dir = store_dir
+        self.encode_fn = encode_fn
+        self.kind = kind
+        self.metric = metric
+        self._files = {}
+        self._snapshot = _Snapshot(np.empty((0, 0), dtype=np.float32), [], None)
+        self._write_lock = threading.Lock()
+        self._dir_mtime = None
+        self._store_mtime = None
+        self._checked_at = 0.0
+        with self._store_lock():
+            self._load_store()
+        self.refresh()
+
+    # --- store ---
+
+    @contextmanager
+    def _store_lock(self):
+        """Exclusive across processes (app workers, batch workers) sharing
+        store_dir, so the .npy and the .json are always read and written as
+        a pair."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(os.path.join(self.store_dir, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _index_mtime(self):
+        try:
+            return os.stat(os.path.join(self.store_dir, INDEX_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_store(self):
+        self._store_mtime = self._index_mtime()
+        try:
+            with open(os.path.join(self.store_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            matrix = np.load(os.path.join(self.store_dir, ENCODINGS_FILE))
+        except (OSError, ValueError):
+            return
+        # A store from another encoder, or a half-written one, is rebuilt from scratch
+        if meta.get('kind') != self.kind or meta.get('rows') != len(matrix):
+            return
+        self._files = meta['files']
+        names = [None] * len(matrix)
+        for entry in self._files.values():
+            if entry['row'] is not None:
+                names[entry['row']] = entry['name']
+        self._snapshot = _Snapshot(matrix.astype(np.float32, copy=False), names, None)
+
+    def _save_store(self, matrix):
+        """Call with _store_lock held."""
+        os.makedirs(self.store_dir, exist_ok=True)
+        # .npy first, then the index that references it; both replaced atomically
+        buf = io.BytesIO()
+        np.save(buf, matrix)
+        atomic_write(os.path.join(self.store_dir, ENCODINGS_FILE), buf.getvalue())
+        meta = {'kind': self.kind, 'rows': len(matrix), 'files': self._files}
+        atomic_write(os.path.join(self.store_dir, INDEX_FILE), json.dumps(meta).encode('utf-8'))
+        self._store_mtime = self._index_mtime()
+
+    # --- updates ---
+
+    def _scan(self):
+        found = {}
+        if not os.path.isdir(self.reference_dir):
+            return found
+        for entry in os.scandir(self.reference_dir):
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                found[entry.name] = entry.stat()
+        return found
+
+    def refresh(self):
+        """Bring the gallery in line with `reference_dir`.
+
+        Returns counts of added, updated, removed and unchanged files.
+        """
+        # The store lock is held while encoding too: another process waiting
+        # on it then loads the result instead of encoding the same files
+        with self._write_lock, self._store_lock():
+            if os.path.isdir(self.reference_dir):
+                self._dir_mtime = os.stat(self.reference_dir).st_mtime_ns
+            self._checked_at = time.monotonic()
+            if self._index_mtime() != self._store_mtime:
+                # Another process (app worker, batch worker) updated the store:
+                # start from its encodings instead of encoding the same files again
+                self._load_store()
+            old = self._snapshot
+            stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+            files = {}
+            rows = []
+            for fname, st in sorted(self._scan().items()):
+                path = os.path.join(self.reference_dir, fname)
+                prev = self._files.get(fname)
+                entry = {'name': os.path.splitext(fname)[0], 'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+                if prev and prev['mtime_ns'] == st.st_mtime_ns and prev['size'] == st.st_size:
+                    entry['sha1'] = prev['sha1']
+                else:
+                    entry['sha1'] = file_sha1(path)
+
+                if prev and prev['sha1'] == entry['sha1']:
+                    vector = old.matrix[prev['row']] if prev['row'] is not None else None
+                    stats['unchanged'] += 1
+                else:
+                    try:
+                        vector = self.encode_fn(path)
+                    except Exception:
+                        vector = None
+                    stats['updated' if prev else 'added'] += 1
+
+                entry['row'] = None
+                if vector is not None:
+                    entry['row'] = len(rows)
+                    rows.append(np.asarray(vector, dtype=np.float32).reshape(-1))
+                files[fname] = entry
+            stats['removed'] = len(set(self._files) - set(files))
+
+            matrix = np.stack(rows) if rows else np.empty((0, 0), dtype=np.float32)
+            names = [None] * len(rows)
+            for entry in files.values():
+                if entry['row'] is not None:
+                    names[entry['row']] = entry['name']
+
+            changed = files != self._files
+            self._files = files
+            if changed:
+                self._save_store(matrix)
+            if changed or old.index is None:
+                self._snapshot = _Snapshot(matrix, names, build_index(matrix, self.metric))
+            return stats
+
+    def add(self, name, data, ext='.jpg'):
+        """Store image bytes as reference/<name><ext> and encode it."""
+        os.makedirs(self.reference_dir, exist_ok=True)
+        atomic_write(os.path.join(self.reference_dir, name + ext), data)
+        return self.refresh()
+
+    def remove(self, name):
+        """Delete every reference image labelled `name`. Returns the number of files removed."""
+        removed = 0
+        for fname in list(self._scan()):
+            if os.path.splitext(fname)[0] == name:
+                os.remove(os.path.join(self.reference_dir, fname))
+                removed += 1
+        if removed:
+            self.refresh()
+        return removed
+
+    def maybe_refresh(self):
+        """Pick up files added or removed by hand, at most every CHECK_INTERVAL seconds."""
+        if not CHECK_INTERVAL or time.monotonic() - self._checked_at < CHECK_INTERVAL:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self.reference_dir).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._dir_mtime:
+            self.refresh()
+
+    # --- lookups ---
+
+    def __len__(self):
+        return len(self._snapshot.names)
+
+    def names(self):
+        return sorted(set(self._snapshot.names))
+
+    def lookup(self, vectors):
+        """Closest reference for every row of `vectors`: a list of (name, score),
+        or (None, None) per row while the gallery is empty."""
+        self.maybe_refresh()
+        snap = self._snapshot
+        if len(vectors) == 0 or len(snap.names) == 0:
+            return [(None, None)] * len(vectors)
+        rows, scores = nearest(snap.matrix, snap.index, vectors, self.metric)
+        return [(snap.names[r], float(s)) if r >= 0 else (None, None) for r, s in zip(rows, scores)]
@@ -0,0 +1,370 @@
+"""Face recognition on video files, cameras and network streams.
+
+    python -m utils.video clip.mp4 [--every 5] [--workers 2] [--out annotated.mp4]
+    python -m utils.video rtsp://host/stream --tracker mil
+    python -m utils.video clip.mp4 --realtime      # read a file at its own frame rate, like a live stream
+
+Pipeline:
+    reader thread    cv2.VideoCapture -> bounded queue (live sources drop the
+                     oldest frame when it is full, files wait)
+    worker pool      full face detection on every `every`-th frame (keyframe)
+    in order         keyframe detections are matched to tracks by IoU; only
+                     new tracks are encoded and looked up in the gallery, and
+                     a track keeps its identity afterwards. Frames between
+                     keyframes get their boxes from the tracker ('iou':
+                     constant-velocity extrapolation, 'kcf'/'mil': OpenCV trackers)
+
+VideoRecognizer.run() yields a FrameResult per frame; .stats() reports
+sustained FPS and capture-to-result latency.
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+from .face_utils import detect_faces_in_frame, encode_faces, is_match, open_gallery
+
+# Video frames are detected at this size (longest side); 0 = full resolution
+VIDEO_DETECT_MAX_DIM = int(os.environ.get('FACEAPP_VIDEO_DETECT_MAX_DIM', '640'))
+TRACKERS = ('iou', 'kcf', 'mil')
+
+_END = object()
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+    h = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+    inter = w * h
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FrameReader(threading.Thread):
+    """Reads frames on its own thread into a bounded queue of
+    (index, capture time, frame). With `drop_frames` a full queue loses its
+    oldest frame (live streams: stay current); without, the reader waits."""
+
+    def __init__(self, source, max_queue=8, drop_frames=False, realtime=False):
+        super().__init__(name='frame-reader', daemon=True)
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video source {source!r}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 25.0
+        self.frames = queue.Queue(max_queue)
+        self.drop_frames = drop_frames
+        self.realtime = realtime
+        self.dropped = 0
+        self._stop = threading.Event()
+
+    def run(self):
+        index = 0
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if self.realtime:
+                    # pace a file like a camera: frame i is available at i / fps
+                    delay = start + index / self.fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                ok, frame = self.capture.read()
+                if not ok:
+                    break
+                item = (index, time.perf_counter(), frame)
+                index += 1
+                if self.drop_frames:
+                    while True:
+                        try:
+                            self.frames.put_nowait(item)
+                            break
+                        except queue.Full:
+                            try:
+                                self.frames.get_nowait()
+                                self.dropped += 1
+                            except queue.Empty:
+                                pass
+                else:
+                    while not self._stop.is_set():
+                        try:
+                            self.frames.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+        finally:
+            self.capture.release()
+            while True:
+                try:
+                    self.frames.put(_END, timeout=0.1)
+                    break
+                except queue.Full:
+                    if self._stop.is_set():
+                        break
+
+    def stop(self):
+        self._stop.set()
+
+
+class Track:
+    def __init__(self, track_id, box, frame_index):
+        self.id = track_id
+        self.box = np.asarray(box, dtype=np.float64)
+        # last detection and per-frame velocity between the last two detections
+        self.detected_box = self.box
+        self.detected_at = frame_index
+        self.velocity = np.zeros(4)
+        self.misses = 0
+        self.name = None
+        self.score = None
+        self.lookups = 0
+        self.cv_tracker = None
+
+
+class FaceTracker:
+    """IoU tracker: keyframe detections are matched greedily to existing
+    tracks (IoU >= iou_threshold); unmatched detections start new tracks and
+    tracks missed `max_misses` keyframes in a row are dropped."""
+
+    def __init__(self, kind='iou', iou_threshold=0.3, max_misses=2):
+        if kind not in TRACKERS:
+            raise ValueError(f"Unknown tracker '{kind}', expected one of {TRACKERS}")
+        if kind == 'kcf' and not hasattr(cv2, 'TrackerKCF_create'):
+            raise ValueError("The 'kcf' tracker needs opencv-contrib-python; use 'iou' or 'mil'")
+        self.kind = kind
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks = []
+        self._next_id = 1
+
+    def _start_cv_tracker(self, track, frame):
+        if self.kind == 'iou':
+            return
+        track.cv_tracker = cv2.TrackerKCF_create() if self.kind == 'kcf' else cv2.TrackerMIL_create()
+        track.cv_tracker.init(frame, tuple(int(v) for v in track.box))
+
+    def update(self, detections, frame_index, frame):
+        """Apply keyframe detections. Returns the tracks that were just created."""
+        pairs = sorted(((iou(t.box, d), ti, di) for ti, t in enumerate(self.tracks)
+                        for di, d in enumerate(detections)), reverse=True)
+        matched_tracks, matched_dets = set(), set()
+        for overlap, ti, di in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if ti in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            track = self.tracks[ti]
+            box = np.asarray(detections[di], dtype=np.float64)
+            track.velocity = (box - track.detected_box) / max(1, frame_index - track.detected_at)
+            track.box = track.detected_box = box
+            track.detected_at, track.misses = frame_index, 0
+            self._start_cv_tracker(track, frame)
+
+        kept = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            kept.append(track)
+        new = []
+        for di, det in enumerate(detections):
+            if di not in matched_dets:
+                track = Track(self._next_id, det, frame_index)
+                self._next_id += 1
+                self._start_cv_tracker(track, frame)
+                new.append(track)
+        self.tracks = kept + new
+        return new
+
+    def predict(self, frame_index, frame):
+        """Move every track to `frame_index` (a frame between keyframes)."""
+        for track in self.tracks:
+            if track.cv_tracker is not None:
+                ok, box = track.cv_tracker.update(frame)
+                if ok:
+                    track.box = np.asarray(box, dtype=np.float64)
+            elif not track.misses:
+                track.box = track.detected_box + track.velocity * (frame_index - track.detected_at)
+
+
+class FrameResult:
+    def __init__(self, index, frame, faces, keyframe, latency):
+        self.index = index
+        self.frame = frame
+        self.faces = faces  # [{'track', 'name', 'box': [top, right, bottom, left], 'distance'}]
+        self.keyframe = keyframe
+        self.latency = latency
+
+
+class VideoRecognizer:
+    """`every`: run full detection on every N-th frame. `workers`: detection
+    threads (OpenCV and dlib release the GIL while detecting). Unknown tracks
+    are looked up on at most `unknown_retries` keyframes in all."""
+
+    def __init__(self, gallery, every=5, workers=2, max_dim=VIDEO_DETECT_MAX_DIM, tracker='iou',
+                 tolerance=0.5, unknown_retries=3):
+        self.gallery = gallery
+        self.every = max(1, every)
+        self.workers = workers
+        self.max_dim = max_dim
+        self.tracker_kind = tracker
+        self.tolerance = tolerance
+        self.unknown_retries = unknown_retries
+        self.source_fps = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.frames = 0
+        self.keyframes = 0
+        self.encodings = 0
+        self.dropped = 0
+        self.latencies = []
+        self.started = self.finished = None
+
+    def _identify(self, frame, tracks):
+        # Tracks just detected on this keyframe that have no name yet
+        tracks = [t for t in tracks if t.name is None and not t.misses and t.lookups < self.unknown_retries]
+        if not tracks:
+            return
+        boxes = [tuple(int(round(v)) for v in t.box) for t in tracks]
+        self.encodings += len(tracks)
+        for track, (name, score) in zip(tracks, self.gallery.lookup(encode_faces(frame, boxes))):
+            track.lookups += 1
+            track.score = score
+            if is_match(score, self.tolerance):
+                track.name = name
+
+    def _finish(self, tracker, index, captured, frame, future):
+        if future is not None:
+            tracker.update(future.result(), index, frame)
+            # known tracks keep their identity; only new / still unknown ones are encoded
+            self._identify(frame, tracker.tracks)
+        else:
+            tracker.predict(index, frame)
+        faces = []
+        height, width = frame.shape[:2]
+        for t in tracker.tracks:
+            x, y, w, h = t.box
+            left, top = int(max(0, x)), int(max(0, y))
+            right, bottom = int(min(width, x + w)), int(min(height, y + h))
+            faces.append({'track': t.id, 'name': t.name or 'Unknown', 'box': [top, right, bottom, left],
+                          'distance': t.score})
+        now = time.perf_counter()
+        self.frames += 1
+        self.latencies.append(now - captured)
+        self.finished = now
+        return FrameResult(index, frame, faces, future is not None, now - captured)
+
+    def run(self, source, drop_frames=None, realtime=False, max_queue=8):
+        """Yield a FrameResult for every frame of `source` (path, URL or camera index), in order."""
+        if drop_frames is None:
+            # files are read as fast as we process them; live sources must not fall behind
+            drop_frames = realtime or not (isinstance(source, str) and os.path.isfile(source))
+        self._reset_stats()
+        reader = FrameReader(source, max_queue=max_queue, drop_frames=drop_frames, realtime=realtime)
+        self.source_fps = reader.fps
+        tracker = FaceTracker(self.tracker_kind)
+        max_pending = self.workers * self.every * 2
+        pending = deque()
+        count = 0
+        reader.start()
+        self.started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix='face-detect') as pool:
+                done_reading = False
+                while not done_reading or pending:
+                    # emit every frame whose keyframe detection is ready, in order
+                    while pending and (pending[0][3] is None or pending[0][3].done()):
+                        yield self._finish(tracker, *pending.popleft())
+                    if done_reading:
+                        if pending:
+                            wait([pending[0][3]])
+                        continue
+                    if len(pending) >= max_pending:
+                        wait([pending[0][3]])
+                        continue
+                    try:
+                        item = reader.frames.get(timeout=0.005 if pending else None)
+                    except queue.Empty:
+                        continue
+                    if item is _END:
+                        done_reading = True
+                        continue
+                    index, captured, frame = item
+                    future = None
+                    if count % self.every == 0:
+                        future = pool.submit(detect_faces_in_frame, frame, self.max_dim)
+                        self.keyframes += 1
+                    count += 1
+                    pending.append((index, captured, frame, future))
+        finally:
+            reader.stop()
+            self.dropped = reader.dropped
+
+    def stats(self):
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        lat = np.asarray(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            'frames': self.frames,
+            'keyframes': self.keyframes,
+            'encodings': self.encodings,
+            'dropped': self.dropped,
+            'fps': round(self.frames / elapsed, 2) if elapsed > 0 else None,
+            'latency_p50_ms': round(float(np.percentile(lat, 50)), 1),
+            'latency_p99_ms': round(float(np.percentile(lat, 99)), 1),
+        }
+
+
+def annotate_frame(result):
+    """Draw boxes and names on the frame in place."""
+    for face in result.faces:
+        top, right, bottom, left = face['box']
+        cv2.rectangle(result.frame, (left, top), (right, bottom), (0, 255, 0), 2)
+        cv2.putText(result.frame, f"{face['name']} #{face['track']}", (left, max(12, top - 6)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1, cv2.LINE_AA)
+    return result.frame
+
+
+def main():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description='Face recognition on a video file or stream.')
+    parser.add_argument('source', help='video file, stream URL, or camera index')
+    parser.add_argument('--every', type=int, default=5, help='full detection every N frames')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--tracker', choices=TRACKERS, default='iou')
+    parser.add_argument('--max-dim', type=int, default=VIDEO_DETECT_MAX_DIM)
+    parser.add_argument('--realtime', action='store_true', help='read a file at its frame rate and drop frames when behind')
+    parser.add_argument('--out', help='write an annotated video here')
+    parser.add_argument('--reference', default=os.path.join(base_dir, 'reference'))
+    parser.add_argument('--gallery', default=os.environ.get('FACEAPP_GALLERY_DIR', os.path.join(base_dir, 'gallery_store')))
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    recognizer = VideoRecognizer(open_gallery(args.reference, args.gallery), every=args.every,
+                                 workers=args.workers, max_dim=args.max_dim, tracker=args.tracker)
+    writer = None
+    names = set()
+    for result in recognizer.run(source, realtime=args.realtime):
+        names.update(f['name'] for f in result.faces)
+        if args.out:
+            if writer is None:
+                height, width = result.frame.shape[:2]
+                writer = cv2.VideoWriter(args.out, cv2.VideoWriter_fourcc(*'mp4v'), recognizer.source_fps, (width, height))
+            writer.write(annotate_frame(result))
+    if writer is not None:
+        writer.release()
+    stats = recognizer.stats()
+    stats['names'] = sorted(names)
+    print(stats)
+
+
+if __name__ == '__main__':
+    main()
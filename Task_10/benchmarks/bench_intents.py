@@ -0,0 +1,123 @@
+"""Intent matching cost as the number of intents grows.
+
+Run from Task_10/:
+    python benchmarks/bench_intents.py [--intents 100 1000 10000] [--messages 2000]
+
+Synthetic intents get 3-8 keywords of 1-3 words from a `--vocab`-word
+vocabulary; messages are 5-25 random words, a third of them containing one
+keyword. (With a small vocabulary and many intents nearly every word is a
+keyword, and the automaton's time grows with the number of hits.)
+`substring` is the old /chat approach scaled up: one `in` check per keyword,
+intent by intent (and wrong on 'hi' in 'children'). `ngram scan` is the
+naive correct matcher: every keyword looked up among the message's word
+n-grams. `automaton` is intents.IntentMatcher. The automaton's answers are
+checked against the n-gram scan using the same priority rules.
+
+With --embedding-model (needs sentence-transformers) the fallback lookup is
+timed too, over the same intents.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import EmbeddingFallback, IntentMatcher, tokenize
+
+
+def make_intents(n, vocab, rng):
+    intents = []
+    for i in range(n):
+        keywords = {' '.join(rng.choices(vocab, k=rng.choice((1, 1, 2, 3)))) for _ in range(rng.randint(3, 8))}
+        intents.append({'name': f'intent{i}', 'priority': rng.randint(0, 9), 'keywords': sorted(keywords),
+                        'responses': [f'response {i}']})
+    return intents
+
+
+def make_messages(n, intents, vocab, rng):
+    messages = []
+    for i in range(n):
+        words = rng.choices(vocab, k=rng.randint(5, 25))
+        if i % 3 == 0:
+            keyword = rng.choice(rng.choice(intents)['keywords'])
+            words.insert(rng.randint(0, len(words)), keyword)
+        messages.append(' '.join(words))
+    return messages
+
+
+def substring_match(intents, message):
+    message = message.lower()
+    for intent in sorted(intents, key=lambda it: -it['priority']):
+        if any(k in message for k in intent['keywords']):
+            return intent
+    return None
+
+
+def ngram_match(intents, message):
+    tokens = tokenize(message)
+    grams = {' '.join(tokens[i:i + n]) for n in (1, 2, 3) for i in range(len(tokens) - n + 1)}
+    best, best_key = None, None
+    for i, intent in enumerate(intents):
+        hits = [len(k.split()) for k in intent['keywords'] if k in grams]
+        if hits:
+            key = (-intent['priority'], -len(hits), -max(hits), i)
+            if best_key is None or key < best_key:
+                best, best_key = intent, key
+    return best
+
+
+def per_message_us(fn, messages):
+    start = time.perf_counter()
+    for m in messages:
+        fn(m)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--intents', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--slow-messages', type=int, default=200, help='messages for the two naive matchers')
+    parser.add_argument('--vocab', type=int, default=200000)
+    parser.add_argument('--embedding-model', default='')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 9))) for _ in range(args.vocab)]
+
+    print(f"{'intents':>8}{'keywords':>10}{'build ms':>10}{'substring us':>14}{'ngram scan us':>15}"
+          f"{'automaton us':>14}{'agree':>8}")
+    for n in args.intents:
+        intents = make_intents(n, vocab, rng)
+        messages = make_messages(args.messages, intents, vocab, rng)
+        slow = messages[:args.slow_messages]
+
+        start = time.perf_counter()
+        matcher = IntentMatcher(intents, 'fallback')
+        build_ms = (time.perf_counter() - start) * 1000
+
+        substring_us = per_message_us(lambda m: substring_match(intents, m), slow)
+        ngram_us = per_message_us(lambda m: ngram_match(intents, m), slow)
+        automaton_us = per_message_us(matcher.match, messages)
+
+        agree = 0
+        for m in slow:
+            got = matcher.match(m)
+            want = ngram_match(intents, m)
+            agree += (got.intent if got else None) is want
+        print(f"{n:>8}{len(matcher.automaton):>10}{build_ms:>10.1f}{substring_us:>14.1f}{ngram_us:>15.1f}"
+              f"{automaton_us:>14.1f}{agree / len(slow):>8.1%}")
+
+        if args.embedding_model:
+            start = time.perf_counter()
+            fallback = EmbeddingFallback.from_model(args.embedding_model, intents)
+            index_s = time.perf_counter() - start
+            fallback_us = per_message_us(fallback.nearest, slow)
+            print(f"{'':>8}embedding fallback: index {index_s:.1f} s, {fallback_us / 1000:.2f} ms/message")
+
+
+if __name__ == '__main__':
+    main()
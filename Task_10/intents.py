@@ -0,0 +1,212 @@
+"""Keyword intent matching for the chatbot.
+
+    matcher = IntentMatcher.from_file('intents.json')
+    match = matcher.match('Can I book an appointment for my children?')
+    match.intent['name'], match.keywords        # 'appointment', ['appointment', 'book']
+
+Intents come from a JSON file:
+
+    {"fallback": "Sorry, ...",
+     "intents": [{"name": "greeting", "priority": 10,
+                  "keywords": ["hello", "hi", "good morning"],
+                  "responses": ["Hello! ..."],
+                  "examples": ["hey there"]}]}
+
+Messages and keywords are split into word tokens (case-insensitive), and
+keywords only match whole tokens, so 'hi' does not fire inside 'children'.
+All keywords of all intents are compiled into one Aho-Corasick automaton over
+tokens, so a message is matched in a single left-to-right pass whatever the
+number of intents. When several intents match, the highest `priority` wins,
+then the one with more matched keywords, then the longer keyword, then the
+one listed first.
+
+Messages with no keyword match can go to an optional embedding fallback
+(CHATBOT_EMBEDDING_MODEL, needs sentence-transformers): the nearest intent by
+cosine similarity over its keywords and `examples`, if above a threshold.
+"""
+import json
+import os
+import random
+import re
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+CHATBOT_EMBEDDING_MODEL = os.environ.get('CHATBOT_EMBEDDING_MODEL', '')
+CHATBOT_EMBEDDING_THRESHOLD = float(os.environ.get('CHATBOT_EMBEDDING_THRESHOLD', '0.55'))
+
+_TOKEN = re.compile(r"\w+(?:'\w+)*")
+
+Match = namedtuple('Match', 'intent keywords score source')
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.casefold())
+
+
+class TokenAutomaton:
+    """Aho-Corasick over word tokens: finds every keyword phrase in a token
+    list in one pass. `add` returns the phrase id reported by `search`."""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._lengths = []
+        self._built = False
+
+    def add(self, tokens):
+        node = 0
+        for token in tokens:
+            nxt = self._goto[node].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        phrase_id = len(self._lengths)
+        self._lengths.append(len(tokens))
+        self._out[node].append(phrase_id)
+        self._built = False
+        return phrase_id
+
+    def build(self):
+        """Compute failure links breadth-first and fold outputs along them."""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            self._fail[node] = 0
+        for node in queue:
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        self._built = True
+
+    def search(self, tokens):
+        """Yield phrase ids in order of the token where each match ends."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for token in tokens:
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            if out[node]:
+                yield from out[node]
+
+    def phrase_length(self, phrase_id):
+        return self._lengths[phrase_id]
+
+    def __len__(self):
+        return len(self._lengths)
+
+
+class EmbeddingFallback:
+    """Nearest intent by cosine similarity of sentence embeddings.
+
+    `encode` maps a list of texts to an (n, dim) array. Every intent is
+    represented by its keywords and examples; the best-scoring text decides.
+    """
+
+    def __init__(self, encode, intents, threshold=CHATBOT_EMBEDDING_THRESHOLD):
+        self.encode = encode
+        self.threshold = threshold
+        texts, owners = [], []
+        for i, intent in enumerate(intents):
+            for text in intent.get('keywords', []) + intent.get('examples', []):
+                texts.append(text)
+                owners.append(i)
+        self.owners = np.asarray(owners, dtype=np.int64)
+        self.vectors = self._normalize(encode(texts)) if texts else np.zeros((0, 1), np.float32)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    @classmethod
+    def from_model(cls, model_name, intents, threshold=CHATBOT_EMBEDDING_THRESHOLD):
+        if SentenceTransformer is None:
+            raise RuntimeError('the embedding fallback needs sentence-transformers')
+        model = SentenceTransformer(model_name, device='cpu')
+        return cls(lambda texts: model.encode(list(texts), batch_size=64), intents, threshold)
+
+    def nearest(self, message):
+        """(intent index, similarity) or None below the threshold."""
+        if not len(self.owners):
+            return None
+        scores = self.vectors @ self._normalize(self.encode([message]))[0]
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return int(self.owners[best]), float(scores[best])
+
+
+class IntentMatcher:
+    def __init__(self, intents, fallback_response, embedding_fallback=None):
+        self.intents = intents
+        self.fallback_response = fallback_response
+        self.embedding_fallback = embedding_fallback
+        self.automaton = TokenAutomaton()
+        self._owner = []          # phrase id -> intent index
+        self._phrases = []        # phrase id -> keyword as matched
+        for i, intent in enumerate(intents):
+            for keyword in intent.get('keywords', []):
+                tokens = tokenize(keyword)
+                if tokens:
+                    self.automaton.add(tokens)
+                    self._owner.append(i)
+                    self._phrases.append(' '.join(tokens))
+        self.automaton.build()
+
+    @classmethod
+    def from_file(cls, path, embedding_model=CHATBOT_EMBEDDING_MODEL):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        intents = data['intents']
+        for intent in intents:
+            if not intent.get('name') or not intent.get('responses'):
+                raise ValueError(f"{path}: every intent needs a name and at least one response")
+        fallback = EmbeddingFallback.from_model(embedding_model, intents) if embedding_model else None
+        return cls(intents, data.get('fallback', ''), fallback)
+
+    def match(self, message):
+        """Best Match for the message, or None."""
+        hits = {}     # intent index -> [matched keywords, longest keyword]
+        tokens = tokenize(message)
+        for phrase_id in self.automaton.search(tokens):
+            owner = self._owner[phrase_id]
+            hit = hits.setdefault(owner, [set(), 0])
+            hit[0].add(phrase_id)
+            hit[1] = max(hit[1], self.automaton.phrase_length(phrase_id))
+        if hits:
+            best = min(hits, key=lambda i: (-self.intents[i].get('priority', 0), -len(hits[i][0]), -hits[i][1], i))
+            matched = [self._phrases[p] for p in sorted(hits[best][0])]
+            return Match(self.intents[best], matched, float(len(matched)), 'keyword')
+        if self.embedding_fallback is not None and tokens:
+            nearest = self.embedding_fallback.nearest(message)
+            if nearest is not None:
+                return Match(self.intents[nearest[0]], [], nearest[1], 'embedding')
+        return None
+
+    def respond(self, message):
+        match = self.match(message)
+        if match is None:
+            return self.fallback_response, None
+        return random.choice(match.intent['responses']), match
+
+    def __len__(self):
+        return len(self.intents)
@@ -1,21 +1,144 @@
+import os
+import sys
+import threading
+import time
+
 from flask import Flask, render_template, request, jsonify
-from hadith_bot import get_similar_hadith
+import hadith_bot
+from hadith_bot import cached_search, check_count, search_hadith_batch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for common/
+from common.model_client import SidecarTimeout, connect_if_available
 
 app = Flask(__name__)
 
+# Upper bound on queries accepted by one /search/batch call
+MAX_BATCH_QUERIES = 256
+# Seconds between looks for the model server while searching in-process
+SIDECAR_RETRY_INTERVAL = float(os.environ.get('SIDECAR_RETRY_INTERVAL', '30'))
+
+# Use the shared model server when one is running (see model_server.py), so
+# this worker never loads the model or the index. Otherwise load the bundle and
+# the model in the background; /ready flips to 200 once both are loaded.
+# A model server that goes away is looked for again every
+# SIDECAR_RETRY_INTERVAL seconds, and used again once it answers.
+sidecar = connect_if_available()
+_sidecar_retry_at = time.monotonic() + SIDECAR_RETRY_INTERVAL
+_sidecar_lock = threading.Lock()
+if sidecar is None:
+    threading.Thread(target=hadith_bot.warm_up, daemon=True).start()
+
+
+def _sidecar():
+    """The model server client, or None while searching in-process."""
+    global sidecar, _sidecar_retry_at
+    if sidecar is None and time.monotonic() >= _sidecar_retry_at and _sidecar_lock.acquire(blocking=False):
+        try:
+            _sidecar_retry_at = time.monotonic() + SIDECAR_RETRY_INTERVAL
+            sidecar = connect_if_available()
+            if sidecar is not None:
+                app.logger.warning('Model server is back, searching through it again')
+        finally:
+            _sidecar_lock.release()
+    return sidecar
+
+
+def _use_in_process():
+    global sidecar, _sidecar_retry_at
+    if sidecar is not None:
+        app.logger.warning('Model server unreachable, falling back to in-process search')
+        sidecar = None
+        _sidecar_retry_at = time.monotonic() + SIDECAR_RETRY_INTERVAL
+        threading.Thread(target=hadith_bot.warm_up, daemon=True).start()
+
+
+def _search(query, **params):
+    client = _sidecar()
+    if client is not None:
+        try:
+            return client.search(query, **params)
+        except ConnectionError:
+            _use_in_process()
+    return cached_search(query, **params)
+
+
+def _search_batch(queries, **params):
+    client = _sidecar()
+    if client is not None:
+        try:
+            return client.search_batch(queries, **params)
+        except ConnectionError:
+            _use_in_process()
+    return search_hadith_batch(queries, **params)
+
+
+@app.errorhandler(SidecarTimeout)
+def sidecar_timeout(e):
+    # The model server is busy, not gone: report it instead of searching in-process
+    return jsonify({'error': str(e)}), 504
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'})
+
+@app.route('/ready')
+def ready():
+    client = _sidecar()
+    if client is not None:
+        try:
+            return jsonify({'ready': client.ping()['ready'], 'sidecar': True})
+        except ConnectionError:
+            _use_in_process()
+    if hadith_bot.is_ready():
+        return jsonify({'ready': True})
+    return jsonify({'ready': False}), 503
+
+@app.route('/metrics/cache')
+def cache_metrics():
+    client = _sidecar()
+    if client is not None:
+        try:
+            return jsonify(client.stats())
+        except ConnectionError:
+            _use_in_process()
+    return jsonify(hadith_bot.cache_stats())
+
 @app.route('/search', methods=['POST'])
 def search():
     data = request.get_json()
     query = data.get('query')
     if not query:
         return jsonify({'error': 'No query provided'}), 400
-    
-    results = get_similar_hadith(query)
+
+    # Optional per-request ANN tuning, ignored by index kinds it doesn't apply to
+    try:
+        results = _search(query, nprobe=data.get('nprobe'), ef_search=data.get('ef_search'),
+                          fields=data.get('fields'), mode=data.get('mode', 'semantic'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(results)
 
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    data = request.get_json()
+    queries = data.get('queries')
+    if not queries or not isinstance(queries, list) or not all(isinstance(q, str) and q for q in queries):
+        return jsonify({'error': 'queries must be a non-empty list of strings'}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({'error': f'At most {MAX_BATCH_QUERIES} queries per batch'}), 400
+
+    try:
+        count = check_count(data.get('count', 5))
+        results = _search_batch(queries, count=count, nprobe=data.get('nprobe'),
+                                ef_search=data.get('ef_search'), fields=data.get('fields'),
+                                mode=data.get('mode', 'semantic'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'results': results})
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,86 @@
+import queue
+import threading
+import time
+
+
+class _Pending:
+    __slots__ = ('item', 'event', 'result', 'error')
+
+    def __init__(self, item):
+        self.item = item
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QueryBatcher:
+    """Coalesces concurrent calls into one batched call.
+
+    Callers block in `submit(item)`. A single worker thread takes the first
+    waiting item, keeps collecting for up to `max_wait_ms` or until it has
+    `max_batch` items, calls `batch_fn(items)` once, and hands each caller
+    its own entry of the returned list. An exception instance in that list is
+    raised in its caller only; if `batch_fn` itself raises, every caller in
+    that batch gets the exception.
+
+    The worker only waits while other callers are in flight, so a lone
+    request is dispatched immediately instead of paying `max_wait_ms`.
+    """
+
+    def __init__(self, batch_fn, max_batch=32, max_wait_ms=3.0):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name='query-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, item, timeout=None):
+        pending = _Pending(item)
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            self._queue.put(pending)
+            if not pending.event.wait(timeout):
+                raise TimeoutError('Batched query timed out')
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            if self._in_flight <= len(batch) and self._queue.empty():
+                break
+            remaining = deadline - time.perf_counter()
+            try:
+                # Drain whatever is already queued even after the deadline
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.batch_fn([p.item for p in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+                for pending, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        pending.error = result
+                    else:
+                        pending.result = result
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                for pending in batch:
+                    pending.event.set()
@@ -0,0 +1,100 @@
+"""Recall / latency / memory benchmark for the FAISS index kinds.
+
+Run from Task_12/:
+    python benchmarks/bench_ann.py                      # vectors from hadith_bundle/vectors.npy
+    python benchmarks/bench_ann.py --synthetic 200000   # random vectors, e.g. to simulate several corpora
+
+Queries are held-out corpus vectors with a little noise added. Recall@k is
+measured against the exact flat index; latencies are single-query (batch of
+one), as served by /search.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hadith_bot
+from index_factory import build_index, index_nbytes, search
+
+
+def load_vectors(args):
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        # Clustered data behaves more like real embeddings than uniform noise
+        centers = rng.standard_normal((max(args.synthetic // 500, 1), args.dim)).astype(np.float32)
+        labels = rng.integers(0, len(centers), args.synthetic)
+        vectors = centers[labels] + 0.3 * rng.standard_normal((args.synthetic, args.dim)).astype(np.float32)
+        return vectors.astype(np.float32)
+    path = os.path.join(args.bundle, hadith_bot.BUNDLE_VECTORS)
+    return np.ascontiguousarray(np.load(path), dtype=np.float32)
+
+
+def make_queries(vectors, n_queries, rng):
+    idx = rng.choice(len(vectors), n_queries, replace=False)
+    noise = 0.05 * vectors.std() * rng.standard_normal((n_queries, vectors.shape[1]))
+    return (vectors[idx] + noise).astype(np.float32)
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run_queries(index, queries, k, **search_kw):
+    latencies = np.empty(len(queries))
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = search(index, q[None, :], k, **search_kw)
+        latencies[i] = time.perf_counter() - start
+        found[i] = ids[0]
+    return found, latencies * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bundle', default=hadith_bot.BUNDLE_DIR)
+    parser.add_argument('--synthetic', type=int, help='Use N random clustered vectors instead of the bundle')
+    parser.add_argument('--dim', type=int, default=384, help='Dimension for --synthetic')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--pq-m', type=int, default=16)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    rng = np.random.default_rng(1)
+    queries = make_queries(vectors, min(args.queries, len(vectors)), rng)
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}, {len(queries)} queries, k={args.k}\n")
+
+    # (kind, build kwargs, list of per-request search settings to sweep)
+    configs = [
+        ('flat', {}, [{}]),
+        ('ivf', {}, [{'nprobe': p} for p in (1, 4, 16, 64)]),
+        ('hnsw', {'m': 32}, [{'ef_search': e} for e in (16, 32, 64, 128)]),
+        ('ivfpq', {'pq_m': args.pq_m}, [{'nprobe': p} for p in (4, 16, 64)]),
+    ]
+
+    header = f"{'index':<8}{'setting':<16}{'build s':>9}{'MB':>9}{'recall@k':>10}{'p50 ms':>9}{'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    truth = None
+    for kind, build_kw, sweeps in configs:
+        start = time.perf_counter()
+        index, _ = build_index(vectors, kind, max_train_points=100_000, **build_kw)
+        build_s = time.perf_counter() - start
+        mb = index_nbytes(index) / 1e6
+        for setting in sweeps:
+            found, lat = run_queries(index, queries, args.k, **setting)
+            if truth is None:
+                truth = found
+            label = ','.join(f"{k}={v}" for k, v in setting.items()) or '-'
+            print(f"{kind:<8}{label:<16}{build_s:>9.2f}{mb:>9.1f}{recall_at_k(found, truth):>10.3f}"
+                  f"{np.percentile(lat, 50):>9.3f}{np.percentile(lat, 99):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
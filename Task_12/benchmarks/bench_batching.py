@@ -0,0 +1,77 @@
+"""Throughput of per-query search vs the request coalescer.
+
+Run from Task_12/ (uses the bundle if present):
+    python benchmarks/bench_batching.py [--requests 512] [--clients 1 8 64]
+
+`direct` encodes and searches every query on its own, like the old /search.
+`coalesced` goes through hadith_bot.search_coalesced, which merges
+concurrent queries into one model.encode + one index search. `batch` sends
+the same queries through /search/batch-style calls of 32.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hadith_bot
+
+SAMPLE_QUERIES = [
+    "How many prayers are there?",
+    "fasting in ramadan",
+    "charity to the poor",
+    "the night journey",
+    "ablution before prayer",
+    "kindness to parents",
+    "pilgrimage to mecca",
+    "the day of judgement",
+]
+
+
+def run(fn, queries, clients):
+    latencies = np.empty(len(queries))
+
+    def timed(i):
+        start = time.perf_counter()
+        fn(queries[i])
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(timed, range(len(queries))))
+    elapsed = time.perf_counter() - start
+    return len(queries) / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=512)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 64])
+    args = parser.parse_args()
+
+    hadith_bot.warm_up()
+    # Make every query distinct so nothing downstream can short-circuit repeats
+    queries = [f"{SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]} {i}" for i in range(args.requests)]
+
+    modes = {
+        'direct': lambda q: hadith_bot.search_hadith_batch([q]),
+        'coalesced': hadith_bot.search_coalesced,
+    }
+    print(f"{'mode':<10}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for clients in args.clients:
+        for name, fn in modes.items():
+            qps, p50, p99 = run(fn, queries, clients)
+            print(f"{name:<10}{clients:>8}{qps:>10.1f}{p50:>10.2f}{p99:>10.2f}")
+
+    start = time.perf_counter()
+    for i in range(0, len(queries), 32):
+        hadith_bot.search_hadith_batch(queries[i:i + 32])
+    print(f"\nbatch of 32: {len(queries) / (time.perf_counter() - start):.1f} queries/s")
+
+
+if __name__ == '__main__':
+    main()
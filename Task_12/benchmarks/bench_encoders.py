@@ -0,0 +1,86 @@
+"""Latency, throughput, RSS and agreement of the encoder backends.
+
+Run from Task_12/:
+    python benchmarks/bench_encoders.py [--backends torch onnx onnx-int8] [--threads 4]
+
+Every backend runs in a fresh interpreter so RSS and load time are its own.
+Agreement is the cosine between each backend's vectors and torch's.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+TASK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, resource, sys, time
+import numpy as np
+t0 = time.perf_counter()
+sys.path.insert(0, '..')   # repo root, for common/
+from common.encoders import load_encoder, AGREEMENT_TEXTS
+backend, model_name, threads, out_path = sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4]
+encoder = load_encoder(model_name, backend, threads=threads)
+load_s = time.perf_counter() - t0
+
+encoder.encode(["warm up"])
+single = []
+for i in range(50):
+    start = time.perf_counter()
+    encoder.encode([f"How many prayers are there? {i}"])
+    single.append(time.perf_counter() - start)
+
+texts = [f"{AGREEMENT_TEXTS[i % len(AGREEMENT_TEXTS)]} {i}" for i in range(512)]
+start = time.perf_counter()
+encoder.encode(texts, batch_size=64)
+throughput = len(texts) / (time.perf_counter() - start)
+
+np.save(out_path, encoder.encode(texts[:128]))
+print("RESULT " + json.dumps({
+    'load_s': load_s,
+    'p50_ms': float(np.percentile(single, 50) * 1000),
+    'p99_ms': float(np.percentile(single, 99) * 1000),
+    'texts_per_s': throughput,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+'''
+
+
+def run_backend(backend, model_name, threads, out_path):
+    proc = subprocess.run([sys.executable, '-c', CHILD, backend, model_name, str(threads), out_path],
+                          cwd=TASK_DIR, capture_output=True, text=True, check=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+    raise RuntimeError(f"No result from {backend}:\n{proc.stdout}\n{proc.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='sentence-transformers/all-MiniLM-L6-v2')
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'onnx-int8'])
+    parser.add_argument('--threads', type=int, default=0, help='intra-op threads, 0 = runtime default')
+    args = parser.parse_args()
+
+    vectors = {}
+    print(f"{'backend':<11}{'load s':>8}{'p50 ms':>9}{'p99 ms':>9}{'texts/s':>10}{'RSS MB':>9}{'min cos':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            out_path = os.path.join(tmp, f"{backend}.npy")
+            r = run_backend(backend, args.model, args.threads, out_path)
+            vectors[backend] = np.load(out_path)
+            agreement = '-'
+            if 'torch' in vectors and backend != 'torch':
+                a, b = vectors['torch'], vectors[backend]
+                cos = (a * b).sum(1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+                agreement = f"{cos.min():.4f}"
+            print(f"{backend:<11}{r['load_s']:>8.2f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                  f"{r['texts_per_s']:>10.1f}{r['peak_rss_mb']:>9.0f}{agreement:>9}")
+
+
+if __name__ == '__main__':
+    main()
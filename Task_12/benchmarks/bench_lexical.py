@@ -0,0 +1,50 @@
+"""Latency of the BM25 path on its own.
+
+Run from Task_12/ after `python build_bundle.py`:
+    python benchmarks/bench_lexical.py [--repeats 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hadith_bot
+from lexical import BM25Index, tokenize
+
+QUERIES = [
+    "abu hurairah",
+    "fasting in ramadan",
+    "how many prayers are there",
+    "the prophet said whoever believes in allah and the last day",
+    "aisha",
+    "1",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bundle', default=hadith_bot.BUNDLE_DIR)
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    index = BM25Index.open(os.path.join(args.bundle, hadith_bot.BUNDLE_LEXICAL))
+    print(f"{len(index)} documents, {len(index.vocab)} terms, {len(index.doc_ids)} postings\n")
+    print(f"{'query':<62}{'p50 us':>10}{'p99 us':>10}")
+    for query in QUERIES:
+        tokens = tokenize(hadith_bot.clean_text(query))
+        index.search(tokens, args.k)  # fault the pages in once
+        lat = np.empty(args.repeats)
+        for i in range(args.repeats):
+            start = time.perf_counter()
+            index.search(tokens, args.k)
+            lat[i] = time.perf_counter() - start
+        print(f"{query[:60]:<62}{np.percentile(lat, 50) * 1e6:>10.1f}{np.percentile(lat, 99) * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
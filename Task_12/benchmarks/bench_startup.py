@@ -0,0 +1,63 @@
+"""Startup-time benchmark: corpus build path vs prebuilt bundle.
+
+Run from Task_12/ after `python build_bundle.py`:
+    python benchmarks/bench_startup.py [--repeats 3]
+
+Each measurement runs in a fresh interpreter so nothing is shared between
+runs (the OS page cache is, which is what a restarted pod sees as well).
+Reported times are medians in seconds; RSS is the child's peak in MB.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+TASK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, resource, sys, time
+t0 = time.perf_counter()
+import hadith_bot
+t_import = time.perf_counter() - t0
+if sys.argv[1] == 'corpus':
+    state = hadith_bot.build_in_process()
+else:
+    state = hadith_bot.load_bundle()
+t_index = time.perf_counter() - t0
+hadith_bot.get_model()
+t_model = time.perf_counter() - t0
+hadith_bot._state = state
+hadith_bot.get_similar_hadith("How many prayers are there?")
+t_query = time.perf_counter() - t0
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print("RESULT " + json.dumps({'import': t_import, 'index_ready': t_index,
+                              'model_ready': t_model, 'first_query': t_query, 'peak_rss_mb': rss_mb}))
+'''
+
+
+def run_once(mode):
+    proc = subprocess.run([sys.executable, '-c', CHILD, mode], cwd=TASK_DIR,
+                          capture_output=True, text=True, check=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+    raise RuntimeError(f"No result from {mode} run:\n{proc.stdout}\n{proc.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    keys = ['import', 'index_ready', 'model_ready', 'first_query', 'peak_rss_mb']
+    print(f"{'path':<8}" + ''.join(f"{k:>14}" for k in keys))
+    for mode in ('corpus', 'bundle'):
+        runs = [run_once(mode) for _ in range(args.repeats)]
+        row = [statistics.median(r[k] for r in runs) for k in keys]
+        print(f"{mode:<8}" + ''.join(f"{v:>14.2f}" for v in row))
+
+
+if __name__ == '__main__':
+    main()
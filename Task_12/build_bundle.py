@@ -0,0 +1,96 @@
+"""Offline build of the hadith search bundle.
+
+Usage:
+    python build_bundle.py [--corpus LK-Hadith-Corpus] [--out hadith_bundle]
+                           [--index flat|ivf|hnsw|ivfpq] [--nlist N] [--pq-m M] [--hnsw-m M]
+
+Writes everything the server needs to start without touching the CSVs or the
+model:
+    bundle.json        model name, row count, dimension, corpus fingerprint
+    metadata/          result columns in a columnar store (see metadata_store.py)
+    index.faiss        trained FAISS index (opened with IO_FLAG_MMAP by the server)
+    vectors.npy        float32 embeddings (memory-mappable)
+    lexical/           BM25 inverted index over Cleaned_Hadith (see lexical.py)
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import hadith_bot
+from embedding_store import file_digest
+from index_factory import INDEX_KINDS
+
+
+def corpus_fingerprint(files):
+    h = hashlib.sha256()
+    for path in files:
+        h.update(os.path.normpath(path).encode('utf-8'))
+        h.update(file_digest(path).encode('ascii'))
+    return h.hexdigest()
+
+
+def build(corpus=hadith_bot.REPO_PATH, out_dir=hadith_bot.BUNDLE_DIR, index_kind=hadith_bot.INDEX_KIND, **index_params):
+    import faiss
+
+    start = time.perf_counter()
+    hadith_df, file_rows = hadith_bot.load_corpus(corpus)
+    if len(hadith_df) == 0:
+        raise SystemExit(f"No hadith found under {corpus}")
+    embeddings = hadith_bot.compute_embeddings(hadith_df, file_rows)
+    faiss_index, index_params = hadith_bot.build_faiss_index(embeddings, index_kind, **index_params)
+
+    # Write into a temp dir and swap it in, so a running server never sees a half-written bundle
+    tmp_dir = out_dir.rstrip('/\\') + '.tmp'
+    os.makedirs(tmp_dir, exist_ok=True)
+    hadith_bot.build_metadata_store(hadith_df).write(os.path.join(tmp_dir, hadith_bot.BUNDLE_METADATA))
+    hadith_bot.build_lexical_index(hadith_df).write(os.path.join(tmp_dir, hadith_bot.BUNDLE_LEXICAL))
+    faiss.write_index(faiss_index, os.path.join(tmp_dir, hadith_bot.BUNDLE_INDEX))
+    embeddings.save(os.path.join(tmp_dir, hadith_bot.BUNDLE_VECTORS))
+    meta = {
+        'model': hadith_bot.MODEL_NAME,
+        'encoder': hadith_bot.ENCODER_ID,
+        'rows': int(len(hadith_df)),
+        'dim': int(embeddings.shape[1]),
+        'index': {'kind': index_kind, 'params': index_params},
+        'corpus_sha256': corpus_fingerprint([file for file, _ in file_rows]),
+        'built_at': int(time.time()),
+    }
+    with open(os.path.join(tmp_dir, hadith_bot.BUNDLE_META), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    if os.path.isdir(out_dir):
+        old_dir = out_dir.rstrip('/\\') + '.old'
+        if os.path.isdir(old_dir):
+            _rmtree(old_dir)
+        os.replace(out_dir, old_dir)
+        os.replace(tmp_dir, out_dir)
+        _rmtree(old_dir)
+    else:
+        os.replace(tmp_dir, out_dir)
+
+    print(f"Bundle with {meta['rows']} rows written to {out_dir} in {time.perf_counter() - start:.1f}s")
+    return meta
+
+
+def _rmtree(path):
+    import shutil
+    shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the hadith search bundle.')
+    parser.add_argument('--corpus', default=hadith_bot.REPO_PATH, help='Folder with the LK-Hadith-Corpus CSVs')
+    parser.add_argument('--out', default=hadith_bot.BUNDLE_DIR, help='Output bundle directory')
+    parser.add_argument('--index', default=hadith_bot.INDEX_KIND, choices=INDEX_KINDS, help='FAISS index kind')
+    parser.add_argument('--nlist', type=int, help='IVF lists (default: ~4*sqrt(N))')
+    parser.add_argument('--nprobe', type=int, help='Default IVF lists probed per query')
+    parser.add_argument('--pq-m', type=int, help='IVF-PQ sub-quantizers (must divide the dimension)')
+    parser.add_argument('--pq-bits', type=int, help='IVF-PQ bits per code')
+    parser.add_argument('--hnsw-m', type=int, help='HNSW links per node')
+    parser.add_argument('--ef-construction', type=int, help='HNSW build-time search depth')
+    parser.add_argument('--ef-search', type=int, help='Default HNSW search depth')
+    args = parser.parse_args()
+    build(args.corpus, args.out, args.index, nlist=args.nlist, nprobe=args.nprobe, pq_m=args.pq_m,
+          pq_bits=args.pq_bits, m=args.hnsw_m, ef_construction=args.ef_construction, ef_search=args.ef_search)
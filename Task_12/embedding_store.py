@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the sha256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _model_slug(model_name):
+    return re.sub(r'[^a-zA-Z0-9]+', '-', model_name).strip('-').lower()
+
+
+class ShardedArray:
+    """Row-wise concatenation of 2-d arrays (e.g. memory-mapped shards) that
+    does not copy them. Indexing with row ids reads just those rows."""
+
+    def __init__(self, shards):
+        self.shards = list(shards)
+        self.offsets = np.cumsum([0] + [len(s) for s in self.shards])
+        dim = self.shards[0].shape[1] if self.shards else 0
+        self.shape = (int(self.offsets[-1]), dim)
+        self.dtype = np.result_type(*self.shards) if self.shards else np.dtype(np.float32)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        flat = rows.reshape(-1)
+        if flat.size and (flat.min() < 0 or flat.max() >= len(self)):
+            raise IndexError(f"row ids must be in 0..{len(self) - 1}")
+        out = np.empty((flat.size, self.shape[1]), dtype=self.dtype)
+        which = np.searchsorted(self.offsets, flat, side='right') - 1
+        for s in np.unique(which):
+            mask = which == s
+            out[mask] = self.shards[s][flat[mask] - self.offsets[s]]
+        return out.reshape(rows.shape + (self.shape[1],))
+
+    def save(self, path, dtype=np.float32):
+        """Write all rows to one .npy file, a shard at a time."""
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=self.shape)
+        for start, shard in zip(self.offsets, self.shards):
+            out[start:start + len(shard)] = shard
+        out.flush()
+        del out
+
+
+class EmbeddingStore:
+    """Per-file embedding cache keyed by content hash and model name.
+
+    Every source file gets its own ``.npy`` shard under ``root/shards``.
+    ``manifest.json`` records the digest, row count and shard for each file,
+    so after a corpus update only the files whose content changed are
+    re-encoded. Shards are opened with ``mmap_mode='r'`` so a cold start maps
+    the vectors instead of reading them into RAM.
+    """
+
+    def __init__(self, root, model_name, encode_fn, dtype='float32'):
+        if np.dtype(dtype) not in (np.dtype('float32'), np.dtype('float16')):
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.root = root
+        self.model_name = model_name
+        self.encode_fn = encode_fn
+        self.dtype = np.dtype(dtype).name
+        self.shard_dir = os.path.join(root, 'shards')
+        os.makedirs(self.shard_dir, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    def _read_manifest(self):
+        empty = {'model': self.model_name, 'dtype': self.dtype, 'dim': None, 'files': {}}
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return empty
+        # A different model or dtype invalidates every shard
+        if manifest.get('model') != self.model_name or manifest.get('dtype') != self.dtype:
+            return empty
+        return manifest
+
+    def _write_manifest(self):
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _shard_name(self, digest):
+        return f"{digest[:24]}_{_model_slug(self.model_name)}_{self.dtype}.npy"
+
+    def embeddings_for(self, path, texts_fn):
+        """Return a read-only memory map with the embeddings of one file.
+
+        ``texts_fn`` is only called (and the model only run) when the file is
+        new or its contents changed since the shard was written.
+        """
+        key = os.path.normpath(path)
+        digest = file_digest(path)
+        entry = self.manifest['files'].get(key)
+        if entry and entry['sha256'] == digest:
+            shard_path = os.path.join(self.shard_dir, entry['shard'])
+            if os.path.exists(shard_path):
+                return np.load(shard_path, mmap_mode='r')
+
+        texts = list(texts_fn())
+        vectors = np.asarray(self.encode_fn(texts), dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(texts):
+            raise ValueError(f"Encoder returned shape {vectors.shape} for {len(texts)} texts")
+        if self.manifest.get('dim') is None:
+            self.manifest['dim'] = int(vectors.shape[1])
+        elif vectors.shape[1] != self.manifest['dim']:
+            raise ValueError(f"Embedding dimension changed from {self.manifest['dim']} to {vectors.shape[1]}")
+
+        shard = self._shard_name(digest)
+        shard_path = os.path.join(self.shard_dir, shard)
+        tmp_path = shard_path + '.tmp.npy'
+        np.save(tmp_path, vectors.astype(self.dtype))
+        os.replace(tmp_path, shard_path)
+
+        self.manifest['files'][key] = {'sha256': digest, 'rows': int(vectors.shape[0]), 'shard': shard}
+        self._write_manifest()
+        return np.load(shard_path, mmap_mode='r')
+
+    def prune(self, keep_paths):
+        """Drop manifest entries and shards for files no longer in the corpus."""
+        keep = {os.path.normpath(p) for p in keep_paths}
+        removed = [k for k in self.manifest['files'] if k not in keep]
+        for key in removed:
+            del self.manifest['files'][key]
+        live_shards = {e['shard'] for e in self.manifest['files'].values()}
+        for fname in os.listdir(self.shard_dir):
+            if fname not in live_shards:
+                try:
+                    os.remove(os.path.join(self.shard_dir, fname))
+                except OSError:
+                    pass
+        if removed:
+            self._write_manifest()
+        return removed
@@ -1,18 +1,77 @@
 import glob
 import re
-import pandas as pd
-import numpy as np
+import json
 import os
-from sentence_transformers import SentenceTransformer
-import faiss
+import sys
+import threading
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for common/
+from common.cache import TTLCache
+from common.encoders import CachedEncoder, encoder_id, normalize_text
+
+# pandas, faiss and the encoder backend are imported lazily so that
+# importing this module (e.g. from app.py) is cheap.
 
 # 1. Setup Paths
 # Changed from '/content/LK-Hadith-Corpus' to local path
 REPO_PATH = 'LK-Hadith-Corpus'
+BUNDLE_DIR = os.environ.get('HADITH_BUNDLE_DIR', 'hadith_bundle')
+
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+# MODEL_NAME plus the encoder backend (ENCODER_BACKEND, see common/encoders.py);
+# vectors from different backends are never mixed in a cache.
+ENCODER_ID = encoder_id(MODEL_NAME)
+
+# Per-file shards keyed by CSV content hash + model name (see embedding_store.py).
+# Only new or edited CSVs are re-encoded; unchanged shards are memory-mapped.
+EMBEDDINGS_DIR = 'hadith_embeddings'
+EMBEDDINGS_DTYPE = os.environ.get('HADITH_EMBEDDINGS_DTYPE', 'float32')
+
+# Bundle layout written by build_bundle.py
+BUNDLE_META = 'bundle.json'
+BUNDLE_METADATA = 'metadata'
+BUNDLE_INDEX = 'index.faiss'
+BUNDLE_VECTORS = 'vectors.npy'
+BUNDLE_LEXICAL = 'lexical'
+
+# Index kind for the in-process build path; bundles record their own (see index_factory.py)
+INDEX_KIND = os.environ.get('HADITH_INDEX_KIND', 'flat')
+
+# Columns kept in the metadata store (the ones search results use), see metadata_store.py
+RESULT_COLUMNS = ['English_Hadith', 'Chapter_English', 'Section_English', 'Arabic_Hadith', 'English_Grade']
+INTERNED_COLUMNS = ['Chapter_English', 'Section_English', 'English_Grade']
+
+# Result fields a caller can ask for, and the columns each one needs.
+# The ranking scores ('distance' and/or 'score', depending on the mode) are always returned.
+RESULT_FIELDS = {
+    'hadith': ['English_Hadith'],
+    'source': ['Chapter_English', 'Section_English'],
+    'arabic_hadith': ['Arabic_Hadith'],
+    'grade': ['English_Grade'],
+}
+
+# semantic: FAISS only (the original behaviour)
+# lexical:  BM25 over Cleaned_Hadith only, no model call
+# hybrid:   both, fused with reciprocal-rank fusion
+# rerank:   BM25 picks candidates, embeddings re-rank them exactly
+SEARCH_MODES = ('semantic', 'lexical', 'hybrid', 'rerank')
+# Query embedding cache (keyed on model + normalized text) and the optional
+# /search response cache (keyed on the bundle version too). Size 0 disables a tier.
+EMBED_CACHE_SIZE = int(os.environ.get('HADITH_EMBED_CACHE_SIZE', '10000'))
+EMBED_CACHE_TTL = float(os.environ.get('HADITH_EMBED_CACHE_TTL', '3600'))
+RESPONSE_CACHE_SIZE = int(os.environ.get('HADITH_RESPONSE_CACHE_SIZE', '2048'))
+RESPONSE_CACHE_TTL = float(os.environ.get('HADITH_RESPONSE_CACHE_TTL', '300'))
+
+# How often (seconds) get_state() checks whether bundle.json was replaced
+BUNDLE_CHECK_INTERVAL = float(os.environ.get('HADITH_BUNDLE_CHECK_INTERVAL', '30'))
+
+HYBRID_DEPTH = 50        # hits taken from each ranking before fusion
+# Largest `count` (hits per query) the HTTP API accepts
+MAX_COUNT = int(os.environ.get('HADITH_MAX_COUNT', '100'))
+RERANK_CANDIDATES = 200  # BM25 candidates re-ranked in 'rerank' mode
 
-print("Looking for CSV files...")
-files = sorted(glob.glob(os.path.join(REPO_PATH, '**', '*.csv'), recursive=True))
-print(f"Found {len(files)} CSV files.")
 
 # 2. Clean Text Function
 def clean_text(text):
@@ -23,6 +82,14 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text)           # removes extra space
     return text
 
+
+def clean_series(series):
+    """Vectorized `clean_text` over a pandas Series of strings."""
+    return (series.str.lower()
+                  .str.replace(r'[^a-zA-Z0-9\s]', '', regex=True)
+                  .str.replace(r'\s+', ' ', regex=True))
+
+
 # 3. Load Data
 # Corrected columns based on actual CSV structure
 columns = [
@@ -33,76 +100,450 @@ columns = [
     'Arabic_Hadith', 'Arabic_Isnad', 'Arabic_Matn', 'Arabic_Comment',
     'English_Grade', 'Arabic_Grade'
 ]
+df_columns = columns + ['Cleaned_Hadith']
 
-all_hadith = []
 
-print("Processing files...")
-for file in files:
-    try:
-        # Use the corrected columns list for reading
-        df = pd.read_csv(file, names=columns, skiprows=1, on_bad_lines='skip')
-        
-        df['Cleaned_Hadith'] = df['English_Hadith'].astype(str).apply(clean_text)
-        
-        all_hadith.extend(df.values.tolist())
-    except Exception as e:
-        print(f"Error reading {file}: {e}")
-
-print(f"Total Hadiths loaded: {len(all_hadith)}")
-
-# Re-create columns list with Cleaned_Hadith for DataFrame creation
-df_columns = columns + ['Cleaned_Hadith']
-hadith_df = pd.DataFrame(all_hadith, columns=df_columns)
-# hadith_df.to_csv('cleaned_hadith_data.csv', index=False) # Optional
+def find_corpus_files(repo_path=REPO_PATH):
+    return sorted(glob.glob(os.path.join(repo_path, '**', '*.csv'), recursive=True))
+
+
+def load_corpus(repo_path=REPO_PATH):
+    """Parse every corpus CSV. Returns (hadith_df, [(file, rows), ...])."""
+    import pandas as pd
+
+    print("Looking for CSV files...")
+    files = find_corpus_files(repo_path)
+    print(f"Found {len(files)} CSV files.")
+
+    frames = []
+    file_rows = []
+    print("Processing files...")
+    for file in files:
+        try:
+            # Use the corrected columns list for reading
+            df = pd.read_csv(file, names=columns, skiprows=1, on_bad_lines='skip')
+            df['Cleaned_Hadith'] = clean_series(df['English_Hadith'].astype(str))
+            frames.append(df)
+            file_rows.append((file, len(df)))
+        except Exception as e:
+            print(f"Error reading {file}: {e}")
+
+    if frames:
+        hadith_df = pd.concat(frames, ignore_index=True)
+    else:
+        hadith_df = pd.DataFrame(columns=df_columns)
+    print(f"Total Hadiths loaded: {len(hadith_df)}")
+    return hadith_df, file_rows
+
 
 # 4. Embeddings
-print("Loading Sentence Transformer Model...")
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Load the sentence encoder (torch or ONNX, see common/encoders.py) on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                print(f"Loading Sentence Transformer Model ({ENCODER_ID})...")
+                from common.encoders import load_encoder
+                _model = load_encoder(MODEL_NAME)
+    return _model
 
-EMBEDDINGS_FILE = 'hadith_embeddings.npy'
 
-if os.path.exists(EMBEDDINGS_FILE):
-    print("Loading existing embeddings...")
-    embeddings = np.load(EMBEDDINGS_FILE)
-else:
-    print("Generating embeddings (this may take time)...")
-    # Process in batches to show progress or avoid OOM if huge (though 34k is fine)
-    embeddings = model.encode(hadith_df['Cleaned_Hadith'].values, show_progress_bar=True)
-    np.save(EMBEDDINGS_FILE, embeddings)
+def compute_embeddings(hadith_df, file_rows):
+    """Embeddings for the whole corpus, re-encoding only changed CSVs.
+
+    Returns a ShardedArray over the memory-mapped per-file shards; nothing is
+    concatenated, the index is filled a shard at a time.
+    """
+    from embedding_store import EmbeddingStore, ShardedArray
+
+    store = EmbeddingStore(
+        EMBEDDINGS_DIR, ENCODER_ID,
+        encode_fn=lambda texts: get_model().encode(texts, show_progress_bar=True),
+        dtype=EMBEDDINGS_DTYPE,
+    )
+
+    shards = []
+    start = 0
+    for file, rows in file_rows:
+        texts = hadith_df['Cleaned_Hadith'].values[start:start + rows]
+        shard = store.embeddings_for(file, lambda texts=texts: texts)
+        if shard.shape[0] != rows:
+            raise ValueError(f"Embedding shard for {file} has {shard.shape[0]} rows, expected {rows}")
+        shards.append(shard)
+        start += rows
+    store.prune([file for file, _ in file_rows])
+    return ShardedArray(shards)
 
-embeddings = np.array(embeddings)
 
 # 5. FAISS Index
-print("Building FAISS Index...")
-dimensions = embeddings.shape[1]
-faiss_index = faiss.IndexFlatL2(dimensions)
-faiss_index.add(embeddings)
-faiss.write_index(faiss_index, "faiss_index.index")
+def build_faiss_index(embeddings, kind=INDEX_KIND, **params):
+    """Returns (faiss_index, resolved index params). `embeddings` is a matrix
+    or compute_embeddings' ShardedArray, added to the index shard by shard."""
+    from index_factory import build_index
+
+    print(f"Building FAISS Index ({kind})...")
+    return build_index(getattr(embeddings, 'shards', embeddings), kind, **params)
+
+
+def build_metadata_store(hadith_df):
+    """Columnar store with just the result columns of the corpus DataFrame."""
+    from metadata_store import ColumnStore
+
+    values = {}
+    for col in RESULT_COLUMNS:
+        series = hadith_df[col]
+        # The old results stringified these fields (NaN -> 'nan'); do it once here
+        values[col] = series.tolist() if col == 'English_Hadith' else series.astype(str).tolist()
+    return ColumnStore.from_columns(values, interned=INTERNED_COLUMNS)
+
+
+def _number_token(value):
+    try:
+        return [str(int(float(value)))]
+    except (TypeError, ValueError):
+        return clean_text(str(value)).split()
+
+
+def build_lexical_index(hadith_df):
+    """BM25 index over Cleaned_Hadith; the hadith number is indexed as a term too."""
+    from lexical import BM25Index, tokenize
+
+    documents = (tokenize(text) + _number_token(number)
+                 for text, number in zip(hadith_df['Cleaned_Hadith'].tolist(), hadith_df['Hadith_Number'].tolist()))
+    return BM25Index.build(documents)
+
+
+def load_bundle(bundle_dir=BUNDLE_DIR):
+    """Open a bundle written by build_bundle.py without reading it into RAM."""
+    import faiss
+    from lexical import BM25Index
+    from metadata_store import ColumnStore
+
+    with open(os.path.join(bundle_dir, BUNDLE_META), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('model') != MODEL_NAME:
+        raise ValueError(f"Bundle was built with {meta.get('model')}, expected {MODEL_NAME}")
+    if meta.get('encoder', MODEL_NAME) != ENCODER_ID:
+        print(f"Warning: bundle vectors come from {meta.get('encoder', MODEL_NAME)} but queries use {ENCODER_ID}")
+
+    meta['version'] = f"bundle:{meta.get('corpus_sha256')}:{meta.get('built_at')}"
+    meta['mtime_ns'] = os.stat(os.path.join(bundle_dir, BUNDLE_META)).st_mtime_ns
+
+    faiss_index = faiss.read_index(os.path.join(bundle_dir, BUNDLE_INDEX), faiss.IO_FLAG_MMAP)
+    metadata = ColumnStore.open(os.path.join(bundle_dir, BUNDLE_METADATA), mmap=True)
+    if faiss_index.ntotal != len(metadata):
+        raise ValueError(f"Bundle index has {faiss_index.ntotal} vectors but {len(metadata)} metadata rows")
+    lexical_dir = os.path.join(bundle_dir, BUNDLE_LEXICAL)
+    lexical = BM25Index.open(lexical_dir, mmap=True) if os.path.isdir(lexical_dir) else None
+    vectors = np.load(os.path.join(bundle_dir, BUNDLE_VECTORS), mmap_mode='r')
+    return {'index': faiss_index, 'metadata': metadata, 'lexical': lexical, 'vectors': vectors, 'meta': meta}
+
+
+def build_in_process(repo_path=REPO_PATH):
+    """Old startup path: parse the corpus, embed it and build the index."""
+    hadith_df, file_rows = load_corpus(repo_path)
+    embeddings = compute_embeddings(hadith_df, file_rows)
+    faiss_index, params = build_faiss_index(embeddings)
+    meta = {'model': MODEL_NAME, 'encoder': ENCODER_ID, 'source': 'corpus', 'index': {'kind': INDEX_KIND, 'params': params},
+            'version': f"corpus:{time.time_ns()}"}
+    return {'index': faiss_index, 'metadata': build_metadata_store(hadith_df),
+            'lexical': build_lexical_index(hadith_df), 'vectors': embeddings, 'meta': meta}
+
+
+_state = None
+_state_lock = threading.Lock()
+_last_bundle_check = 0.0
+
+
+def _bundle_replaced(state):
+    """True if bundle.json changed on disk since `state` was loaded (checked at most every BUNDLE_CHECK_INTERVAL)."""
+    global _last_bundle_check
+    if 'mtime_ns' not in state['meta']:
+        return False
+    now = time.monotonic()
+    if now - _last_bundle_check < BUNDLE_CHECK_INTERVAL:
+        return False
+    _last_bundle_check = now
+    try:
+        return os.stat(os.path.join(BUNDLE_DIR, BUNDLE_META)).st_mtime_ns != state['meta']['mtime_ns']
+    except OSError:
+        return False
+
+
+def get_state():
+    """Index + metadata, loaded on first use from the bundle if there is one.
+
+    A bundle rebuilt by build_bundle.py is picked up without a restart; the
+    response cache is keyed on the bundle version so stale entries never match.
+    """
+    global _state
+    state = _state
+    if state is not None and not _bundle_replaced(state):
+        return state
+    with _state_lock:
+        if _state is None:
+            if os.path.exists(os.path.join(BUNDLE_DIR, BUNDLE_META)):
+                print(f"Loading bundle from {BUNDLE_DIR}...")
+                _state = load_bundle(BUNDLE_DIR)
+            else:
+                print(f"No bundle at {BUNDLE_DIR}, building from {REPO_PATH} "
+                      "(run build_bundle.py to speed up startup)...")
+                _state = build_in_process(REPO_PATH)
+        elif _state is state:
+            print(f"Bundle in {BUNDLE_DIR} changed, reloading...")
+            _state = load_bundle(BUNDLE_DIR)
+            _response_cache.clear()
+    return _state
+
+
+def warm_up():
+    """Load index, metadata and model. Safe to call from a background thread."""
+    get_state()
+    get_model()
+
+
+def is_ready():
+    return _state is not None and _model is not None
+
 
 # 6. Search Function
-def get_similar_hadith(query, count=5):
+_embedding_cache = TTLCache(EMBED_CACHE_SIZE, EMBED_CACHE_TTL)
+_response_cache = TTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+_query_encoder = CachedEncoder(lambda texts: get_model().encode(texts), ENCODER_ID, _embedding_cache)
+
+
+def encode_queries(queries):
+    """Query embeddings, served from the embedding cache where possible."""
+    return _query_encoder.encode(queries)
+
+
+def cache_stats():
+    return {'embeddings': _embedding_cache.stats(), 'responses': _response_cache.stats()}
+
+
+def check_fields(fields):
+    """Validate a caller's field selection. None means all fields."""
+    if fields is None:
+        return tuple(RESULT_FIELDS)
+    unknown = [f for f in fields if f not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown result fields {unknown}, expected some of {list(RESULT_FIELDS)}")
+    return tuple(fields)
+
+
+def check_mode(mode):
+    mode = mode or 'semantic'
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}', expected one of {list(SEARCH_MODES)}")
+    return mode
+
+
+def check_count(count):
+    """A caller's `count`: a JSON integer from 1 to MAX_COUNT."""
+    if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= MAX_COUNT:
+        raise ValueError(f"count must be an integer from 1 to {MAX_COUNT}")
+    return count
+
+
+def check_tuning(nprobe=None, ef_search=None):
+    """`nprobe` and `ef_search` as positive ints (digit strings accepted) or None."""
+    def positive_int(name, value):
+        if value is None:
+            return None
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError(f"{name} must be a positive integer")
+        return value
+    return positive_int('nprobe', nprobe), positive_int('ef_search', ef_search)
+
+
+def _format_results(metadata, indices, fields, scores):
+    """Build the result dicts for a (n_queries, k) array of row ids.
+
+    `scores` maps result keys ('distance', 'score') to arrays shaped like
+    `indices`; NaN entries come back as None. All hits of all queries are
+    gathered from the metadata store in one call.
+    """
+    hit_mask = indices >= 0
+    columns = sorted({col for f in fields for col in RESULT_FIELDS[f]})
+    rows = metadata.take(indices[hit_mask], columns)
+    score_lists = {key: values[hit_mask].tolist() for key, values in scores.items()}
+
+    all_results = []
+    pos = 0
+    for q in range(indices.shape[0]):
+        results = []
+        for _ in range(int(hit_mask[q].sum())):
+            result = {}
+            if 'hadith' in fields:
+                result['hadith'] = rows['English_Hadith'][pos]
+            for key, values in score_lists.items():
+                result[key] = None if values[pos] != values[pos] else values[pos]
+            if 'source' in fields:
+                result['source'] = f"Chapter: {rows['Chapter_English'][pos]}, Section: {rows['Section_English'][pos]}"
+            if 'arabic_hadith' in fields:
+                result['arabic_hadith'] = rows['Arabic_Hadith'][pos]
+            if 'grade' in fields:
+                result['grade'] = rows['English_Grade'][pos]
+            results.append(result)
+            pos += 1
+        all_results.append(results)
+    return all_results
+
+
+def _pad(rows, width, fill, dtype):
+    out = np.full((len(rows), width), fill, dtype=dtype)
+    for i, row in enumerate(rows):
+        out[i, :len(row)] = row[:width]
+    return out
+
+
+def _lexical_search(state, queries, depth):
+    from lexical import tokenize
+
+    if state.get('lexical') is None:
+        raise ValueError("This bundle has no lexical index, rebuild it with build_bundle.py")
+    return [state['lexical'].search(tokenize(clean_text(q)), depth) for q in queries]
+
+
+def search_hadith_batch(queries, count=5, nprobe=None, ef_search=None, fields=None, mode='semantic'):
+    """Search many queries with one `model.encode` and one index search.
+
+    Returns one result list per query, in order. `fields` picks which of
+    RESULT_FIELDS each result carries (default all); `mode` is one of
+    SEARCH_MODES.
+    """
+    from index_factory import search
+
+    fields = check_fields(fields)
+    mode = check_mode(mode)
+    nprobe, ef_search = check_tuning(nprobe, ef_search)
+    if not queries:
+        return []
+    state = get_state()
+
+    if mode == 'lexical':
+        hits = _lexical_search(state, queries, count)
+        indices = _pad([ids for ids, _ in hits], count, -1, np.int64)
+        bm25 = _pad([sc for _, sc in hits], count, np.nan, np.float32)
+        return _format_results(state['metadata'], indices, fields, {'score': bm25})
+
+    query_embeddings = encode_queries(queries)
+
+    if mode == 'semantic':
+        distance, indices = search(state['index'], query_embeddings, count, nprobe=nprobe, ef_search=ef_search)
+        return _format_results(state['metadata'], indices, fields, {'distance': distance})
+
+    if mode == 'rerank':
+        # Exact L2 distances against the stored vectors of the BM25 candidates only
+        ranked_ids, ranked_dist = [], []
+        for q_emb, (cand, _) in zip(query_embeddings, _lexical_search(state, queries, RERANK_CANDIDATES)):
+            cand = np.sort(cand)  # ascending ids keep the memory-mapped reads sequential
+            vecs = np.asarray(state['vectors'][cand], dtype=np.float32)
+            dist = ((vecs - q_emb) ** 2).sum(axis=1)
+            order = np.argsort(dist, kind='stable')[:count]
+            ranked_ids.append(cand[order])
+            ranked_dist.append(dist[order])
+        indices = _pad(ranked_ids, count, -1, np.int64)
+        distance = _pad(ranked_dist, count, np.nan, np.float32)
+        return _format_results(state['metadata'], indices, fields, {'distance': distance})
+
+    # hybrid
+    from lexical import reciprocal_rank_fusion
+
+    depth = max(count, HYBRID_DEPTH)
+    sem_dist, sem_ids = search(state['index'], query_embeddings, depth, nprobe=nprobe, ef_search=ef_search)
+    fused_ids, fused_scores, fused_dist = [], [], []
+    for q, (lex_ids, _) in enumerate(_lexical_search(state, queries, depth)):
+        ids, scores = reciprocal_rank_fusion([sem_ids[q], lex_ids], count)
+        dist_of = dict(zip(sem_ids[q].tolist(), sem_dist[q].tolist()))
+        fused_ids.append(ids)
+        fused_scores.append(scores)
+        # Lexical-only hits have no semantic distance
+        fused_dist.append([dist_of.get(i, np.nan) for i in ids])
+    indices = _pad(fused_ids, count, -1, np.int64)
+    return _format_results(state['metadata'], indices, fields, {
+        'distance': _pad(fused_dist, count, np.nan, np.float32),
+        'score': _pad(fused_scores, count, np.nan, np.float32),
+    })
+
+
+def get_similar_hadith(query, count=5, nprobe=None, ef_search=None, fields=None, mode='semantic'):
+    """`nprobe` (IVF indexes) and `ef_search` (HNSW) override the index defaults for this query."""
     print(f"\nQuery: {query}")
-    query_embedding = model.encode([query])
-    distance, indices = faiss_index.search(query_embedding, count)
-
-    results = []
-    for i in range(count):
-        idx = indices[0][i]
-        dist = distance[0][i]
-        hadith_text = hadith_df['English_Hadith'].iloc[idx]
-        # Handle potential float/nan values in text fields
-        chapter = str(hadith_df['Chapter_English'].iloc[idx])
-        section = str(hadith_df['Section_English'].iloc[idx])
-        source = f"Chapter: {chapter}, Section: {section}"
-        
-        results.append({
-            'hadith': hadith_text,
-            'distance': float(dist),
-            'source': source,
-            'arabic_hadith': str(hadith_df['Arabic_Hadith'].iloc[idx]),
-            'grade': str(hadith_df['English_Grade'].iloc[idx])
-        })
-        
+    return search_hadith_batch([query], count, nprobe=nprobe, ef_search=ef_search, fields=fields, mode=mode)[0]
+
+
+# Request coalescing: concurrent /search calls wait up to BATCH_WAIT_MS for
+# each other and are then served by one search_hadith_batch call.
+BATCH_MAX = int(os.environ.get('HADITH_BATCH_MAX', '32'))
+BATCH_WAIT_MS = float(os.environ.get('HADITH_BATCH_WAIT_MS', '3'))
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def _run_coalesced(items):
+    """batch_fn for the QueryBatcher; items are (query, count, nprobe, ef_search, fields, mode).
+
+    A group that fails gets its exception in its callers' slots, so callers
+    with other parameters in the same batch are not affected.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for pos, (query, count, nprobe, ef_search, fields, mode) in enumerate(items):
+        groups.setdefault((nprobe, ef_search, fields, mode), []).append(pos)
+    for (nprobe, ef_search, fields, mode), positions in groups.items():
+        try:
+            # Search the largest k in the group once, then trim per caller
+            max_count = max(items[pos][1] for pos in positions)
+            batch = search_hadith_batch([items[pos][0] for pos in positions], max_count,
+                                        nprobe=nprobe, ef_search=ef_search, fields=fields, mode=mode)
+        except Exception as e:
+            for pos in positions:
+                results[pos] = e
+            continue
+        for pos, hits in zip(positions, batch):
+            results[pos] = hits[:items[pos][1]]
+    return results
+
+
+def search_coalesced(query, count=5, nprobe=None, ef_search=None, fields=None, mode='semantic'):
+    """Like get_similar_hadith, but batched together with concurrent callers."""
+    global _batcher
+    mode = check_mode(mode)
+    # Bad values fail here, in the caller, not inside a shared batch
+    nprobe, ef_search = check_tuning(nprobe, ef_search)
+    if mode == 'lexical':
+        # No model call to amortize
+        return search_hadith_batch([query], count, fields=fields, mode=mode)[0]
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                from batcher import QueryBatcher
+                _batcher = QueryBatcher(_run_coalesced, max_batch=BATCH_MAX, max_wait_ms=BATCH_WAIT_MS)
+    return _batcher.submit((query, count, nprobe, ef_search, check_fields(fields), mode))
+
+
+
+def cached_search(query, count=5, nprobe=None, ef_search=None, fields=None, mode='semantic'):
+    """search_coalesced behind the response cache used by /search."""
+    fields = check_fields(fields)
+    mode = check_mode(mode)
+    # Before the key: [1] is unhashable, and '8' must share 8's entry
+    nprobe, ef_search = check_tuning(nprobe, ef_search)
+    version = get_state()['meta']['version']
+    key = (version, normalize_text(query), count, nprobe, ef_search, fields, mode)
+    results = _response_cache.get(key)
+    if results is None:
+        results = search_coalesced(query, count, nprobe=nprobe, ef_search=ef_search, fields=fields, mode=mode)
+        _response_cache.set(key, results)
     return results
 
 # 7. Test
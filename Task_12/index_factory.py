@@ -0,0 +1,149 @@
+"""FAISS index construction for the hadith search.
+
+Supported kinds (all use L2 distance, like the original IndexFlatL2):
+    flat    exact scan
+    ivf     IVF-Flat, clustered into `nlist` lists, tuned with `nprobe`
+    hnsw    HNSW graph with `m` links per node, tuned with `ef_search`
+    ivfpq   IVF with product-quantized vectors (`pq_m` sub-quantizers)
+"""
+import math
+
+import numpy as np
+import faiss
+
+
+INDEX_KINDS = ('flat', 'ivf', 'hnsw', 'ivfpq')
+
+DEFAULT_PARAMS = {
+    'flat': {},
+    'ivf': {'nlist': None, 'nprobe': 16},
+    'hnsw': {'m': 32, 'ef_construction': 200, 'ef_search': 64},
+    'ivfpq': {'nlist': None, 'pq_m': 16, 'pq_bits': 8, 'nprobe': 16},
+}
+
+# k-means wants this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def default_nlist(n_vectors):
+    """Usual sqrt(N) heuristic, capped so every list gets enough training points."""
+    nlist = int(4 * math.sqrt(max(n_vectors, 1)))
+    return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def resolve_params(kind, n_vectors, dim, **overrides):
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind '{kind}', expected one of {INDEX_KINDS}")
+    params = dict(DEFAULT_PARAMS[kind])
+    params.update({k: v for k, v in overrides.items() if v is not None and k in params})
+    if 'nlist' in params and params['nlist'] is None:
+        params['nlist'] = default_nlist(n_vectors)
+    if kind == 'ivfpq':
+        if dim % params['pq_m'] != 0:
+            raise ValueError(f"pq_m={params['pq_m']} must divide the embedding dimension {dim}")
+        # 2**pq_bits codewords need enough training points as well
+        while params['pq_bits'] > 4 and n_vectors < MIN_POINTS_PER_CENTROID * (1 << params['pq_bits']):
+            params['pq_bits'] -= 1
+    return params
+
+
+def factory_string(kind, params):
+    if kind == 'flat':
+        return 'Flat'
+    if kind == 'ivf':
+        return f"IVF{params['nlist']},Flat"
+    if kind == 'hnsw':
+        return f"HNSW{params['m']}"
+    return f"IVF{params['nlist']},PQ{params['pq_m']}x{params['pq_bits']}"
+
+
+def _gather(shards, rows=None):
+    """float32 copy of the given global `rows` (all rows if None) of the shards."""
+    if len(shards) == 1:
+        return np.ascontiguousarray(shards[0] if rows is None else shards[0][rows], dtype=np.float32)
+    if rows is None:
+        return np.concatenate([np.asarray(s, dtype=np.float32) for s in shards])
+    parts, start = [], 0
+    for shard in shards:
+        picked = rows[(rows >= start) & (rows < start + len(shard))] - start
+        parts.append(np.asarray(shard[picked], dtype=np.float32))
+        start += len(shard)
+    return np.concatenate(parts)
+
+
+def build_index(embeddings, kind='flat', max_train_points=None, **overrides):
+    """Build, train and fill an index. Returns (index, resolved params).
+
+    `embeddings` is one matrix or a list of row blocks, e.g. memory-mapped
+    embedding shards. Blocks are added one at a time, so only one of them
+    (and the training sample) is ever copied into RAM.
+    """
+    shards = list(embeddings) if isinstance(embeddings, (list, tuple)) else [embeddings]
+    if not shards:
+        raise ValueError('No embeddings to index')
+    n_vectors, dim = sum(len(s) for s in shards), shards[0].shape[1]
+    params = resolve_params(kind, n_vectors, dim, **overrides)
+
+    index = faiss.index_factory(dim, factory_string(kind, params), faiss.METRIC_L2)
+    if kind == 'hnsw':
+        index.hnsw.efConstruction = params['ef_construction']
+    if not index.is_trained:
+        rows = None
+        if max_train_points and n_vectors > max_train_points:
+            rng = np.random.default_rng(0)
+            rows = np.sort(rng.choice(n_vectors, max_train_points, replace=False))
+        index.train(_gather(shards, rows))
+    for shard in shards:
+        index.add(np.ascontiguousarray(shard, dtype=np.float32))
+    apply_default_params(index, params)
+    return index, params
+
+
+def apply_default_params(index, params):
+    """Store the default search-time knobs on the index itself."""
+    if 'nprobe' in params:
+        faiss.extract_index_ivf(index).nprobe = params['nprobe']
+    if 'ef_search' in params:
+        _hnsw(index).efSearch = params['ef_search']
+
+
+def index_kind(index):
+    if isinstance(index, faiss.IndexHNSW):
+        return 'hnsw'
+    try:
+        ivf = faiss.downcast_index(faiss.extract_index_ivf(index))
+    except RuntimeError:
+        return 'flat'
+    return 'ivfpq' if isinstance(ivf, faiss.IndexIVFPQ) else 'ivf'
+
+
+def _hnsw(index):
+    return faiss.downcast_index(index).hnsw
+
+
+def search_params(index, nprobe=None, ef_search=None):
+    """Per-request SearchParameters, or None to use the index defaults.
+
+    Passed to `index.search(..., params=...)` so concurrent requests with
+    different settings don't race on shared index attributes.
+    """
+    kind = index_kind(index)
+    if kind in ('ivf', 'ivfpq') and nprobe is not None:
+        nlist = faiss.extract_index_ivf(index).nlist
+        return faiss.SearchParametersIVF(nprobe=max(1, min(int(nprobe), nlist)))
+    if kind == 'hnsw' and ef_search is not None:
+        return faiss.SearchParametersHNSW(efSearch=max(1, int(ef_search)))
+    return None
+
+
+def search(index, queries, count, nprobe=None, ef_search=None):
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    params = search_params(index, nprobe=nprobe, ef_search=ef_search)
+    if params is None:
+        return index.search(queries, count)
+    return index.search(queries, count, params=params)
+
+
+def index_nbytes(index):
+    """Serialized size of the index, a good proxy for its memory footprint."""
+    return int(faiss.serialize_index(index).nbytes)
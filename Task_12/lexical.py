@@ -0,0 +1,137 @@
+"""BM25 inverted index over the cleaned hadith text.
+
+Postings are stored CSR-style in flat arrays, so the whole index is a handful
+of .npy files that can be memory-mapped:
+    vocab.json         sorted list of terms (term id = position)
+    term_offsets.npy   int64, postings of term t are [offsets[t], offsets[t+1])
+    doc_ids.npy        int32 doc ids, ascending within each term
+    weights.npy        float32 BM25 weight of (term, doc), precomputed at build
+    meta.json          k1, b, document count, average length
+
+Because the per-posting BM25 weight is precomputed, scoring a query is just a
+sum of a few array slices.
+"""
+import json
+import os
+
+import numpy as np
+
+
+def tokenize(cleaned_text):
+    """Terms of a text already passed through `hadith_bot.clean_text`."""
+    return cleaned_text.split()
+
+
+class BM25Index:
+    def __init__(self, vocab, term_offsets, doc_ids, weights, n_docs, k1=1.2, b=0.75, avgdl=0.0):
+        self.vocab = vocab
+        self.term_ids = {term: i for i, term in enumerate(vocab)}
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+        self.k1 = k1
+        self.b = b
+        self.avgdl = avgdl
+
+    def __len__(self):
+        return self.n_docs
+
+    @classmethod
+    def build(cls, documents, k1=1.2, b=0.75):
+        """Build from an iterable of token lists (one per document, in row order)."""
+        postings = {}
+        doc_lens = []
+        for doc_id, tokens in enumerate(documents):
+            doc_lens.append(len(tokens))
+            counts = {}
+            for tok in tokens:
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok, tf in counts.items():
+                postings.setdefault(tok, []).append((doc_id, tf))
+
+        n_docs = len(doc_lens)
+        doc_lens = np.asarray(doc_lens, dtype=np.float32)
+        avgdl = float(doc_lens.mean()) if n_docs else 0.0
+        vocab = sorted(postings)
+
+        term_offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum([len(postings[t]) for t in vocab], out=term_offsets[1:])
+        doc_ids = np.empty(term_offsets[-1], dtype=np.int32)
+        tfs = np.empty(term_offsets[-1], dtype=np.float32)
+        for i, term in enumerate(vocab):
+            plist = postings[term]
+            doc_ids[term_offsets[i]:term_offsets[i + 1]] = [d for d, _ in plist]
+            tfs[term_offsets[i]:term_offsets[i + 1]] = [tf for _, tf in plist]
+
+        df = np.diff(term_offsets).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * doc_lens[doc_ids] / max(avgdl, 1e-9))
+        weights = (np.repeat(idf, np.diff(term_offsets)) * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+        return cls(vocab, term_offsets, doc_ids, weights, n_docs, k1, b, avgdl)
+
+    def write(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'vocab.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.vocab, f)
+        np.save(os.path.join(directory, 'term_offsets.npy'), self.term_offsets)
+        np.save(os.path.join(directory, 'doc_ids.npy'), self.doc_ids)
+        np.save(os.path.join(directory, 'weights.npy'), self.weights)
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'n_docs': self.n_docs, 'k1': self.k1, 'b': self.b, 'avgdl': self.avgdl}, f)
+
+    @classmethod
+    def open(cls, directory, mmap=True):
+        mode = 'r' if mmap else None
+        with open(os.path.join(directory, 'vocab.json'), 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(
+            vocab,
+            np.load(os.path.join(directory, 'term_offsets.npy'), mmap_mode=mode),
+            np.load(os.path.join(directory, 'doc_ids.npy'), mmap_mode=mode),
+            np.load(os.path.join(directory, 'weights.npy'), mmap_mode=mode),
+            meta['n_docs'], meta['k1'], meta['b'], meta['avgdl'],
+        )
+
+    def search(self, tokens, count):
+        """Top `count` documents for a token list. Returns (doc_ids, scores), best first."""
+        slices = []
+        for tok in set(tokens):
+            t = self.term_ids.get(tok)
+            if t is not None:
+                slices.append((self.term_offsets[t], self.term_offsets[t + 1]))
+        if not slices or count <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        if len(slices) == 1:
+            start, end = slices[0]
+            docs = np.asarray(self.doc_ids[start:end], dtype=np.int64)
+            scores = np.asarray(self.weights[start:end])
+        else:
+            all_docs = np.concatenate([self.doc_ids[s:e] for s, e in slices])
+            all_weights = np.concatenate([self.weights[s:e] for s, e in slices])
+            docs, inverse = np.unique(all_docs, return_inverse=True)
+            docs = docs.astype(np.int64)
+            scores = np.bincount(inverse, weights=all_weights).astype(np.float32)
+
+        if len(docs) > count:
+            top = np.argpartition(-scores, count - 1)[:count]
+            docs, scores = docs[top], scores[top]
+        # Sort by score, ties by doc id so results are stable
+        order = np.lexsort((docs, -scores))
+        return docs[order], scores[order]
+
+
+def reciprocal_rank_fusion(rankings, count, k=60):
+    """Fuse several best-first lists of doc ids. Returns (doc_ids, fused scores)."""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            doc = int(doc)
+            if doc < 0:
+                continue
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank + 1)
+    best = sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:count]
+    return [doc for doc, _ in best], [score for _, score in best]
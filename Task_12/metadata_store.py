@@ -0,0 +1,162 @@
+"""Compact columnar store for the hadith metadata returned with search hits.
+
+On disk (one directory):
+    schema.json               row count and the kind of every field
+    <field>.offsets.npy       int64 start offsets into <field>.data.bin, n+1 entries
+    <field>.data.bin          all values, utf-8 encoded back to back
+    <field>.valid.npy         bool mask, only written when the field has nulls
+    <field>.codes.npy         int32 codes, for `interned` fields only; the
+                              offsets/data files then hold the distinct values
+
+`text` fields (the hadith bodies) are stored once each; `interned` fields
+(chapter, section, grade) repeat a lot and are stored as codes into a small
+dictionary that is decoded once at load time.
+"""
+import json
+import os
+
+import numpy as np
+
+
+SCHEMA_NAME = 'schema.json'
+
+
+def _pack_strings(values):
+    """Encode strings into (offsets, data, valid) arrays. None marks a null."""
+    encoded = [b'' if v is None else v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    valid = np.array([v is not None for v in values], dtype=bool)
+    return offsets, data, valid
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+class _StringColumn:
+    def __init__(self, offsets, data, valid=None):
+        self.offsets = offsets
+        self.data = data
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def take(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.offsets[rows]
+        ends = self.offsets[rows + 1]
+        out = [bytes(self.data[s:e]).decode('utf-8') for s, e in zip(starts.tolist(), ends.tolist())]
+        if self.valid is not None:
+            for i in np.flatnonzero(~self.valid[rows]).tolist():
+                out[i] = None
+        return out
+
+    def to_list(self):
+        return self.take(np.arange(len(self)))
+
+
+class _InternedColumn:
+    def __init__(self, codes, dictionary):
+        self.codes = codes
+        self.dictionary = dictionary
+
+    def __len__(self):
+        return len(self.codes)
+
+    def take(self, rows):
+        dictionary = self.dictionary
+        return [dictionary[c] for c in self.codes[np.asarray(rows, dtype=np.int64)].tolist()]
+
+
+class ColumnStore:
+    """Read-only column store; `take(rows, fields)` gathers many rows at once."""
+
+    def __init__(self, columns, n_rows):
+        self.columns = columns
+        self.n_rows = n_rows
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def fields(self):
+        return list(self.columns)
+
+    def take(self, rows, fields=None):
+        """Return {field: [value per row]} for the requested fields (default all)."""
+        fields = self.fields if fields is None else fields
+        return {f: self.columns[f].take(rows) for f in fields}
+
+    def column(self, field):
+        return self.columns[field].take(np.arange(self.n_rows))
+
+    @classmethod
+    def from_columns(cls, columns, interned=()):
+        """Build an in-memory store from {field: sequence of values}."""
+        n_rows = None
+        built = {}
+        for field, values in columns.items():
+            values = [None if _is_null(v) else str(v) for v in values]
+            if n_rows is None:
+                n_rows = len(values)
+            elif len(values) != n_rows:
+                raise ValueError(f"Field {field} has {len(values)} rows, expected {n_rows}")
+            if field in interned:
+                dictionary = {}
+                codes = np.array([dictionary.setdefault(v, len(dictionary)) for v in values], dtype=np.int32)
+                built[field] = _InternedColumn(codes, list(dictionary))
+            else:
+                offsets, data, valid = _pack_strings(values)
+                built[field] = _StringColumn(offsets, data, None if valid.all() else valid)
+        return cls(built, n_rows or 0)
+
+    def write(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        schema = {'rows': self.n_rows, 'fields': {}}
+        for field, col in self.columns.items():
+            if isinstance(col, _InternedColumn):
+                schema['fields'][field] = 'interned'
+                np.save(os.path.join(directory, f"{field}.codes.npy"), col.codes)
+                offsets, data, _ = _pack_strings(col.dictionary)
+                valid = None
+            else:
+                schema['fields'][field] = 'text'
+                offsets, data, valid = col.offsets, col.data, col.valid
+            np.save(os.path.join(directory, f"{field}.offsets.npy"), np.asarray(offsets))
+            with open(os.path.join(directory, f"{field}.data.bin"), 'wb') as f:
+                f.write(np.asarray(data).tobytes())
+            if valid is not None:
+                np.save(os.path.join(directory, f"{field}.valid.npy"), np.asarray(valid))
+        with open(os.path.join(directory, SCHEMA_NAME), 'w', encoding='utf-8') as f:
+            json.dump(schema, f, indent=2)
+
+    @classmethod
+    def open(cls, directory, mmap=True):
+        """Open a store written by `write`. With mmap=True nothing is read up front
+        except the interned dictionaries."""
+        mode = 'r' if mmap else None
+        with open(os.path.join(directory, SCHEMA_NAME), 'r', encoding='utf-8') as f:
+            schema = json.load(f)
+
+        def strings(field):
+            offsets = np.load(os.path.join(directory, f"{field}.offsets.npy"), mmap_mode=mode)
+            data_path = os.path.join(directory, f"{field}.data.bin")
+            if mmap and os.path.getsize(data_path) > 0:
+                data = np.memmap(data_path, dtype=np.uint8, mode='r')
+            else:
+                data = np.fromfile(data_path, dtype=np.uint8)
+            valid_path = os.path.join(directory, f"{field}.valid.npy")
+            valid = np.load(valid_path, mmap_mode=mode) if os.path.exists(valid_path) else None
+            return _StringColumn(offsets, data, valid)
+
+        columns = {}
+        for field, kind in schema['fields'].items():
+            if kind == 'interned':
+                codes = np.load(os.path.join(directory, f"{field}.codes.npy"), mmap_mode=mode)
+                columns[field] = _InternedColumn(codes, strings(field).to_list())
+            else:
+                columns[field] = strings(field)
+        return cls(columns, schema['rows'])
@@ -0,0 +1,88 @@
+"""Embedding / search sidecar shared by all Flask workers on a host.
+
+Usage:
+    python model_server.py [--socket /tmp/minilm-model.sock]
+
+Holds one copy of the encoder, the FAISS index and the metadata, and serves
+worker requests over a Unix socket (protocol in common/model_client.py). Concurrent
+single searches from all workers go through hadith_bot's coalescer and
+response cache, so batching works across processes too. Workers (Task_12
+app.py, Task_9 app.py) use it when the socket answers and fall back to
+loading everything in-process when it doesn't.
+
+Ops: ping, stats, encode {texts, encoder}, search {query, ...}, search_batch {queries, ...}
+"""
+import argparse
+import os
+import socketserver
+import sys
+
+import numpy as np
+
+import hadith_bot
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for common/
+from common.model_client import MODEL_SERVER_SOCKET, recv_message, same_model, send_message
+
+SEARCH_PARAMS = ('count', 'nprobe', 'ef_search', 'fields', 'mode')
+
+
+def handle_request(header):
+    """Returns (reply header, payload bytes)."""
+    op = header.get('op')
+    if op == 'ping':
+        return {'ok': True, 'encoder': hadith_bot.ENCODER_ID, 'ready': hadith_bot.is_ready()}, b''
+    if op == 'stats':
+        return {'stats': hadith_bot.cache_stats()}, b''
+    if op == 'encode':
+        encoder = header.get('encoder')
+        if encoder and not same_model(encoder, hadith_bot.ENCODER_ID):
+            return {'error': f"sidecar runs {hadith_bot.ENCODER_ID}, not {encoder}"}, b''
+        vectors = np.ascontiguousarray(hadith_bot.encode_queries(header['texts']), dtype=np.float32)
+        return {'shape': list(vectors.shape)}, vectors.tobytes()
+
+    params = {k: header[k] for k in SEARCH_PARAMS if header.get(k) is not None}
+    if op == 'search':
+        return {'results': hadith_bot.cached_search(header['query'], **params)}, b''
+    if op == 'search_batch':
+        return {'results': hadith_bot.search_hadith_batch(header['queries'], **params)}, b''
+    return {'error': f"unknown op {op!r}"}, b''
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                reply, payload = handle_request(header)
+            except Exception as e:
+                reply, payload = {'error': str(e), 'error_type': type(e).__name__}, b''
+            send_message(self.request, reply, payload)
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path=MODEL_SERVER_SOCKET):
+    # Load everything before the socket appears, so its existence means "ready"
+    hadith_bot.warm_up()
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with ModelServer(socket_path, _Handler) as server:
+        os.chmod(socket_path, 0o660)
+        print(f"Model server ({hadith_bot.ENCODER_ID}) listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Shared embedding/search sidecar.')
+    parser.add_argument('--socket', default=MODEL_SERVER_SOCKET)
+    args = parser.parse_args()
+    serve(args.socket)
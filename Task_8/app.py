@@ -1,47 +1,52 @@
+import asyncio
+import os
+
 from flask import Flask, render_template, request, jsonify
-import requests
+
+from weather_client import CityNotFound, UpstreamError, WeatherClient
 
 app = Flask(__name__)
 
+MAX_CITIES = int(os.environ.get('WEATHER_MAX_CITIES', '20'))
+
+# One client per process: its session pool and caches are shared by all requests
+weather = WeatherClient()
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/api/weather', methods=['GET'])
 def get_weather():
-    city = request.args.get('city')
+    city = request.args.get('city', '').strip()
     if not city:
         return jsonify({'error': 'City is required'}), 400
 
-
-    geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1&language=en&format=json"
     try:
-        geo_response = requests.get(geo_url)
-        geo_data = geo_response.json()
-        
-        if not geo_data.get('results'):
-            return jsonify({'error': 'City not found'}), 404
-            
-        location = geo_data['results'][0]
-        lat = location['latitude']
-        lon = location['longitude']
-        city_name = location['name']
-        country = location.get('country', '')
-
-        # 2. Weather Data
-        weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true&daily=temperature_2m_max,temperature_2m_min,weathercode&timezone=auto"
-        weather_response = requests.get(weather_url)
-        weather_data = weather_response.json()
-
-        return jsonify({
-            'city': city_name,
-            'country': country,
-            'current': weather_data['current_weather'],
-            'daily': weather_data.get('daily', {})
-        })
-
+        return jsonify(weather.get_weather(city))
+    except CityNotFound:
+        return jsonify({'error': 'City not found'}), 404
+    except UpstreamError as e:
+        return jsonify({'error': str(e)}), 502
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/weather/multi', methods=['GET'])
+def get_weather_multi():
+    # ?city=Oslo&city=Lima or ?cities=Oslo,Lima
+    cities = request.args.getlist('city') + request.args.get('cities', '').split(',')
+    cities = [c.strip() for c in cities if c.strip()]
+    if not cities:
+        return jsonify({'error': 'At least one city is required'}), 400
+    if len(cities) > MAX_CITIES:
+        return jsonify({'error': f'At most {MAX_CITIES} cities per request'}), 400
+
+    results = asyncio.run(weather.get_weather_many(cities))
+    return jsonify({'results': results})
+
+@app.route('/metrics/cache')
+def cache_metrics():
+    return jsonify(weather.stats())
+
 if __name__ == '__main__':
     app.run(debug=True)
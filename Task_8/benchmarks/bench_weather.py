@@ -0,0 +1,80 @@
+"""Weather lookups against the local stub: original code path vs WeatherClient.
+
+Run from Task_8/ (starts its own stub server, no network needed):
+    python benchmarks/bench_weather.py [--cities 20] [--latency 0.1]
+
+`original` repeats what app.py used to do: two bare requests.get calls per
+city, one after the other, new connection each time. `client cold` is
+WeatherClient.get_weather with empty caches (pooled session only), `client
+warm` the same cities again from cache. `multi cold` is get_weather_many over
+all cities at once with fresh caches. `upstream` is how many requests the
+stub actually received. A final check runs with --fail-every to show that
+retries hide transient 503s.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import start_stub
+from weather_client import WeatherClient
+
+
+def original(base, city):
+    geo = requests.get(f'{base}/v1/search?name={city}&count=1&language=en&format=json').json()
+    loc = geo['results'][0]
+    url = (f"{base}/v1/forecast?latitude={loc['latitude']}&longitude={loc['longitude']}"
+           "&current_weather=true&daily=temperature_2m_max,temperature_2m_min,weathercode&timezone=auto")
+    return requests.get(url).json()['current_weather']
+
+
+def timed(label, server, fn):
+    requests.post(server.base + '/stats/reset')
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    upstream = sum(requests.get(server.base + '/stats').json().values())
+    print(f"{label:<14}{elapsed * 1000:>10.1f} ms{upstream:>10}")
+
+
+def new_client(base):
+    return WeatherClient(geocode_url=base + '/v1/search', forecast_url=base + '/v1/forecast', cache_db=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cities', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.1, help='stub latency per request, seconds')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    cities = [f'city {i}' for i in range(args.cities)]
+    server, base = start_stub(latency=args.latency)
+    server.base = base
+    print(f"{args.cities} cities, {args.latency * 1000:.0f} ms stub latency\n")
+    print(f"{'':<14}{'total':>13}{'upstream':>10}")
+
+    timed('original', server, lambda: [original(base, c) for c in cities])
+    client = new_client(base)
+    timed('client cold', server, lambda: [client.get_weather(c) for c in cities])
+    timed('client warm', server, lambda: [client.get_weather(c) for c in cities])
+    client = new_client(base)
+    timed('multi cold', server, lambda: asyncio.run(client.get_weather_many(cities, args.concurrency)))
+    timed('multi warm', server, lambda: asyncio.run(client.get_weather_many(cities, args.concurrency)))
+
+    flaky, flaky_base = start_stub(latency=0.0, fail_every=4)
+    client = new_client(flaky_base)
+    ok = sum('error' not in r for r in asyncio.run(client.get_weather_many(cities)))
+    ok += sum(1 for c in cities if client.get_weather(c + ' again'))
+    print(f"\nwith every 4th upstream request failing: {ok}/{2 * len(cities)} lookups succeeded")
+    flaky.shutdown()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+class SQLiteCache:
+    """JSON values in a SQLite table with wall-clock expiry. Survives restarts
+    and is shared by every process that opens the same file."""
+
+    PURGE_EVERY = 200
+
+    def __init__(self, path, table, ttl=3600.0):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(f'CREATE TABLE IF NOT EXISTS {table} ('
+                       'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)')
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call: safe from any thread or process
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key, default=None, with_expiry=False):
+        """The stored value, or `default`. With `with_expiry`, a (value,
+        expires) pair instead, `expires` being the time.time() it runs out
+        (None on a miss)."""
+        with self._connect() as db:
+            row = db.execute(f'SELECT value, expires FROM {self.table} WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            self.misses += 1
+            return (default, None) if with_expiry else default
+        self.hits += 1
+        value = json.loads(row[0])
+        return (value, row[1]) if with_expiry else value
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        self._writes += 1
+        with self._connect() as db:
+            db.execute(f'INSERT OR REPLACE INTO {self.table} (key, value, expires) VALUES (?, ?, ?)',
+                       (key, json.dumps(value), now + (self.ttl if ttl is None else ttl)))
+            if self._writes % self.PURGE_EVERY == 0:
+                db.execute(f'DELETE FROM {self.table} WHERE expires < ?', (now,))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0}
+
+
+class TieredCache:
+    """In-memory TTLCache in front of an optional SQLiteCache.
+
+    A memory miss that the SQLite layer answers is copied into memory for
+    the time it has left on disk, so both layers expire it together.
+    """
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value, expires = self.disk.get(key, with_expiry=True)
+            if value is not None:
+                self.memory.set(key, value, max(0.0, expires - time.time()))
+        return default if value is None else value
+
+    def set(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def stats(self):
+        stats = {'memory': self.memory.stats()}
+        if self.disk is not None:
+            stats['sqlite'] = self.disk.stats()
+        return stats
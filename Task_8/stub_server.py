@@ -0,0 +1,132 @@
+"""Local stand-in for the Open-Meteo geocoding and forecast APIs.
+
+    python stub_server.py --port 8765 --latency 0.2
+    WEATHER_GEOCODE_URL=http://127.0.0.1:8765/v1/search \\
+    WEATHER_FORECAST_URL=http://127.0.0.1:8765/v1/forecast python app.py
+
+Any name geocodes to deterministic coordinates except names starting with
+"nowhere" (no results). Every response waits `--latency` seconds; with
+`--fail-every N` every Nth request answers 503 to exercise retries.
+GET /stats returns request counts per path, POST /stats/reset clears them.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def fake_location(name):
+    digest = hashlib.sha1(name.casefold().encode('utf-8')).digest()
+    lat = int.from_bytes(digest[:4], 'big') / 2 ** 32 * 140 - 70
+    lon = int.from_bytes(digest[4:8], 'big') / 2 ** 32 * 360 - 180
+    return {'name': name.title(), 'country': 'Stubland', 'latitude': round(lat, 4), 'longitude': round(lon, 4)}
+
+
+def fake_forecast(lat, lon):
+    base = (lat + lon) % 30
+    return {
+        'latitude': lat, 'longitude': lon,
+        'current_weather': {'temperature': round(base, 1), 'windspeed': 10.0, 'weathercode': 3, 'is_day': 1},
+        'daily': {
+            'time': [f'2024-01-0{i + 1}' for i in range(7)],
+            'temperature_2m_max': [round(base + i, 1) for i in range(7)],
+            'temperature_2m_min': [round(base - 5 + i, 1) for i in range(7)],
+            'weathercode': [3] * 7,
+        },
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # keep-alive, like the real API
+    # Buffer writes so headers and body leave in one segment; otherwise
+    # delayed ACKs add ~40 ms to every keep-alive response
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path == '/stats/reset':
+            self.server.reset()
+            return self.send_json(200, {})
+        self.send_json(404, {'error': 'not found'})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == '/stats':
+            return self.send_json(200, self.server.counts())
+        n = self.server.count(url.path)
+        time.sleep(self.server.latency)
+        if self.server.fail_every and n % self.server.fail_every == 0:
+            return self.send_json(503, {'error': True, 'reason': 'stub failure'})
+        if url.path == '/v1/search':
+            name = query.get('name', '')
+            if not name or name.casefold().startswith('nowhere'):
+                return self.send_json(200, {'generationtime_ms': 0.1})
+            return self.send_json(200, {'results': [fake_location(name)]})
+        if url.path == '/v1/forecast':
+            try:
+                lat, lon = float(query['latitude']), float(query['longitude'])
+            except (KeyError, ValueError):
+                return self.send_json(400, {'error': True, 'reason': 'latitude and longitude required'})
+            return self.send_json(200, fake_forecast(lat, lon))
+        self.send_json(404, {'error': True, 'reason': 'not found'})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, fail_every=0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def count(self, path):
+        with self._lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+            return sum(self._counts.values())
+
+    def counts(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+def start_stub(port=0, latency=0.0, fail_every=0):
+    """Serve in a daemon thread; returns (server, base_url)."""
+    server = StubServer(('127.0.0.1', port), latency, fail_every)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds added to every response')
+    parser.add_argument('--fail-every', type=int, default=0, help='answer 503 to every Nth request')
+    args = parser.parse_args()
+    server = StubServer(('127.0.0.1', args.port), args.latency, args.fail_every)
+    print(f'stub Open-Meteo on http://127.0.0.1:{args.port} (latency {args.latency}s)')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
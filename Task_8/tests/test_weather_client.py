@@ -0,0 +1,157 @@
+"""WeatherClient against stub_server.py (no network needed).
+
+Run from Task_8/:
+    python -m pytest tests        (or: python -m unittest discover tests)
+"""
+import asyncio
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import weather_client
+from weather_client import CityNotFound, UpstreamError, WeatherClient
+
+# Loaded under its own name: other apps in this repo have a stub_server.py too
+_spec = importlib.util.spec_from_file_location('weather_stub_server', os.path.join(APP_DIR, 'stub_server.py'))
+stub_server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(stub_server)
+
+
+class StubTestCase(unittest.TestCase):
+    fail_every = 0
+
+    def setUp(self):
+        self.server, base = stub_server.start_stub(fail_every=self.fail_every)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.tmp = tempfile.mkdtemp(prefix='weather-test-')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.base = base
+
+    def client(self, cache_db=None):
+        return WeatherClient(f'{self.base}/v1/search', f'{self.base}/v1/forecast', cache_db=cache_db)
+
+    def requests_to(self, path):
+        return self.server.counts().get(path, 0)
+
+
+class CacheTest(StubTestCase):
+    def test_second_lookup_is_served_from_cache(self):
+        client = self.client()
+        first = client.get_weather('Oslo')
+        self.assertEqual(first['city'], 'Oslo')
+        self.assertEqual(first['country'], 'Stubland')
+        # Case and spacing do not matter for the cache key
+        self.assertEqual(client.get_weather('  OSLO '), first)
+        self.assertEqual(self.requests_to('/v1/search'), 1)
+        self.assertEqual(self.requests_to('/v1/forecast'), 1)
+        stats = client.stats()
+        self.assertEqual((stats['geocode']['memory']['hits'], stats['geocode']['memory']['misses']), (1, 1))
+        self.assertEqual((stats['forecast']['memory']['hits'], stats['forecast']['memory']['misses']), (1, 1))
+
+    def test_sqlite_cache_is_shared_between_clients(self):
+        db = os.path.join(self.tmp, 'cache.db')
+        expected = self.client(db).get_weather('Lima')
+        self.assertEqual(self.client(db).get_weather('Lima'), expected)
+        self.assertEqual(self.requests_to('/v1/search'), 1)
+        self.assertEqual(self.requests_to('/v1/forecast'), 1)
+
+    def test_city_not_found_is_cached_until_it_expires(self):
+        client = self.client()
+        with mock.patch.object(weather_client, 'GEOCODE_MISS_TTL', 0.3):
+            with self.assertRaises(CityNotFound):
+                client.get_weather('Nowhere town')
+            with self.assertRaises(CityNotFound):
+                client.get_weather('nowhere town')
+            self.assertEqual(self.requests_to('/v1/search'), 1)
+            time.sleep(0.4)
+            with self.assertRaises(CityNotFound):
+                client.get_weather('Nowhere town')
+            self.assertEqual(self.requests_to('/v1/search'), 2)
+        self.assertEqual(self.requests_to('/v1/forecast'), 0)
+
+    def test_miss_read_from_sqlite_expires_with_the_disk_copy(self):
+        db = os.path.join(self.tmp, 'cache.db')
+        with mock.patch.object(weather_client, 'GEOCODE_MISS_TTL', 0.3):
+            with self.assertRaises(CityNotFound):
+                self.client(db).geocode('Nowhere town')
+            # A second process: empty memory, the miss comes from SQLite
+            client = self.client(db)
+            with self.assertRaises(CityNotFound):
+                client.geocode('Nowhere town')
+            self.assertEqual(self.requests_to('/v1/search'), 1)
+            time.sleep(0.4)
+            # The memory copy must not outlive the disk entry it came from
+            with self.assertRaises(CityNotFound):
+                client.geocode('Nowhere town')
+            self.assertEqual(self.requests_to('/v1/search'), 2)
+
+
+class RetryTest(StubTestCase):
+    # Requests 2, 4, 6... answer 503
+    fail_every = 2
+
+    def test_blocking_call_retries_a_503(self):
+        result = self.client().get_weather('Oslo')
+        self.assertEqual(result['city'], 'Oslo')
+        # geocode went through, the forecast failed once and was retried
+        self.assertEqual(self.requests_to('/v1/search'), 1)
+        self.assertEqual(self.requests_to('/v1/forecast'), 2)
+
+    def test_async_call_retries_a_503(self):
+        # One city, so the stub sees the requests in a fixed order
+        results = asyncio.run(self.client().get_weather_many(['Oslo']))
+        self.assertEqual(results[0]['city'], 'Oslo')
+        self.assertNotIn('status', results[0])
+        self.assertEqual(self.requests_to('/v1/search'), 1)
+        self.assertEqual(self.requests_to('/v1/forecast'), 2)
+
+
+class OutageTest(StubTestCase):
+    fail_every = 1
+
+    def test_blocking_call_gives_up_after_retries(self):
+        with self.assertRaises(UpstreamError):
+            self.client().get_weather('Oslo')
+        self.assertEqual(self.requests_to('/v1/search'), weather_client.MAX_RETRIES + 1)
+
+    def test_concurrent_calls_report_502(self):
+        results = asyncio.run(self.client().get_weather_many(['Oslo', 'Lima']))
+        self.assertEqual([(r['query'], r['status']) for r in results], [('Oslo', 502), ('Lima', 502)])
+
+
+class FanOutTest(StubTestCase):
+    def test_one_result_per_distinct_city_in_order(self):
+        client = self.client()
+        results = asyncio.run(client.get_weather_many(['Oslo', 'lima', ' oslo ', 'Nowhere land', '  ']))
+        self.assertEqual([r['query'] for r in results], ['Oslo', 'lima', 'Nowhere land'])
+        self.assertEqual([r.get('status') for r in results], [None, None, 404])
+        self.assertEqual(results[1]['city'], 'Lima')
+
+        location = stub_server.fake_location('Oslo')
+        lat, lon = weather_client.coords(location['latitude'], location['longitude'])
+        self.assertEqual(results[0]['current'], stub_server.fake_forecast(lat, lon)['current_weather'])
+        self.assertEqual(results[0], dict(client.get_weather('Oslo'), query='Oslo'))
+
+        self.assertEqual(self.requests_to('/v1/search'), 3)
+        self.assertEqual(self.requests_to('/v1/forecast'), 2)
+
+    def test_repeat_is_answered_from_cache(self):
+        client = self.client()
+        cities = ['Oslo', 'Lima', 'Nowhere land']
+        first = asyncio.run(client.get_weather_many(cities))
+        counts = self.server.counts()
+        self.assertEqual(asyncio.run(client.get_weather_many(cities)), first)
+        self.assertEqual(self.server.counts(), counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
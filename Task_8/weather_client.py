@@ -0,0 +1,240 @@
+"""Open-Meteo geocoding + forecast client with pooled connections and caches.
+
+    client = WeatherClient()
+    client.get_weather('São Paulo')                        # one city, blocking
+    asyncio.run(client.get_weather_many(['Oslo', 'Lima']))  # many, concurrently
+
+Blocking calls share one requests.Session (keep-alive pool, timeouts, retries
+on connection errors, 429 and 5xx). Geocoding results change almost never and
+are cached for GEOCODE_TTL; forecasts for FORECAST_TTL. Both caches are an
+in-memory LRU, backed by SQLite when WEATHER_CACHE_DB is set so the caches
+survive restarts and are shared between worker processes. The base URLs can
+be pointed at stub_server.py for offline runs and benchmarks.
+"""
+import asyncio
+import os
+import random
+import sys
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache import SQLiteCache, TieredCache
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for common/
+from common.cache import TTLCache
+
+GEOCODE_URL = os.environ.get('WEATHER_GEOCODE_URL', 'https://geocoding-api.open-meteo.com/v1/search')
+FORECAST_URL = os.environ.get('WEATHER_FORECAST_URL', 'https://api.open-meteo.com/v1/forecast')
+CONNECT_TIMEOUT = float(os.environ.get('WEATHER_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.environ.get('WEATHER_READ_TIMEOUT', '10'))
+MAX_RETRIES = int(os.environ.get('WEATHER_MAX_RETRIES', '2'))
+RETRY_BACKOFF = 0.3
+RETRY_STATUS = (429, 500, 502, 503, 504)
+POOL_SIZE = int(os.environ.get('WEATHER_POOL_SIZE', '16'))
+
+GEOCODE_TTL = float(os.environ.get('WEATHER_GEOCODE_TTL', str(7 * 24 * 3600)))
+# "No such city" is cached too, but not for as long
+GEOCODE_MISS_TTL = float(os.environ.get('WEATHER_GEOCODE_MISS_TTL', '3600'))
+FORECAST_TTL = float(os.environ.get('WEATHER_FORECAST_TTL', '600'))
+CACHE_SIZE = int(os.environ.get('WEATHER_CACHE_SIZE', '10000'))
+WEATHER_CACHE_DB = os.environ.get('WEATHER_CACHE_DB')
+
+# Forecasts are keyed (and requested) at 2 decimals, about 1 km, well inside
+# one model grid cell, so nearby places share one cache entry.
+COORD_DECIMALS = 2
+MULTI_CONCURRENCY = int(os.environ.get('WEATHER_MULTI_CONCURRENCY', '8'))
+
+FORECAST_PARAMS = {
+    'current_weather': 'true',
+    'daily': 'temperature_2m_max,temperature_2m_min,weathercode',
+    'timezone': 'auto',
+}
+
+
+class CityNotFound(LookupError):
+    """The geocoder has no match for the name."""
+
+
+class UpstreamError(RuntimeError):
+    """Open-Meteo could not be reached or answered with an error."""
+
+
+def make_session(pool_size=POOL_SIZE, retries=MAX_RETRIES):
+    retry = Retry(total=retries, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUS,
+                  allowed_methods=frozenset({'GET'}), respect_retry_after_header=True, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def city_key(city):
+    return ' '.join(city.split()).casefold()
+
+
+def coords(lat, lon):
+    return round(float(lat), COORD_DECIMALS), round(float(lon), COORD_DECIMALS)
+
+
+def make_cache(ttl, table, db_path):
+    disk = SQLiteCache(db_path, table, ttl) if db_path else None
+    return TieredCache(TTLCache(CACHE_SIZE, ttl), disk)
+
+
+def first_result(data):
+    results = data.get('results') or []
+    if not results:
+        return {}
+    loc = results[0]
+    return {'name': loc['name'], 'country': loc.get('country', ''),
+            'latitude': loc['latitude'], 'longitude': loc['longitude']}
+
+
+def weather_payload(location, forecast):
+    return {
+        'city': location['name'],
+        'country': location['country'],
+        'current': forecast['current_weather'],
+        'daily': forecast.get('daily', {}),
+    }
+
+
+class WeatherClient:
+    def __init__(self, geocode_url=GEOCODE_URL, forecast_url=FORECAST_URL, cache_db=WEATHER_CACHE_DB, session=None):
+        self.geocode_url = geocode_url
+        self.forecast_url = forecast_url
+        self.session = session or make_session()
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self.geocode_cache = make_cache(GEOCODE_TTL, 'geocode', cache_db)
+        self.forecast_cache = make_cache(FORECAST_TTL, 'forecast', cache_db)
+
+    # -- blocking ----------------------------------------------------------
+
+    def _get_json(self, url, params):
+        try:
+            r = self.session.get(url, params=params, timeout=self.timeout)
+            r.raise_for_status()
+            return r.json()
+        except (requests.RequestException, ValueError) as e:
+            raise UpstreamError(str(e)) from e
+
+    def geocode(self, city):
+        key = city_key(city)
+        location = self.geocode_cache.get(key)
+        if location is None:
+            location = first_result(self._get_json(
+                self.geocode_url, {'name': city, 'count': 1, 'language': 'en', 'format': 'json'}))
+            self.geocode_cache.set(key, location, None if location else GEOCODE_MISS_TTL)
+        if not location:
+            raise CityNotFound(city)
+        return location
+
+    def forecast(self, lat, lon):
+        lat, lon = coords(lat, lon)
+        key = f'{lat},{lon}'
+        forecast = self.forecast_cache.get(key)
+        if forecast is None:
+            forecast = self._get_json(self.forecast_url, dict(FORECAST_PARAMS, latitude=lat, longitude=lon))
+            self.forecast_cache.set(key, forecast)
+        return forecast
+
+    def get_weather(self, city):
+        location = self.geocode(city)
+        return weather_payload(location, self.forecast(location['latitude'], location['longitude']))
+
+    # -- concurrent --------------------------------------------------------
+
+    async def _aget_json(self, client, url, params):
+        # Same policy as the session's Retry, with jitter so a burst of
+        # concurrent failures does not retry in lockstep
+        for attempt in range(MAX_RETRIES + 1):
+            delay = RETRY_BACKOFF * 2 ** attempt * (0.5 + random.random())
+            try:
+                r = await client.get(url, params=params)
+                if r.status_code in RETRY_STATUS and attempt < MAX_RETRIES:
+                    await asyncio.sleep(delay)
+                    continue
+                r.raise_for_status()
+                return r.json()
+            except httpx.TransportError as e:
+                if attempt < MAX_RETRIES:
+                    await asyncio.sleep(delay)
+                    continue
+                raise UpstreamError(str(e)) from e
+            except (httpx.HTTPError, ValueError) as e:
+                raise UpstreamError(str(e)) from e
+
+    def _cached(self, city):
+        """(location, forecast) from the caches; either is None when missing."""
+        location = self.geocode_cache.get(city_key(city))
+        if not location:
+            return location, None
+        lat, lon = coords(location['latitude'], location['longitude'])
+        return location, self.forecast_cache.get(f'{lat},{lon}')
+
+    async def _aget_weather(self, client, limit, city, location=None):
+        if location is None:
+            async with limit:
+                location = first_result(await self._aget_json(
+                    client, self.geocode_url, {'name': city, 'count': 1, 'language': 'en', 'format': 'json'}))
+            self.geocode_cache.set(city_key(city), location, None if location else GEOCODE_MISS_TTL)
+        if not location:
+            raise CityNotFound(city)
+
+        lat, lon = coords(location['latitude'], location['longitude'])
+        forecast = self.forecast_cache.get(f'{lat},{lon}')
+        if forecast is None:
+            async with limit:
+                forecast = await self._aget_json(
+                    client, self.forecast_url, dict(FORECAST_PARAMS, latitude=lat, longitude=lon))
+            self.forecast_cache.set(f'{lat},{lon}', forecast)
+        return weather_payload(location, forecast)
+
+    async def get_weather_many(self, cities, concurrency=MULTI_CONCURRENCY):
+        """One result per distinct city (case and spacing ignored, first-seen
+        order): the weather payload plus 'query', or {'query', 'error',
+        'status'} on failure."""
+        seen = {}
+        for city in cities:
+            if city.strip():
+                seen.setdefault(city_key(city), city.strip())
+        unique = list(seen.values())
+        outcomes, locations = {}, {}
+        for city in unique:
+            location, forecast = self._cached(city)
+            if location == {}:
+                outcomes[city] = CityNotFound(city)
+            elif forecast is not None:
+                outcomes[city] = weather_payload(location, forecast)
+            else:
+                locations[city] = location
+
+        # Only open connections when something actually has to be fetched
+        if locations:
+            limit = asyncio.Semaphore(concurrency)
+            async with httpx.AsyncClient(
+                    timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                    limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)) as client:
+                fetched = await asyncio.gather(*(self._aget_weather(client, limit, c, loc)
+                                                 for c, loc in locations.items()), return_exceptions=True)
+            outcomes.update(zip(locations, fetched))
+
+        results = []
+        for city in unique:
+            outcome = outcomes[city]
+            if isinstance(outcome, CityNotFound):
+                results.append({'query': city, 'error': 'City not found', 'status': 404})
+            elif isinstance(outcome, UpstreamError):
+                results.append({'query': city, 'error': str(outcome), 'status': 502})
+            elif isinstance(outcome, Exception):
+                results.append({'query': city, 'error': str(outcome), 'status': 500})
+            else:
+                results.append(dict(outcome, query=city))
+        return results
+
+    def stats(self):
+        return {'geocode': self.geocode_cache.stats(), 'forecast': self.forecast_cache.stats()}
@@ -1,18 +1,87 @@
+import os
+import sys
+import threading
+import time
+
 from flask import Flask, request, jsonify, render_template
-from sentence_transformers import SentenceTransformer, util
-import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for common/
+from common.cache import TTLCache
+from common.encoders import CachedEncoder, encoder_id, load_encoder
+from common.model_client import SidecarError, connect_if_available
+import paraphrase
 
 app = Flask(__name__)
 
 
-print("Loading model... this may take a while on first run.")
-model = SentenceTransformer('all-MiniLM-L6-v2')
-print("Model loaded.")
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Load the encoder on first use. The backend (torch / onnx / onnx-int8)
+    comes from ENCODER_BACKEND, see common/encoders.py."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                print("Loading model... this may take a while on first run.")
+                _model = load_encoder(MODEL_NAME)
+                print("Model loaded.")
+    return _model
+
+
+# When the shared model server is running (Task_12/model_server.py) this worker
+# never loads its own copy of the model. If it goes away it is looked for again
+# every SIDECAR_RETRY_INTERVAL seconds; a timeout (SidecarTimeout) is an error
+# for that request only.
+SIDECAR_RETRY_INTERVAL = float(os.environ.get('SIDECAR_RETRY_INTERVAL', '30'))
+sidecar = connect_if_available()
+_sidecar_retry_at = time.monotonic() + SIDECAR_RETRY_INTERVAL
+
+
+def encode_texts(texts):
+    global sidecar, _sidecar_retry_at
+    if sidecar is None and time.monotonic() >= _sidecar_retry_at:
+        _sidecar_retry_at = time.monotonic() + SIDECAR_RETRY_INTERVAL
+        sidecar = connect_if_available()
+    client = sidecar
+    if client is not None:
+        try:
+            return client.encode(texts, encoder_id(MODEL_NAME))
+        except (ConnectionError, SidecarError) as e:
+            print(f"Model server unavailable ({e}), loading the model in-process.")
+            sidecar = None
+            _sidecar_retry_at = time.monotonic() + SIDECAR_RETRY_INTERVAL
+    return get_model().encode(texts)
+
+
+# Repeated sentences skip the transformer (see CachedEncoder in common/encoders.py)
+embedding_cache = TTLCache(int(os.environ.get('EMBED_CACHE_SIZE', '10000')),
+                           float(os.environ.get('EMBED_CACHE_TTL', '3600')))
+encoder = CachedEncoder(encode_texts, encoder_id(MODEL_NAME), embedding_cache)
+
+THRESHOLD = paraphrase.DEFAULT_THRESHOLD
+MAX_BATCH_SENTENCES = 20000
+# Most pairs one /dedup response lists; the rest are dropped and 'truncated' is set
+MAX_DEDUP_PAIRS = int(os.environ.get('DEDUP_MAX_PAIRS', '100000'))
+# Largest top_k /dedup accepts
+MAX_TOP_K = 100
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def _verdict(score):
+    is_paraphrase = score >= THRESHOLD
+    return {
+        'similarity_score': round(score, 4),
+        'is_paraphrase': is_paraphrase,
+        'verdict': "Paraphrase Detected" if is_paraphrase else "Not a Paraphrase"
+    }
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
@@ -24,25 +93,70 @@ def predict():
             return jsonify({'error': 'Both sentences are required.'}), 400
 
 
-        embeddings1 = model.encode(sentence1, convert_to_tensor=True)
-        embeddings2 = model.encode(sentence2, convert_to_tensor=True)
+        score = float(paraphrase.score_pairs([(sentence1, sentence2)], encoder.encode)[0])
+        return jsonify(_verdict(score))
 
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score a list of pairs: {"pairs": [[sentence1, sentence2], ...]}."""
+    try:
+        data = request.get_json()
+        pairs = data.get('pairs')
+        if (not isinstance(pairs, list) or not pairs or
+                not all(isinstance(p, list) and len(p) == 2 and all(isinstance(s, str) and s for s in p) for p in pairs)):
+            return jsonify({'error': 'pairs must be a non-empty list of [sentence1, sentence2].'}), 400
+        if 2 * len(pairs) > MAX_BATCH_SENTENCES:
+            return jsonify({'error': f'At most {MAX_BATCH_SENTENCES // 2} pairs per request.'}), 400
+
+        scores = paraphrase.score_pairs([tuple(p) for p in pairs], encoder.encode)
+        return jsonify({'results': [_verdict(s) for s in scores.tolist()]})
 
-        cosine_scores = util.cos_sim(embeddings1, embeddings2)
-        score = cosine_scores.item()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/dedup', methods=['POST'])
+def dedup():
+    """Find paraphrases inside one list: {"sentences": [...], "top_k": 5, "threshold": 0.7}.
 
+    With top_k the response has the best matches of every sentence, without it
+    every pair scoring at least the threshold (at most MAX_DEDUP_PAIRS of them,
+    with "truncated": true if there were more). threshold is a cosine in [-1, 1].
+    """
+    try:
+        data = request.get_json()
+        sentences = data.get('sentences')
+        if not isinstance(sentences, list) or not sentences or not all(isinstance(s, str) and s for s in sentences):
+            return jsonify({'error': 'sentences must be a non-empty list of strings.'}), 400
+        if len(sentences) > MAX_BATCH_SENTENCES:
+            return jsonify({'error': f'At most {MAX_BATCH_SENTENCES} sentences per request.'}), 400
+        threshold = data.get('threshold', THRESHOLD)
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not -1 <= threshold <= 1:
+            return jsonify({'error': 'threshold must be a number from -1 to 1.'}), 400
 
-        threshold = 0.7
-        is_paraphrase = score >= threshold
+        if data.get('top_k') is not None:
+            top_k = data['top_k']
+            if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K:
+                return jsonify({'error': f'top_k must be an integer from 1 to {MAX_TOP_K}.'}), 400
+            matches = paraphrase.top_duplicates(sentences, encoder.encode, top_k, threshold)
+            return jsonify({'matches': [[{'index': j, 'similarity_score': round(s, 4)} for j, s in found]
+                                        for found in matches]})
 
-        return jsonify({
-            'similarity_score': round(score, 4),
-            'is_paraphrase': is_paraphrase,
-            'verdict': "Paraphrase Detected" if is_paraphrase else "Not a Paraphrase"
-        })
+        # One extra pair tells whether there were more than the cap
+        pairs = paraphrase.all_pairs(sentences, encoder.encode, threshold, max_pairs=MAX_DEDUP_PAIRS + 1)
+        truncated = len(pairs) > MAX_DEDUP_PAIRS
+        return jsonify({'pairs': [{'i': i, 'j': j, 'similarity_score': round(s, 4)}
+                                  for i, j, s in pairs[:MAX_DEDUP_PAIRS]],
+                        'truncated': truncated})
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics/cache')
+def cache_metrics():
+    return jsonify({'embeddings': embedding_cache.stats()})
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,76 @@
+"""Throughput of the batch paraphrase API vs one pair per request.
+
+Run from Task_9/:
+    python benchmarks/bench_batch.py [--pairs 2000] [--dedup 5000]
+
+`per-pair` reproduces the original /predict: two model.encode calls and one
+cosine per pair. `batch` is paraphrase.score_pairs over the same pairs.
+`dedup` runs top-k and all-pairs duplicate detection over one list.
+No embedding cache is involved, so every sentence really is encoded.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import paraphrase
+
+WORDS = ("the quick brown fox jumps over a lazy dog while cats sleep near warm windows and "
+         "children play outside under bright blue skies in the quiet afternoon").split()
+
+
+def make_sentences(n, rng):
+    sentences = [' '.join(rng.choices(WORDS, k=rng.randint(6, 16))) for _ in range(n)]
+    # A share of exact and near duplicates, like a real dedup job
+    for i in range(0, n, 10):
+        sentences[i] = sentences[(i * 7) % n]
+    return sentences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pairs', type=int, default=2000)
+    parser.add_argument('--dedup', type=int, default=5000)
+    parser.add_argument('--block-mb', type=float, default=paraphrase.DEFAULT_BLOCK_MB)
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    rng = random.Random(0)
+    sentences = make_sentences(2 * args.pairs, rng)
+    pairs = list(zip(sentences[::2], sentences[1::2]))
+
+    start = time.perf_counter()
+    for a, b in pairs:
+        e1 = model.encode(a)
+        e2 = model.encode(b)
+        float(np.dot(e1, e2) / (np.linalg.norm(e1) * np.linalg.norm(e2)))
+    per_pair = time.perf_counter() - start
+
+    start = time.perf_counter()
+    paraphrase.score_pairs(pairs, model.encode, args.block_mb)
+    batch = time.perf_counter() - start
+
+    print(f"{'path':<22}{'seconds':>10}{'pairs/s':>12}")
+    print(f"{'per-pair':<22}{per_pair:>10.2f}{len(pairs) / per_pair:>12.1f}")
+    print(f"{'batch':<22}{batch:>10.2f}{len(pairs) / batch:>12.1f}")
+
+    dedup_sentences = make_sentences(args.dedup, rng)
+    start = time.perf_counter()
+    paraphrase.top_duplicates(dedup_sentences, model.encode, top_k=5, max_block_mb=args.block_mb)
+    top_k = time.perf_counter() - start
+    start = time.perf_counter()
+    found = paraphrase.all_pairs(dedup_sentences, model.encode, max_block_mb=args.block_mb)
+    everything = time.perf_counter() - start
+    print(f"\n{args.dedup} sentences ({args.dedup * (args.dedup - 1) // 2} pairs compared)")
+    print(f"{'dedup top-5':<22}{top_k:>10.2f}")
+    print(f"{'dedup all-pairs':<22}{everything:>10.2f}   {len(found)} pairs >= {paraphrase.DEFAULT_THRESHOLD}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Batch paraphrase scoring and duplicate detection.
+
+Every function takes an `encode` callable (list of str -> 2-d array), e.g.
+`CachedEncoder.encode` or `model.encode`. Each unique sentence is encoded
+once, in one batch, and similarities are computed as blocked matrix
+products over L2-normalized embeddings so memory stays under `max_block_mb`.
+"""
+import numpy as np
+
+
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_BLOCK_MB = 64
+
+
+def encode_unique(sentences, encode):
+    """Encode each distinct sentence once.
+
+    Returns (embeddings, index) where embeddings[index[i]] is the unit-length
+    embedding of sentences[i].
+    """
+    positions = {}
+    index = np.fromiter((positions.setdefault(s, len(positions)) for s in sentences),
+                        dtype=np.int64, count=len(sentences))
+    if not positions:
+        return np.empty((0, 0), dtype=np.float32), index
+    embeddings = np.asarray(encode(list(positions)), dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.maximum(norms, 1e-12)
+    return embeddings, index
+
+
+def _block_rows(n_cols, max_block_mb):
+    """Rows per block so a (rows, n_cols) float32 block fits in max_block_mb."""
+    return max(1, int(max_block_mb * 2**20 // (4 * max(n_cols, 1))))
+
+
+def score_pairs(pairs, encode, max_block_mb=DEFAULT_BLOCK_MB):
+    """Cosine similarity of each (sentence1, sentence2) pair, as a float32 array."""
+    if not pairs:
+        return np.empty(0, dtype=np.float32)
+    left = [a for a, _ in pairs]
+    right = [b for _, b in pairs]
+    embeddings, index = encode_unique(left + right, encode)
+    li, ri = index[:len(pairs)], index[len(pairs):]
+    scores = np.empty(len(pairs), dtype=np.float32)
+    step = _block_rows(embeddings.shape[1], max_block_mb)
+    for start in range(0, len(pairs), step):
+        a = embeddings[li[start:start + step]]
+        b = embeddings[ri[start:start + step]]
+        scores[start:start + step] = np.einsum('ij,ij->i', a, b)
+    return scores
+
+
+def _blocks(embeddings, max_block_mb):
+    """Yield (start, similarity block) for rows [start, start+rows) against all rows."""
+    n = len(embeddings)
+    step = _block_rows(n, max_block_mb)
+    for start in range(0, n, step):
+        yield start, embeddings[start:start + step] @ embeddings.T
+
+
+def top_duplicates(sentences, encode, top_k=5, threshold=DEFAULT_THRESHOLD, max_block_mb=DEFAULT_BLOCK_MB):
+    """For every sentence, its `top_k` most similar other sentences scoring >= threshold.
+
+    Returns a list (one entry per input sentence) of [(other_position, score), ...],
+    best first. Exact repeats of a sentence are reported with score 1.0.
+    """
+    embeddings, index = encode_unique(sentences, encode)
+    n_unique = len(embeddings)
+    # Positions in `sentences` of each unique sentence
+    members = [[] for _ in range(n_unique)]
+    for pos, u in enumerate(index.tolist()):
+        members[u].append(pos)
+
+    neighbours = [[] for _ in range(n_unique)]
+    k = min(top_k, n_unique - 1)
+    if k > 0:
+        for start, block in _blocks(embeddings, max_block_mb):
+            rows = np.arange(len(block))
+            block[rows, start + rows] = -np.inf  # a sentence is not its own duplicate
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            for r in range(len(block)):
+                order = np.argsort(-top_scores[r], kind='stable')
+                neighbours[start + r] = [(int(top[r, o]), float(top_scores[r, o]))
+                                         for o in order if top_scores[r, o] >= threshold]
+
+    results = []
+    for pos, u in enumerate(index.tolist()):
+        found = [(other, 1.0) for other in members[u] if other != pos]
+        for v, score in neighbours[u]:
+            found.extend((other, score) for other in members[v])
+        results.append(found[:top_k])
+    return results
+
+
+def all_pairs(sentences, encode, threshold=DEFAULT_THRESHOLD, max_block_mb=DEFAULT_BLOCK_MB, max_pairs=None):
+    """Every pair (i, j, score) with i < j and cosine similarity >= threshold.
+
+    With `max_pairs` the scan stops once that many pairs are found and at most
+    `max_pairs` come back, so a low threshold cannot build all n^2 / 2 pairs.
+    Ask for one more than you will use to tell whether the list was cut short.
+    """
+    embeddings, index = encode_unique(sentences, encode)
+    members = [[] for _ in range(len(embeddings))]
+    for pos, u in enumerate(index.tolist()):
+        members[u].append(pos)
+
+    full = lambda: max_pairs is not None and len(pairs) >= max_pairs
+    pairs = []
+    for group in members:
+        pairs.extend((a, b, 1.0) for i, a in enumerate(group) for b in group[i + 1:])
+        if full():
+            break
+    for start, block in _blocks(embeddings, max_block_mb):
+        if full():
+            break
+        # Upper triangle only: column index greater than the global row index
+        rows, cols = np.nonzero(np.triu(block >= threshold, k=start + 1))
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            score = float(block[r, c])
+            pairs.extend((min(a, b), max(a, b), score) for a in members[start + r] for b in members[c])
+            if full():
+                break
+    pairs.sort()
+    return pairs if max_pairs is None else pairs[:max_pairs]
@@ -0,0 +1,14 @@
+"""assgmnt 01's entry point to the shared train / predict CLI in
+../Assgmnt02/tabular.py, which handles this folder's house-prices data as
+well as Assgmnt02's. Run from this folder, same commands:
+
+    python tabular.py fit --train data/train.csv --model model.joblib --cv 5
+    python tabular.py predict --model model.joblib --test data/test.csv --out submission.csv
+"""
+import os
+import runpy
+
+TABULAR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Assgmnt02', 'tabular.py')
+
+if __name__ == '__main__':
+    runpy.run_path(TABULAR, run_name='__main__')
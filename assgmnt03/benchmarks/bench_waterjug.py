@@ -0,0 +1,144 @@
+"""Water jug: the notebook's DFS vs state_search.py, one goal at a time and all at once.
+
+Run from assgmnt03/:
+    python benchmarks/bench_waterjug.py [--caps 4x3 1000x999 10000x9999] [--goals 100]
+
+For each pair of capacities, --goals random amounts up to the larger jug are
+solved one by one:
+
+    notebook       waterJugDFS from waterjug.ipynb without the printing; its
+                   `steps` is the length of the visit order it prints
+    dfs / bfs /    WaterJug.solve(goal, strategy) on a new WaterJug per goal;
+    bidirectional  `steps` is the length of the returned path
+    tree           one WaterJug, solve(goal, 'tree'): the first goal pays for
+                   a BFS sweep of every reachable state, the others only
+                   rebuild their path from it
+    all goals      WaterJug.solve_all(): the sweep, then the fewest steps for
+                   every measurable amount (not just the sampled ones)
+
+`ms/goal` divides by the number of goals answered. `MB` is the tracemalloc
+peak of answering the first sampled goal (for `all goals`, of the sweep):
+a set of (jug1, jug2) tuples in the notebook, one bit per state plus parent
+pointers for the visited states in state_search. Coprime capacities make
+every amount measurable, so the searches cannot stop early on unreachable
+goals.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from state_search import WaterJug
+
+
+# -- waterjug.ipynb, with the prints replaced by returns --------------------
+
+def notebook_dfs(capacity1, capacity2, goal):
+    stack = []
+    visited = set()
+
+    stack.append((0, 0))
+    visited.add((0, 0))
+
+    actions = []
+
+    while stack:
+        jug1, jug2 = stack.pop()
+        actions.append((jug1, jug2))
+
+        if jug1 == goal or jug2 == goal:
+            return actions
+
+        pour1to2 = min(jug1, capacity2 - jug2)
+        pour2to1 = min(jug2, capacity1 - jug1)
+
+        rules = [
+            (capacity1, jug2),
+            (jug1, capacity2),
+            (0, jug2),
+            (jug1, 0),
+            (jug1 - pour1to2, jug2 + pour1to2),
+            (jug1 + pour2to1, jug2 - pour2to1),
+        ]
+
+        for state in reversed(rules):
+            if state not in visited:
+                visited.add(state)
+                stack.append(state)
+
+    return None
+
+# ---------------------------------------------------------------------------
+
+
+def peak_mb(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def caps(text):
+    cap1, _, cap2 = text.partition('x')
+    return int(cap1), int(cap2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--caps', type=caps, nargs='+', default=[(4, 3), (1000, 999), (10000, 9999)],
+                        metavar='AxB')
+    parser.add_argument('--goals', type=int, default=100, help='random goals solved one by one')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'capacities':<13}{'method':<15}{'goals':>7}{'seconds':>10}{'ms/goal':>10}{'mean steps':>12}{'MB':>8}")
+    for cap1, cap2 in args.caps:
+        rng = random.Random(args.seed)
+        goals = [rng.randint(1, max(cap1, cap2)) for _ in range(args.goals)]
+        label = f"{cap1}x{cap2}"
+        shared = WaterJug(cap1, cap2)
+        methods = {
+            'notebook': lambda g: notebook_dfs(cap1, cap2, g),
+            'dfs': lambda g: WaterJug(cap1, cap2).solve(g, 'dfs'),
+            'bfs': lambda g: WaterJug(cap1, cap2).solve(g, 'bfs'),
+            'bidirectional': lambda g: WaterJug(cap1, cap2).solve(g, 'bidirectional'),
+            'tree': lambda g: shared.solve(g, 'tree'),
+        }
+        shortest = None
+        for name, fn in methods.items():
+            mb = peak_mb(lambda: fn(goals[0]))
+            if name == 'tree':
+                shared = WaterJug(cap1, cap2)   # so the timed run pays for the sweep too
+            start = time.perf_counter()
+            results = [fn(g) for g in goals]
+            seconds = time.perf_counter() - start
+            found = [r for r in results if r is not None]
+            if name == 'notebook':
+                steps = sum(len(r) - 1 for r in found) / max(len(found), 1)
+            else:
+                steps = sum(len(r.actions) for r in found) / max(len(found), 1)
+            if name == 'bfs':
+                shortest = [None if r is None else len(r.actions) for r in results]
+            if name in ('bidirectional', 'tree'):
+                assert [None if r is None else len(r.actions) for r in results] == shortest, \
+                    f"{label}: {name} and bfs disagree"
+            print(f"{label:<13}{name:<15}{len(goals):>7}{seconds:>10.3f}{seconds / len(goals) * 1000:>10.3f}"
+                  f"{steps:>12.1f}{mb:>8.1f}", flush=True)
+
+        mb = peak_mb(lambda: WaterJug(cap1, cap2).solve_all())
+        start = time.perf_counter()
+        fewest = WaterJug(cap1, cap2).solve_all()
+        seconds = time.perf_counter() - start
+        assert [fewest.get(g) for g in goals] == shortest, f"{label}: solve_all and bfs disagree"
+        steps = sum(fewest.values()) / len(fewest)
+        print(f"{label:<13}{'all goals':<15}{len(fewest):>7}{seconds:>10.3f}{seconds / len(fewest) * 1000:>10.3f}"
+              f"{steps:>12.1f}{mb:>8.1f}\n", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""State-space search (DFS, BFS, bidirectional) and the water jug problem.
+
+    jugs = WaterJug(4, 3)
+    path = jugs.solve(2)                      # shortest (BFS) by default
+    path.states    # [(0, 0), (0, 3), (3, 0), (3, 3), (4, 2)]
+    path.actions   # ['fill 2', 'pour 2->1', 'fill 2', 'pour 2->1']
+    jugs.solve_all()                          # {goal: steps}, one BFS sweep
+    jugs.solve(2, 'tree')                     # a path out of that sweep
+
+The search functions work on any problem given as a start state, a
+`successors(state)` function yielding (action, next_state) pairs and a goal
+test. Every visited state keeps a pointer to the state and action it was
+reached from, so the result is the actual path to the goal (not the order
+states were visited in). When states map to integers below `size` through
+`index(state)`, the visited set is a bitmap of `size` bits instead of a set
+of tuples; WaterJug uses jug1 * (cap2 + 1) + jug2.
+
+`bfs_tree` explores everything reachable once; afterwards reachability and
+shortest paths to any number of goals are lookups (WaterJug.solve_all and
+the 'tree' strategy), and only the paths asked for are built.
+"""
+import argparse
+from collections import deque, namedtuple
+
+Path = namedtuple('Path', 'states actions')
+
+
+class Visited:
+    """Visited states with parent pointers. With `index`, membership is one
+    bit per state in a bytearray of size / 8 bytes; otherwise a plain set."""
+
+    def __init__(self, index=None, size=None):
+        self.index = index
+        self.size = size
+        self.bits = bytearray((size + 7) >> 3) if index is not None else None
+        self.seen = set() if index is None else None
+        self.parent = {}     # state -> (previous state, action)
+
+    def _bit(self, state):
+        i = self.index(state)
+        if not 0 <= i < self.size:
+            raise ValueError(f"index {i} of state {state!r} is outside 0..{self.size - 1}")
+        return i >> 3, 1 << (i & 7)
+
+    def add(self, state, parent=None, action=None):
+        """Mark `state` visited, reached from `parent`; False if it already was."""
+        if self.bits is not None:
+            byte, mask = self._bit(state)
+            if self.bits[byte] & mask:
+                return False
+            self.bits[byte] |= mask
+        else:
+            if state in self.seen:
+                return False
+            self.seen.add(state)
+        if parent is not None:
+            self.parent[state] = (parent, action)
+        return True
+
+    def __contains__(self, state):
+        if self.bits is not None:
+            byte, mask = self._bit(state)
+            return bool(self.bits[byte] & mask)
+        return state in self.seen
+
+    def path_to(self, state):
+        states, actions = [state], []
+        while state in self.parent:
+            state, action = self.parent[state]
+            states.append(state)
+            actions.append(action)
+        return Path(states[::-1], actions[::-1])
+
+
+def dfs(start, successors, is_goal, index=None, size=None):
+    """Depth-first, successors tried in the order given; not necessarily the
+    shortest path."""
+    visited = Visited(index, size)
+    visited.add(start)
+    stack = [start]
+    while stack:
+        state = stack.pop()
+        if is_goal(state):
+            return visited.path_to(state)
+        for action, nxt in reversed(list(successors(state))):
+            if visited.add(nxt, state, action):
+                stack.append(nxt)
+    return None
+
+
+def bfs(start, successors, is_goal, index=None, size=None):
+    """Breadth-first: a path with the fewest actions."""
+    visited = Visited(index, size)
+    visited.add(start)
+    if is_goal(start):
+        return Path([start], [])
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        for action, nxt in successors(state):
+            if visited.add(nxt, state, action):
+                if is_goal(nxt):
+                    return visited.path_to(nxt)
+                queue.append(nxt)
+    return None
+
+
+def bidirectional(start, goals, successors, predecessors, index=None, size=None):
+    """Shortest path from `start` to any state in `goals`, growing a BFS layer
+    from whichever side has the smaller frontier until they meet.
+    `predecessors(state)` yields (action, previous_state) pairs."""
+    goals = list(goals)
+    forward, backward = Visited(index, size), Visited(index, size)
+    forward.add(start)
+    if start in set(goals):
+        return Path([start], [])
+    front, back = [start], []
+    for goal in goals:
+        if backward.add(goal):
+            back.append(goal)
+    while front and back:
+        meets = []
+        if len(front) <= len(back):
+            layer = []
+            for state in front:
+                for action, nxt in successors(state):
+                    if forward.add(nxt, state, action):
+                        layer.append(nxt)
+                        if nxt in backward:
+                            meets.append(nxt)
+            front = layer
+        else:
+            layer = []
+            for state in back:
+                for action, prev in predecessors(state):
+                    if backward.add(prev, state, action):
+                        layer.append(prev)
+                        if prev in forward:
+                            meets.append(prev)
+            back = layer
+        if meets:
+            # The meets of one layer are equally far from this side but not
+            # necessarily from the other one
+            best = min(meets, key=lambda s: len(forward.path_to(s).actions) + len(backward.path_to(s).actions))
+            head, tail = forward.path_to(best), backward.path_to(best)
+            # backward's pointers lead from `best` to a goal
+            return Path(head.states + tail.states[::-1][1:], head.actions + tail.actions[::-1])
+    return None
+
+
+def bfs_tree(start, successors, index=None, size=None):
+    """Explore everything reachable from `start`.
+
+    Returns (visited, layers): parent pointers for every reachable state and
+    the states grouped by distance, layers[d] being those d actions away.
+    """
+    visited = Visited(index, size)
+    visited.add(start)
+    layers = [[start]]
+    while True:
+        layer = [nxt for state in layers[-1] for action, nxt in successors(state)
+                 if visited.add(nxt, state, action)]
+        if not layer:
+            return visited, layers
+        layers.append(layer)
+
+
+class WaterJug:
+    """Two jugs without markings, capacities cap1 and cap2, starting empty.
+
+    A state is (jug1, jug2). The moves are the notebook's six rules, in the
+    same order; moves that change nothing are left out.
+    """
+
+    STRATEGIES = ('bfs', 'dfs', 'bidirectional', 'tree')
+
+    def __init__(self, cap1, cap2):
+        if cap1 < 0 or cap2 < 0:
+            raise ValueError('capacities must be non-negative')
+        self.cap1 = cap1
+        self.cap2 = cap2
+        self.start = (0, 0)
+        self.size = (cap1 + 1) * (cap2 + 1)
+        self._tree = None
+
+    def index(self, state):
+        return state[0] * (self.cap2 + 1) + state[1]
+
+    def state(self, i):
+        return divmod(i, self.cap2 + 1)
+
+    def successors(self, state):
+        jug1, jug2 = state
+        pour1to2 = min(jug1, self.cap2 - jug2)
+        pour2to1 = min(jug2, self.cap1 - jug1)
+        moves = (
+            ('fill 1', (self.cap1, jug2)),
+            ('fill 2', (jug1, self.cap2)),
+            ('empty 1', (0, jug2)),
+            ('empty 2', (jug1, 0)),
+            ('pour 1->2', (jug1 - pour1to2, jug2 + pour1to2)),
+            ('pour 2->1', (jug1 + pour2to1, jug2 - pour2to1)),
+        )
+        return [(action, nxt) for action, nxt in moves if nxt != state]
+
+    def predecessors(self, state):
+        """(action, previous state) for every move that leads to `state`."""
+        jug1, jug2 = state
+        cap1, cap2 = self.cap1, self.cap2
+        result = []
+        if jug1 == cap1:
+            result += [('fill 1', (x, jug2)) for x in range(cap1)]
+        if jug2 == cap2:
+            result += [('fill 2', (jug1, y)) for y in range(cap2)]
+        if jug1 == 0:
+            result += [('empty 1', (x, jug2)) for x in range(1, cap1 + 1)]
+        if jug2 == 0:
+            result += [('empty 2', (jug1, y)) for y in range(1, cap2 + 1)]
+        # pour 1->2 poured t > 0 and stopped because jug1 ran empty or jug2 filled up
+        if jug1 == 0 or jug2 == cap2:
+            for t in range(1, min(jug2, cap1 - jug1) + 1):
+                prev = (jug1 + t, jug2 - t)
+                if min(prev[0], cap2 - prev[1]) == t:
+                    result.append(('pour 1->2', prev))
+        if jug2 == 0 or jug1 == cap1:
+            for t in range(1, min(jug1, cap2 - jug2) + 1):
+                prev = (jug1 - t, jug2 + t)
+                if min(prev[1], cap1 - prev[0]) == t:
+                    result.append(('pour 2->1', prev))
+        return result
+
+    def goal_states(self, goal):
+        if goal < 0:
+            return []
+        states = [(goal, y) for y in range(self.cap2 + 1)] if goal <= self.cap1 else []
+        states += [(x, goal) for x in range(self.cap1 + 1) if goal <= self.cap2 and x != goal]
+        return states
+
+    def solve(self, goal, strategy='bfs'):
+        """Path to a state where either jug holds `goal`, or None."""
+        is_goal = lambda s: s[0] == goal or s[1] == goal
+        if strategy == 'bfs':
+            return bfs(self.start, self.successors, is_goal, self.index, self.size)
+        if strategy == 'dfs':
+            return dfs(self.start, self.successors, is_goal, self.index, self.size)
+        if strategy == 'bidirectional':
+            return bidirectional(self.start, self.goal_states(goal), self.successors, self.predecessors,
+                                 self.index, self.size)
+        if strategy == 'tree':
+            visited, first = self.tree()
+            return visited.path_to(first[goal][0]) if goal in first else None
+        raise ValueError(f"strategy must be one of {', '.join(self.STRATEGIES)}")
+
+    def tree(self):
+        """One BFS sweep of every reachable state, computed once: (visited,
+        {goal: (first state holding it, steps)})."""
+        if self._tree is None:
+            visited, layers = bfs_tree(self.start, self.successors, self.index, self.size)
+            first = {}
+            for steps, layer in enumerate(layers):
+                for state in layer:
+                    first.setdefault(state[0], (state, steps))
+                    first.setdefault(state[1], (state, steps))
+            self._tree = visited, first
+        return self._tree
+
+    def solve_all(self):
+        """{goal: fewest steps} for every amount that can be measured."""
+        return {goal: steps for goal, (_, steps) in sorted(self.tree()[1].items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve the two water jug problem.')
+    parser.add_argument('cap1', type=int)
+    parser.add_argument('cap2', type=int)
+    parser.add_argument('goal', type=int, nargs='?', help='amount to measure (omit with --all)')
+    parser.add_argument('--strategy', choices=WaterJug.STRATEGIES, default='bfs')
+    parser.add_argument('--all', action='store_true', help='fewest steps for every measurable amount')
+    args = parser.parse_args()
+
+    jugs = WaterJug(args.cap1, args.cap2)
+    if args.all:
+        for goal, steps in jugs.solve_all().items():
+            print(f"{goal}: {steps} steps")
+        return
+    if args.goal is None:
+        parser.error('give a goal or --all')
+    if args.goal < 0:
+        parser.error('goal must be non-negative')
+    path = jugs.solve(args.goal, args.strategy)
+    if path is None:
+        print("No Solution Found")
+        return
+    print(f"Solution Found ({len(path.actions)} steps):")
+    print(path.states[0])
+    for action, state in zip(path.actions, path.states[1:]):
+        print(f"{action:<10} {state}")
+
+
+if __name__ == '__main__':
+    main()
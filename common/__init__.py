@@ -0,0 +1,5 @@
+"""Modules shared by several apps in this repository.
+
+Apps put the repository root on sys.path and import them as
+`from common.model_client import ...`.
+"""
@@ -0,0 +1,266 @@
+"""Sentence encoder backends for the all-MiniLM-L6-v2 models.
+
+    torch       SentenceTransformer on PyTorch (the original behaviour)
+    onnx        the same network exported to ONNX, run with ONNX Runtime
+    onnx-int8   the ONNX export with dynamically quantized INT8 weights
+
+Every backend exposes `encode(texts, batch_size=32, show_progress_bar=False)`
+returning a float32 (n, dim) array, so callers don't care which one they got.
+The backend is picked with ENCODER_BACKEND; ONNX models are exported into
+ENCODER_ONNX_DIR on first use (or ahead of time, from the app's folder, with
+`python ../common/encoders.py export`). CachedEncoder puts a TTLCache in front
+of any of them. Used by Task_9 and Task_12.
+"""
+import argparse
+import inspect
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+ENCODER_BACKEND = os.environ.get('ENCODER_BACKEND', 'torch')
+ENCODER_THREADS = int(os.environ.get('ENCODER_THREADS', '0'))  # 0 = runtime default
+ENCODER_ONNX_DIR = os.environ.get('ENCODER_ONNX_DIR', 'onnx_models')
+
+
+def encoder_id(model_name, backend=None):
+    """Identifies the vectors a backend produces, e.g. for cache keys."""
+    backend = backend or ENCODER_BACKEND
+    return model_name if backend == 'torch' else f"{model_name}@{backend}"
+
+
+def _export_dir(model_name, onnx_dir):
+    return os.path.join(onnx_dir, re.sub(r'[^a-zA-Z0-9]+', '-', model_name).strip('-').lower())
+
+
+class TorchEncoder:
+    def __init__(self, model_name, threads=0):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.name = encoder_id(model_name, 'torch')
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        return np.asarray(self.model.encode(list(texts), batch_size=batch_size,
+                                            show_progress_bar=show_progress_bar), dtype=np.float32)
+
+
+def export_onnx(model_name, onnx_dir=ENCODER_ONNX_DIR, quantize=True):
+    """Export the transformer of a SentenceTransformer to ONNX (+ an INT8 copy).
+
+    Pooling and normalization are not part of the graph; their settings are
+    written to encoder.json and applied in numpy by OnnxEncoder.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    out_dir = _export_dir(model_name, onnx_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0]
+    hf_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(out_dir)
+
+    module_names = [type(m).__name__ for m in st_model]
+    pooling = st_model[1] if len(st_model) > 1 else None
+    config = {
+        'model': model_name,
+        'max_seq_length': int(st_model.max_seq_length),
+        'pooling': 'cls' if pooling is not None and getattr(pooling, 'pooling_mode_cls_token', False) else 'mean',
+        'normalize': 'Normalize' in module_names,
+        'inputs': ['input_ids', 'attention_mask'] + (['token_type_ids'] if 'token_type_ids' in tokenizer.model_input_names else []),
+    }
+
+    sample = tokenizer(['export sample'], return_tensors='pt')
+    inputs = tuple(sample[name] for name in config['inputs'])
+    dynamic = {name: {0: 'batch', 1: 'sequence'} for name in config['inputs']}
+    dynamic['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *args):
+            return self.model(**dict(zip(config['inputs'], args))).last_hidden_state
+
+    fp32_path = os.path.join(out_dir, 'model.onnx')
+    extra = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        # Newer torch defaults to the dynamo exporter, which doesn't take dynamic_axes
+        extra['dynamo'] = False
+    torch.onnx.export(_Wrapper(hf_model), inputs, fp32_path, input_names=config['inputs'],
+                      output_names=['last_hidden_state'], dynamic_axes=dynamic, opset_version=14, **extra)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(out_dir, 'model.int8.onnx'), weight_type=QuantType.QInt8)
+
+    with open(os.path.join(out_dir, 'encoder.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+    return out_dir
+
+
+class OnnxEncoder:
+    def __init__(self, model_name, onnx_dir=ENCODER_ONNX_DIR, quantized=False, threads=0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        export_dir = _export_dir(model_name, onnx_dir)
+        model_file = 'model.int8.onnx' if quantized else 'model.onnx'
+        if not os.path.exists(os.path.join(export_dir, model_file)):
+            print(f"Exporting {model_name} to ONNX in {export_dir}...")
+            export_onnx(model_name, onnx_dir, quantize=quantized)
+        with open(os.path.join(export_dir, 'encoder.json'), 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(export_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=self.config['max_seq_length'])
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(export_dir, model_file), options,
+                                            providers=['CPUExecutionProvider'])
+        self.name = encoder_id(model_name, 'onnx-int8' if quantized else 'onnx')
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if 'token_type_ids' in self.config['inputs']:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]
+
+        if self.config['pooling'] == 'cls':
+            pooled = hidden[:, 0]
+        else:
+            mask = feeds['attention_mask'][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.config['normalize']:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        texts = [str(t) for t in texts]
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        # Sorting by length keeps padding per batch small
+        order = np.argsort([len(t) for t in texts], kind='stable')
+        out = [None] * len(texts)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            for i, vec in zip(idx, self._encode_batch([texts[i] for i in idx])):
+                out[i] = vec
+            if show_progress_bar:
+                print(f"\rEncoded {min(start + batch_size, len(texts))}/{len(texts)}", end='', flush=True)
+        if show_progress_bar:
+            print()
+        return np.stack(out)
+
+
+def load_encoder(model_name, backend=None, threads=None, onnx_dir=None):
+    backend = backend or ENCODER_BACKEND
+    threads = ENCODER_THREADS if threads is None else threads
+    onnx_dir = onnx_dir or ENCODER_ONNX_DIR
+    if backend == 'torch':
+        return TorchEncoder(model_name, threads)
+    if backend in ('onnx', 'onnx-int8'):
+        return OnnxEncoder(model_name, onnx_dir, quantized=backend == 'onnx-int8', threads=threads)
+    raise ValueError(f"Unknown encoder backend '{backend}', expected one of {BACKENDS}")
+
+
+def check_agreement(reference, candidate, texts):
+    """Cosine similarity between two encoders' outputs for the same texts."""
+    a = reference.encode(texts)
+    b = candidate.encode(texts)
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    cos = (a * b).sum(axis=1)
+    return {'min': float(cos.min()), 'mean': float(cos.mean())}
+
+
+AGREEMENT_TEXTS = [
+    "How many prayers are there?",
+    "Fasting in the month of Ramadan",
+    "The quick brown fox jumps over the lazy dog.",
+    "Narrated Abu Huraira: The Prophet said, whoever believes in Allah and the Last Day should speak good or keep silent.",
+    "A man is playing a guitar.",
+    "Someone is playing an instrument.",
+]
+
+
+def normalize_text(text):
+    """Cache key form of a query: lower-cased, whitespace collapsed.
+
+    all-MiniLM-L6-v2 lower-cases its input anyway, so this never changes what
+    the model sees.
+    """
+    return ' '.join(str(text).lower().split())
+
+
+class CachedEncoder:
+    """Wraps `model.encode` with a TTLCache keyed on (model name, normalized text).
+
+    Only the texts that miss are sent to the model, in one batch.
+    """
+
+    def __init__(self, encode_fn, model_name, cache):
+        self.encode_fn = encode_fn
+        self.model_name = model_name
+        self.cache = cache
+
+    def encode(self, texts):
+        keys = [(self.model_name, normalize_text(t)) for t in texts]
+        vectors = [self.cache.get(k) for k in keys]
+        missing = {}
+        for key, vec in zip(keys, vectors):
+            if vec is None:
+                missing.setdefault(key, None)
+        if missing:
+            encoded = np.asarray(self.encode_fn([text for _, text in missing]), dtype=np.float32)
+            for key, vec in zip(missing, encoded):
+                vec.setflags(write=False)
+                self.cache.set(key, vec)
+                missing[key] = vec
+            vectors = [missing[k] if v is None else v for k, v in zip(keys, vectors)]
+        return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export and check ONNX encoder backends.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    exp = sub.add_parser('export', help='Export a model to ONNX (and INT8)')
+    exp.add_argument('--model', required=True)
+    exp.add_argument('--out', default=ENCODER_ONNX_DIR)
+    exp.add_argument('--no-int8', action='store_true')
+    chk = sub.add_parser('check', help='Cosine agreement of each backend with torch')
+    chk.add_argument('--model', required=True)
+    chk.add_argument('--min-cosine', type=float, default=0.99)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        start = time.perf_counter()
+        path = export_onnx(args.model, args.out, quantize=not args.no_int8)
+        print(f"Exported to {path} in {time.perf_counter() - start:.1f}s")
+    else:
+        reference = load_encoder(args.model, 'torch')
+        failed = False
+        for backend in ('onnx', 'onnx-int8'):
+            agreement = check_agreement(reference, load_encoder(args.model, backend), AGREEMENT_TEXTS)
+            ok = agreement['min'] >= args.min_cosine
+            failed |= not ok
+            print(f"{backend:<10} min cosine {agreement['min']:.5f}  mean {agreement['mean']:.5f}  {'ok' if ok else 'FAIL'}")
+        raise SystemExit(1 if failed else 0)
@@ -0,0 +1,153 @@
+"""Background jobs with results kept in SQLite, used by the FaceApp project
+and Lab_Task_06.
+
+    queue = JobQueue(JobStore('jobs.sqlite3'), executor)
+    job_id = queue.submit(fn, args, files=[out_path])   # returns at once
+    queue.get(job_id)   # {'id', 'status', 'result', 'error', ...}
+
+`fn(*args)` runs on the executor (threads or processes) inside `run_job`,
+which writes running/done/failed and the JSON result to the store itself,
+so any web worker process can answer /jobs/<id>. Jobs and the files they
+produced (`files`) are deleted JOB_TTL seconds after they were submitted.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+JOB_TTL = float(os.environ.get('JOB_TTL', '3600'))
+JOB_CLEANUP_INTERVAL = float(os.environ.get('JOB_CLEANUP_INTERVAL', '60'))
+# Jobs queued or running in this process before submit() refuses more
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', '256'))
+
+
+class QueueFull(RuntimeError):
+    """Too many jobs are waiting; the client should retry later."""
+
+
+class JobStore:
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                       'id TEXT PRIMARY KEY, status TEXT NOT NULL, created REAL NOT NULL, updated REAL NOT NULL, '
+                       'result TEXT, error TEXT, files TEXT NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created)')
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call: safe from any thread or process
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def create(self, job_id, files=()):
+        now = time.time()
+        with self._connect() as db:
+            db.execute('INSERT INTO jobs (id, status, created, updated, files) VALUES (?, ?, ?, ?, ?)',
+                       (job_id, 'queued', now, now, json.dumps(list(files))))
+
+    def update(self, job_id, status, result=None, error=None):
+        with self._connect() as db:
+            db.execute('UPDATE jobs SET status = ?, updated = ?, result = ?, error = ? WHERE id = ?',
+                       (status, time.time(), None if result is None else json.dumps(result), error, job_id))
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute('SELECT id, status, created, updated, result, error FROM jobs WHERE id = ?',
+                             (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {'id': row[0], 'status': row[1], 'created': row[2], 'updated': row[3],
+                'result': json.loads(row[4]) if row[4] else None, 'error': row[5]}
+
+    def expire(self, ttl=JOB_TTL):
+        """Delete jobs submitted more than `ttl` seconds ago and their files."""
+        cutoff = time.time() - ttl
+        with self._connect() as db:
+            rows = db.execute('SELECT id, files FROM jobs WHERE created < ?', (cutoff,)).fetchall()
+            db.execute('DELETE FROM jobs WHERE created < ?', (cutoff,))
+        for _, files in rows:
+            for path in json.loads(files):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return len(rows)
+
+
+def run_job(db_path, job_id, fn, args):
+    """Executor-side wrapper: records the outcome of fn(*args) in the store."""
+    store = JobStore(db_path)
+    store.update(job_id, 'running')
+    try:
+        result = fn(*args)
+    except Exception as e:
+        store.update(job_id, 'failed', error=str(e))
+    else:
+        store.update(job_id, 'done', result=result)
+
+
+class JobQueue:
+    """`executor` is a concurrent.futures executor, or a callable returning
+    one (called on every submit, e.g. a lazily created pool)."""
+
+    def __init__(self, store, executor, max_pending=JOB_MAX_PENDING, ttl=JOB_TTL):
+        self.store = store
+        self.executor = executor
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._cleaner = None
+
+    def _done(self, job_id, future=None):
+        with self._lock:
+            self._pending -= 1
+        # run_job records its own failures; this catches a crashed worker process
+        if future is not None and future.exception() is not None:
+            self.store.update(job_id, 'failed', error=str(future.exception()))
+
+    def submit(self, fn, args=(), files=()):
+        """Queue fn(*args); returns the job id. Raises QueueFull when busy."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} jobs pending")
+            self._pending += 1
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.create(job_id, files)
+            executor = self.executor() if callable(self.executor) else self.executor
+            future = executor.submit(run_job, self.store.path, job_id, fn, tuple(args))
+        except Exception:
+            self._done(job_id)
+            raise
+        future.add_done_callback(lambda f: self._done(job_id, f))
+        self._start_cleaner()
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _start_cleaner(self):
+        if self._cleaner is not None:
+            return
+        with self._lock:
+            if self._cleaner is None:
+                self._cleaner = threading.Thread(target=self._clean_forever, name='job-cleanup', daemon=True)
+                self._cleaner.start()
+
+    def _clean_forever(self):
+        while True:
+            try:
+                self.store.expire(self.ttl)
+            except sqlite3.Error:
+                pass
+            time.sleep(JOB_CLEANUP_INTERVAL)
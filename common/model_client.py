@@ -0,0 +1,136 @@
+"""Thin client for Task_12/model_server.py over a Unix socket, used by the
+Task_12 and Task_9 apps.
+
+Wire format, both directions: 4-byte big-endian header length, the JSON
+header, then `payload_bytes` raw bytes if the header has that key (used for
+float32 embedding matrices so they are not sent as JSON).
+"""
+import json
+import os
+import socket
+import struct
+import threading
+
+import numpy as np
+
+
+MODEL_SERVER_SOCKET = os.environ.get('MODEL_SERVER_SOCKET', '/tmp/minilm-model.sock')
+
+_LEN = struct.Struct('>I')
+
+
+class SidecarError(RuntimeError):
+    """The sidecar answered with an error (as opposed to being unreachable)."""
+
+
+class SidecarTimeout(TimeoutError):
+    """The sidecar is up but did not answer in time. The request may still be
+    running there, so it is not retried and the sidecar is not given up on."""
+
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        read = sock.recv_into(view[got:], n - got)
+        if read == 0:
+            raise ConnectionError('model server closed the connection')
+        got += read
+    return bytes(buf)
+
+
+def send_message(sock, header, payload=b''):
+    if payload:
+        header = dict(header, payload_bytes=len(payload))
+    data = json.dumps(header).encode('utf-8')
+    sock.sendall(_LEN.pack(len(data)) + data + payload)
+
+
+def recv_message(sock):
+    (length,) = _LEN.unpack(_recv_exact(sock, _LEN.size))
+    header = json.loads(_recv_exact(sock, length))
+    payload = _recv_exact(sock, header['payload_bytes']) if header.get('payload_bytes') else b''
+    return header, payload
+
+
+def same_model(a, b):
+    """'all-MiniLM-L6-v2' and 'sentence-transformers/all-MiniLM-L6-v2' are the same model."""
+    strip = lambda name: name.split('/', 1)[1] if name.startswith('sentence-transformers/') else name
+    return strip(a) == strip(b)
+
+
+class ModelClient:
+    """One connection per thread; reconnects once if the socket went stale.
+
+    ConnectionError means the sidecar is gone, SidecarTimeout that it is busy.
+    """
+
+    def __init__(self, socket_path=MODEL_SERVER_SOCKET, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._local.sock = sock
+        return sock
+
+    def close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def call(self, header, payload=b''):
+        for attempt in (0, 1):
+            try:
+                sock = getattr(self._local, 'sock', None) or self._connect()
+                send_message(sock, header, payload)
+                reply, reply_payload = recv_message(sock)
+                break
+            except socket.timeout:
+                # A late reply would be read as the answer to the next call
+                self.close()
+                raise SidecarTimeout(f"model server at {self.socket_path} did not answer "
+                                     f"within {self.timeout}s") from None
+            except OSError:
+                self.close()
+                if attempt:
+                    raise ConnectionError(f"model server at {self.socket_path} is unreachable")
+        if 'error' in reply:
+            # Bad arguments come back as ValueError, like the in-process API raises
+            raise (ValueError if reply.get('error_type') == 'ValueError' else SidecarError)(reply['error'])
+        return reply, reply_payload
+
+    def ping(self):
+        return self.call({'op': 'ping'})[0]
+
+    def encode(self, texts, encoder=None):
+        """Embeddings from the sidecar. `encoder` is the caller's encoder id; the
+        sidecar refuses if it runs a different model/backend."""
+        reply, payload = self.call({'op': 'encode', 'texts': list(texts), 'encoder': encoder})
+        return np.frombuffer(payload, dtype=np.float32).reshape(reply['shape'])
+
+    def stats(self):
+        return self.call({'op': 'stats'})[0]['stats']
+
+    def search(self, query, **params):
+        return self.call(dict(params, op='search', query=query))[0]['results']
+
+    def search_batch(self, queries, **params):
+        return self.call(dict(params, op='search_batch', queries=list(queries)))[0]['results']
+
+
+def connect_if_available(socket_path=MODEL_SERVER_SOCKET):
+    """A ModelClient if a sidecar answers on `socket_path`, else None."""
+    if not os.path.exists(socket_path):
+        return None
+    client = ModelClient(socket_path)
+    try:
+        client.ping()
+    except (ConnectionError, SidecarError, OSError):
+        return None
+    return client